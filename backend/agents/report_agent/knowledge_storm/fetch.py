@@ -0,0 +1,204 @@
+"""
+Asyncio HTTP layer shared by the retrieval modules and WebPageHelper.
+
+All requests run on one background event loop per process, through pooled
+``httpx.AsyncClient`` instances. Connections are kept alive and reused per host
+across queries, retrievers and reports instead of being opened per request
+(``requests.request``) or per helper (``httpx.Client``).
+
+Each request names a provider whose ProviderLimit caps its concurrency and
+request rate, so a burst of queries cannot exceed a search API's quota. A
+per-host semaphore additionally bounds page downloads hitting one site.
+
+Sync callers (e.g. threads in the knowledge curation stage) use ``run``;
+coroutines on any other event loop use ``arun``.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+STORM_FETCH_MAX_CONNECTIONS = int(os.getenv("STORM_FETCH_MAX_CONNECTIONS", "100"))
+STORM_FETCH_MAX_KEEPALIVE = int(os.getenv("STORM_FETCH_MAX_KEEPALIVE", "20"))
+STORM_FETCH_PER_HOST = int(os.getenv("STORM_FETCH_PER_HOST", "6"))
+
+
+@dataclass(frozen=True)
+class ProviderLimit:
+    max_concurrency: int
+    requests_per_second: Optional[float] = None
+
+
+PROVIDER_LIMITS: Dict[str, ProviderLimit] = {
+    "serper": ProviderLimit(max_concurrency=8, requests_per_second=5.0),
+    "tavily": ProviderLimit(max_concurrency=8, requests_per_second=5.0),
+    "webpage": ProviderLimit(max_concurrency=32),
+}
+DEFAULT_LIMIT = ProviderLimit(max_concurrency=8)
+
+
+class _RateLimiter:
+    """Token bucket; only used from the fetch loop."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FetchLayer:
+    def __init__(self, provider_limits: Optional[Dict[str, ProviderLimit]] = None):
+        self.provider_limits = dict(PROVIDER_LIMITS, **(provider_limits or {}))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        # Created on the fetch loop
+        self._clients: Dict[bool, httpx.AsyncClient] = {}
+        self._provider_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._rate_limiters: Dict[str, _RateLimiter] = {}
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    # ─── Event loop ────────────────────────────────────────────────────────
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        # The loop thread does not survive fork; a forked child starts its own
+        if self._loop_pid != os.getpid():
+            with self._start_lock:
+                if self._loop_pid != os.getpid():
+                    self._clients = {}
+                    self._provider_semaphores = {}
+                    self._rate_limiters = {}
+                    self._host_semaphores = {}
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(
+                        target=loop.run_forever, name="storm-fetch", daemon=True
+                    ).start()
+                    self._loop = loop
+                    self._loop_pid = os.getpid()
+        return self._loop
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def run(self, coro: Awaitable) -> Any:
+        """Run a coroutine on the fetch loop and wait for it from a sync caller."""
+        loop = self._ensure_loop()
+        if self._on_loop():
+            raise RuntimeError("FetchLayer.run() called from the fetch loop; await arun() instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def arun(self, coro: Awaitable) -> Any:
+        """Await a coroutine on the fetch loop from any event loop."""
+        loop = self._ensure_loop()
+        if self._on_loop():
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    # ─── Requests (fetch loop only) ────────────────────────────────────────
+    def _client(self, verify: bool) -> httpx.AsyncClient:
+        client = self._clients.get(verify)
+        if client is None:
+            client = httpx.AsyncClient(
+                verify=verify,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=STORM_FETCH_MAX_CONNECTIONS,
+                    max_keepalive_connections=STORM_FETCH_MAX_KEEPALIVE,
+                ),
+            )
+            self._clients[verify] = client
+        return client
+
+    async def _limited(self, provider: str, host: str, send):
+        limit = self.provider_limits.get(provider, DEFAULT_LIMIT)
+        provider_semaphore = self._provider_semaphores.setdefault(
+            provider, asyncio.Semaphore(limit.max_concurrency)
+        )
+        host_semaphore = self._host_semaphores.setdefault(
+            host, asyncio.Semaphore(STORM_FETCH_PER_HOST)
+        )
+        async with provider_semaphore, host_semaphore:
+            if limit.requests_per_second:
+                limiter = self._rate_limiters.setdefault(
+                    provider, _RateLimiter(limit.requests_per_second)
+                )
+                await limiter.acquire()
+            return await send()
+
+    async def _request(self, method, url, provider, verify, **kwargs) -> httpx.Response:
+        client = self._client(verify)
+        return await self._limited(
+            provider,
+            urlsplit(url).netloc,
+            lambda: client.request(method, url, **kwargs),
+        )
+
+    # ─── Public API ────────────────────────────────────────────────────────
+    async def arequest(
+        self, method: str, url: str, provider: str, verify: bool = True, **kwargs
+    ) -> httpx.Response:
+        """Send one request; kwargs (json, headers, params, timeout) apply to this request only."""
+        return await self.arun(self._request(method, url, provider, verify, **kwargs))
+
+    def request(self, method: str, url: str, provider: str, verify: bool = True, **kwargs) -> httpx.Response:
+        return self.run(self._request(method, url, provider, verify, **kwargs))
+
+    async def _get_content(self, url: str, provider: str, timeout: float, verify: bool) -> Optional[bytes]:
+        try:
+            res = await self._request("GET", url, provider, verify, timeout=timeout)
+            res.raise_for_status()
+            return res.content
+        except httpx.HTTPError as exc:
+            logger.info(f"Error while requesting {url!r} - {exc!r}")
+            return None
+
+    async def _fetch_all(self, urls, provider, timeout, verify):
+        return await asyncio.gather(
+            *[self._get_content(url, provider, timeout, verify) for url in urls]
+        )
+
+    async def afetch_all(
+        self, urls: List[str], provider: str = "webpage", timeout: float = 4, verify: bool = False
+    ) -> List[Optional[bytes]]:
+        """Download all URLs concurrently; failed downloads are None."""
+        return await self.arun(self._fetch_all(urls, provider, timeout, verify))
+
+    def fetch_all(self, urls: List[str], provider: str = "webpage", timeout: float = 4, verify: bool = False):
+        return self.run(self.afetch_all(urls, provider, timeout, verify))
+
+
+_fetch_layer: Optional[FetchLayer] = None
+_fetch_layer_lock = threading.Lock()
+
+
+def get_fetch_layer() -> FetchLayer:
+    """The process-wide FetchLayer."""
+    global _fetch_layer
+    if _fetch_layer is None:
+        with _fetch_layer_lock:
+            if _fetch_layer is None:
+                _fetch_layer = FetchLayer()
+    return _fetch_layer
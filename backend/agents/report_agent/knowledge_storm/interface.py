@@ -1,4 +1,4 @@
-import concurrent.futures
+import asyncio
 import dspy
 import functools
 import hashlib
@@ -7,8 +7,11 @@ import logging
 import time
 from abc import ABC, abstractmethod
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Union, TYPE_CHECKING
 
+from .fetch import get_fetch_layer
+from .search_cache import SearchCache, SearchCacheStats, cache_identity, get_search_cache
 from .utils import ArticleTextProcessing
 
 logging.basicConfig(
@@ -264,16 +267,29 @@ class Retriever:
     This class should be extended to implement specific retrieval functionalities.
     Users can design their retriever modules as needed by implementing the retrieve method.
     The retrieval model/search engine used for each part should be declared with a suffix '_rm' in the attribute name.
+
+    Search results of rms that define cache_key_params() are looked up in a shared
+    SearchCache first (see search_cache.py); pass search_cache to override the
+    configured one.
     """
 
-    def __init__(self, rm: dspy.Retrieve, max_thread: int = 1):
+    def __init__(
+        self,
+        rm: dspy.Retrieve,
+        max_thread: int = 1,
+        search_cache: Optional[SearchCache] = None,
+    ):
         self.max_thread = max_thread
         self.rm = rm
+        self.search_cache = search_cache or get_search_cache()
+        self.search_cache_stats = SearchCacheStats(type(rm).__name__)
 
     def collect_and_reset_rm_usage(self):
         combined_usage = []
         if hasattr(getattr(self, "rm"), "get_usage_and_reset"):
             combined_usage.append(getattr(self, "rm").get_usage_and_reset())
+        if self.search_cache is not None:
+            combined_usage.append(self.search_cache_stats.get_usage_and_reset())
 
         name_to_usage = {}
         for usage in combined_usage:
@@ -285,39 +301,97 @@ class Retriever:
 
         return name_to_usage
 
-    def retrieve(
+    def _cached(self, query: str, exclude_urls: List[str]):
+        """
+        Return (cache key, cached results or None). The key is None when caching
+        is off or the rm has no cache_key_params().
+        """
+        if self.search_cache is None:
+            return None, None
+        identity = cache_identity(self.rm)
+        if identity is None:
+            return None, None
+        key = self.search_cache.make_key(self.rm, query, exclude_urls, identity)
+        cached = self.search_cache.get(key)
+        self.search_cache_stats.record(hit=cached is not None)
+        return key, cached
+
+    def _store(self, key: Optional[str], results: List[dict]) -> None:
+        # Retrievers return [] on API errors; do not pin those
+        if key is not None and results:
+            self.search_cache.set(key, results, self.search_cache.ttl_for(self.rm))
+
+    def _search(self, query: str, exclude_urls: List[str]) -> List[dict]:
+        """Call the search API for one query, going through the search cache."""
+        key, cached = self._cached(query, exclude_urls)
+        if cached is not None:
+            return cached
+        results = self.rm(query_or_queries=[query], exclude_urls=exclude_urls)
+        self._store(key, results)
+        return results
+
+    async def _asearch(
+        self, query: str, exclude_urls: List[str], executor: ThreadPoolExecutor
+    ) -> List[dict]:
+        loop = asyncio.get_running_loop()
+        aforward = getattr(self.rm, "aforward", None)
+        if aforward is None:
+            # Retrievers without an async forward block a thread per query
+            return await loop.run_in_executor(executor, self._search, query, exclude_urls)
+
+        key, cached = await loop.run_in_executor(executor, self._cached, query, exclude_urls)
+        if cached is not None:
+            return cached
+        results = await aforward([query], exclude_urls=exclude_urls)
+        await loop.run_in_executor(executor, self._store, key, results)
+        return results
+
+    def _to_information(self, query: str, retrieved_data_list: List[dict]) -> List[Information]:
+        local_to_return = []
+        for data in retrieved_data_list:
+            for i in range(len(data["snippets"])):
+                # STORM generate the article with citations. We do not consider multi-hop citations.
+                # Remove citations in the source to avoid confusion.
+                data["snippets"][i] = ArticleTextProcessing.remove_citations(
+                    data["snippets"][i]
+                )
+            storm_info = Information.from_dict(data)
+            storm_info.meta["query"] = query
+            local_to_return.append(storm_info)
+        return local_to_return
+
+    async def aretrieve(
         self, query: Union[str, List[str]], exclude_urls: List[str] = []
     ) -> List[Information]:
+        """Run all queries concurrently (at most max_thread at a time) and keep their order."""
         queries = query if isinstance(query, list) else [query]
-        to_return = []
+        semaphore = asyncio.Semaphore(max(1, self.max_thread))
+        # Blocking rms and cache lookups get their own threads instead of the
+        # loop's default executor, which is shared with every other caller
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, self.max_thread), thread_name_prefix="storm-retriever"
+        )
 
-        def process_query(q):
-            retrieved_data_list = self.rm(
-                query_or_queries=[q], exclude_urls=exclude_urls
-            )
-            local_to_return = []
-            for data in retrieved_data_list:
-                for i in range(len(data["snippets"])):
-                    # STORM generate the article with citations. We do not consider multi-hop citations.
-                    # Remove citations in the source to avoid confusion.
-                    data["snippets"][i] = ArticleTextProcessing.remove_citations(
-                        data["snippets"][i]
-                    )
-                storm_info = Information.from_dict(data)
-                storm_info.meta["query"] = q
-                local_to_return.append(storm_info)
-            return local_to_return
-
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=self.max_thread
-        ) as executor:
-            results = list(executor.map(process_query, queries))
+        async def process_query(q):
+            async with semaphore:
+                retrieved_data_list = await self._asearch(q, exclude_urls, executor)
+            return self._to_information(q, retrieved_data_list)
+
+        try:
+            results = await asyncio.gather(*[process_query(q) for q in queries])
+        finally:
+            executor.shutdown(wait=False)
 
+        to_return = []
         for result in results:
             to_return.extend(result)
-
         return to_return
 
+    def retrieve(
+        self, query: Union[str, List[str]], exclude_urls: List[str] = []
+    ) -> List[Information]:
+        return get_fetch_layer().run(self.aretrieve(query, exclude_urls))
+
 
 class KnowledgeCurationModule(ABC):
     """
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 from typing import Callable, Union, List
@@ -7,6 +8,8 @@ import dspy
 import requests
 from dsp import backoff_hdlr, giveup_hdlr
 
+from .fetch import get_fetch_layer
+from .search_cache import callable_key, webpage_helper_key
 from .utils import WebPageHelper
 from .storm_wiki.modules.retriever import GENERALLY_UNRELIABLE, DEPRECATED, BLACKLISTED
 
@@ -36,6 +39,9 @@ class YouRM(dspy.Retrieve):
 
         return {"YouRM": usage}
 
+    def cache_key_params(self):
+        return {"k": self.k, "source_filter": callable_key(self.is_valid_source)}
+
     def forward(
         self, query_or_queries: Union[str, List[str]], exclude_urls: List[str] = []
     ):
@@ -126,6 +132,15 @@ class BingSearch(dspy.Retrieve):
 
         return {"BingSearch": usage}
 
+    def cache_key_params(self):
+        return {
+            "endpoint": self.endpoint,
+            "params": self.params,
+            "k": self.k,
+            "source_filter": callable_key(self.is_valid_source),
+            **webpage_helper_key(self.webpage_helper),
+        }
+
     def forward(
         self, query_or_queries: Union[str, List[str]], exclude_urls: List[str] = []
     ):
@@ -353,6 +368,9 @@ class StanfordOvalArxivRM(dspy.Retrieve):
 
         return {"StanfordOvalArxivRM": usage}
 
+    def cache_key_params(self):
+        return {"endpoint": self.endpoint, "k": self.k, "rerank": self.rerank}
+
     def _retrieve(self, query: str):
         payload = {"query": query, "num_blocks": self.k, "rerank": self.rerank}
 
@@ -437,19 +455,20 @@ class SerperRM(dspy.Retrieve):
         """
         super().__init__(k=k)
         self.usage = 0
-        self.query_params = None
         self.ENABLE_EXTRA_SNIPPET_EXTRACTION = ENABLE_EXTRA_SNIPPET_EXTRACTION
         self.webpage_helper = WebPageHelper(
             min_char_count=min_char_count,
             snippet_chunk_size=snippet_chunk_size,
             max_thread_num=webpage_helper_max_threads,
         )
+        self.fetch_layer = get_fetch_layer()
 
-        if query_params is None:
-            self.query_params = {"num": k, "autocorrect": True, "page": 1}
-        else:
-            self.query_params = query_params
-            self.query_params.update({"num": k})
+        # Base parameters shared by every request; never mutated after this point
+        # (each request builds its own dict in _request_params)
+        self.query_params = {
+            **(query_params or {"autocorrect": True, "page": 1}),
+            "num": k,
+        }
         self.serper_search_api_key = serper_search_api_key
         if not self.serper_search_api_key and not os.environ.get("SERPER_API_KEY"):
             raise RuntimeError(
@@ -464,30 +483,49 @@ class SerperRM(dspy.Retrieve):
 
         self.base_url = "https://google.serper.dev"
 
-    def serper_runner(self, query_params):
-        self.search_url = f"{self.base_url}/search"
+    def _request_params(self, query: str) -> dict:
+        # All available parameters can be found in the playground: https://serper.dev/playground
+        # type can be search, images, video, places, maps etc that Google provides.
+        return {**self.query_params, "q": query, "type": "search"}
 
+    async def aserper_runner(self, query_params):
         headers = {
             "X-API-KEY": self.serper_search_api_key,
             "Content-Type": "application/json",
         }
-
-        response = requests.request(
-            "POST", self.search_url, headers=headers, json=query_params
+        response = await self.fetch_layer.arequest(
+            "POST",
+            f"{self.base_url}/search",
+            provider="serper",
+            headers=headers,
+            json=query_params,
+            timeout=30,
         )
-
-        if response == None:
+        if response.status_code >= 400:
             raise RuntimeError(
-                f"Error had occurred while running the search process.\n Error is {response.reason}, had failed with status code {response.status_code}"
+                f"Error had occurred while running the search process.\n Error is {response.reason_phrase}, had failed with status code {response.status_code}"
             )
-
         return response.json()
 
+    def serper_runner(self, query_params):
+        return self.fetch_layer.run(self.aserper_runner(query_params))
+
     def get_usage_and_reset(self):
         usage = self.usage
         self.usage = 0
         return {"SerperRM": usage}
 
+    def cache_key_params(self):
+        params = {
+            "base_url": self.base_url,
+            # "q" is per request; keep it out even if the caller passed one
+            "query_params": {k: v for k, v in self.query_params.items() if k != "q"},
+            "extra_snippets": self.ENABLE_EXTRA_SNIPPET_EXTRACTION,
+        }
+        if self.ENABLE_EXTRA_SNIPPET_EXTRACTION:
+            params.update(webpage_helper_key(self.webpage_helper))
+        return params
+
     def forward(self, query_or_queries: Union[str, List[str]], exclude_urls: List[str]):
         """
         Calls the API and searches for the query passed in.
@@ -500,46 +538,46 @@ class SerperRM(dspy.Retrieve):
         Returns:
             a list of dictionaries, each dictionary has keys of 'description', 'snippets' (list of strings), 'title', 'url'
         """
+        return self.fetch_layer.run(self.aforward(query_or_queries, exclude_urls))
+
+    async def aforward(
+        self, query_or_queries: Union[str, List[str]], exclude_urls: List[str] = []
+    ):
+        """Async forward: all queries are sent concurrently over pooled connections."""
         queries = (
             [query_or_queries]
             if isinstance(query_or_queries, str)
             else query_or_queries
         )
+        queries = [query for query in queries if query != "Queries:"]
 
         self.usage += len(queries)
-        self.results = []
-        collected_results = []
-        for query in queries:
-            if query == "Queries:":
-                continue
-            query_params = self.query_params
-
-            # All available parameters can be found in the playground: https://serper.dev/playground
-            # Sets the json value for query to be the query that is being parsed.
-            query_params["q"] = query
-
-            # Sets the type to be search, can be images, video, places, maps etc that Google provides.
-            query_params["type"] = "search"
-
-            self.result = self.serper_runner(query_params)
-            self.results.append(self.result)
-
-        # Array of dictionaries that will be used by Storm to create the jsons
-        collected_results = []
+        responses = await asyncio.gather(
+            *[self.aserper_runner(self._request_params(query)) for query in queries],
+            return_exceptions=True,
+        )
+        results = []
+        for query, response in zip(queries, responses):
+            if isinstance(response, Exception):
+                logging.error(f"Error searching query {query}: {response}")
+            else:
+                results.append(response)
 
         if self.ENABLE_EXTRA_SNIPPET_EXTRACTION:
             urls = []
-            for result in self.results:
+            for result in results:
                 organic_results = result.get("organic", [])
                 for organic in organic_results:
                     url = organic.get("link")
                     if url:
                         urls.append(url)
-            valid_url_to_snippets = self.webpage_helper.urls_to_snippets(urls)
+            valid_url_to_snippets = await self.webpage_helper.aurls_to_snippets(urls)
         else:
             valid_url_to_snippets = {}
 
-        for result in self.results:
+        # Array of dictionaries that will be used by Storm to create the jsons
+        collected_results = []
+        for result in results:
             try:
                 # An array of dictionaries that contains the snippets, title of the document and url that will be used.
                 organic_results = result.get("organic")
@@ -548,7 +586,9 @@ class SerperRM(dspy.Retrieve):
                     snippets = [organic.get("snippet")]
                     if self.ENABLE_EXTRA_SNIPPET_EXTRACTION:
                         snippets.extend(
-                            valid_url_to_snippets.get(url, {}).get("snippets", [])
+                            valid_url_to_snippets.get(organic.get("link"), {}).get(
+                                "snippets", []
+                            )
                         )
                     collected_results.append(
                         {
@@ -602,6 +642,15 @@ class BraveRM(dspy.Retrieve):
 
         return {"BraveRM": usage}
 
+    def cache_key_params(self):
+        return {
+            "base_url": self.base_url,
+            "k": self.k,
+            "time_range": self.time_range,
+            "include_domains": self.include_domains,
+            "source_filter": callable_key(self.is_valid_source),
+        }
+
     def forward(
         self, query_or_queries: Union[str, List[str]], exclude_urls: List[str] = []
     ):
@@ -713,6 +762,15 @@ class SearXNG(dspy.Retrieve):
         self.usage = 0
         return {"SearXNG": usage}
 
+    def cache_key_params(self):
+        return {
+            "searxng_api_url": self.searxng_api_url,
+            "engines": self.engines,
+            "time_range": self.time_range,
+            "k": self.k,
+            "source_filter": callable_key(self.is_valid_source),
+        }
+
     def forward(
         self, query_or_queries: Union[str, List[str]], exclude_urls: List[str] = []
     ):
@@ -849,6 +907,15 @@ class DuckDuckGoSearchRM(dspy.Retrieve):
         self.usage = 0
         return {"DuckDuckGoRM": usage}
 
+    def cache_key_params(self):
+        return {
+            "k": self.k,
+            "backend": self.duck_duck_go_backend,
+            "region": self.duck_duck_go_region,
+            "safe_search": self.duck_duck_go_safe_search,
+            "source_filter": callable_key(self.is_valid_source),
+        }
+
     @backoff.on_exception(
         backoff.expo,
         (Exception,),
@@ -936,11 +1003,6 @@ class TavilySearchRM(dspy.Retrieve):
         chunks_per_source: int = 3,  # Number of content chunks to retrieve from each source
     ):
         super().__init__(k=k)
-        try:
-            from tavily import TavilyClient
-        except ImportError:
-            raise ImportError("Tavily requires `pip install tavily-python`.")
-
         if not tavily_search_api_key and not os.environ.get("TAVILY_API_KEY"):
             raise RuntimeError(
                 "You must supply tavily_search_api_key or set TAVILY_API_KEY env variable"
@@ -961,7 +1023,8 @@ class TavilySearchRM(dspy.Retrieve):
         self.chunks_per_source = (
             chunks_per_source  # Store chunks_per_source for use in forward
         )
-        self.tavily_client = TavilyClient(api_key=self.tavily_search_api_key)
+        self.fetch_layer = get_fetch_layer()
+        self.base_url = "https://api.tavily.com"
         self.include_raw_content = include_raw_content
         self.include_answer = include_answer
         self.include_domains = include_domains
@@ -981,62 +1044,108 @@ class TavilySearchRM(dspy.Retrieve):
         self.usage = 0
         return {"TavilySearchRM": usage}
 
+    def cache_key_params(self):
+        return {
+            "base_url": self.base_url,
+            "k": self.k,
+            "time_range": self.time_range,
+            "search_depth": self.search_depth,
+            "chunks_per_source": self.chunks_per_source,
+            "include_raw_content": self.include_raw_content,
+            "include_answer": self.include_answer,
+            "include_domains": self.include_domains,
+            "excluded_domains": sorted(self.excluded_domains),
+            "source_filter": callable_key(self.is_valid_source),
+        }
+
+    def _request_body(self, query: str) -> dict:
+        # Same request body as TavilyClient.search
+        body = {
+            "query": query,
+            "max_results": self.k,
+            "include_raw_content": self.include_raw_content,
+            "include_answer": self.include_answer,
+            "exclude_domains": self.excluded_domains,
+        }
+        if self.include_domains:
+            body["include_domains"] = self.include_domains
+
+        if self.time_range:
+            body["time_range"] = self.time_range
+
+        if self.search_depth:
+            body["search_depth"] = self.search_depth
+
+        if self.chunks_per_source:
+            body["chunks_per_source"] = self.chunks_per_source
+        return body
+
+    async def atavily_runner(self, query: str) -> dict:
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.tavily_search_api_key}",
+        }
+        response = await self.fetch_layer.arequest(
+            "POST",
+            f"{self.base_url}/search",
+            provider="tavily",
+            headers=headers,
+            json=self._request_body(query),
+            timeout=60,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"Tavily search failed with status code {response.status_code}: {response.text}"
+            )
+        return response.json()
+
     def forward(
         self, query_or_queries: Union[str, List[str]], exclude_urls: List[str] = []
     ):
+        return self.fetch_layer.run(self.aforward(query_or_queries, exclude_urls))
+
+    async def aforward(
+        self, query_or_queries: Union[str, List[str]], exclude_urls: List[str] = []
+    ):
+        """Async forward: all queries are sent concurrently over pooled connections."""
         queries = (
             [query_or_queries]
             if isinstance(query_or_queries, str)
             else query_or_queries
         )
         self.usage += len(queries)
-        collected_results = []
-
-        for query in queries:
-            args = {
-                "max_results": self.k,
-                "include_raw_content": self.include_raw_content,
-                "include_answer": self.include_answer,
-                "exclude_domains": self.excluded_domains,
-            }
-            if self.include_domains:
-                args["include_domains"] = self.include_domains
-
-            if self.time_range:
-                args["time_range"] = self.time_range
-
-            if self.search_depth:
-                args["search_depth"] = self.search_depth
-
-            if self.chunks_per_source:
-                args["chunks_per_source"] = self.chunks_per_source
+        responses = await asyncio.gather(
+            *[self.atavily_runner(query) for query in queries],
+            return_exceptions=True,
+        )
 
-            try:
-                response_data = self.tavily_client.search(query, **args)
-                results = response_data.get("results", [])
-                for d in results:
-                    if not isinstance(d, dict):
-                        logging.error(f"Invalid result: {d}")
-                        continue
-                    url = d.get("url")
-                    title = d.get("title")
-                    description = d.get("content")
-                    snippets = [d.get("raw_content") or d.get("content")]
+        collected_results = []
+        for query, response_data in zip(queries, responses):
+            if isinstance(response_data, Exception):
+                logging.error(f"Error searching query {query}: {response_data}")
+                continue
+            results = response_data.get("results", [])
+            for d in results:
+                if not isinstance(d, dict):
+                    logging.error(f"Invalid result: {d}")
+                    continue
+                url = d.get("url")
+                title = d.get("title")
+                description = d.get("content")
+                snippets = [d.get("raw_content") or d.get("content")]
 
-                    if not all([url, title, description, snippets]):
-                        logging.error(f"Missing key(s) in result: {d}")
-                        continue
-                    if self.is_valid_source(url) and url not in exclude_urls:
-                        collected_results.append(
-                            {
-                                "url": url,
-                                "title": title,
-                                "description": description,
-                                "snippets": snippets,
-                            }
-                        )
-            except Exception as e:
-                logging.error(f"Error searching query {query}: {e}")
+                if not all([url, title, description, snippets]):
+                    logging.error(f"Missing key(s) in result: {d}")
+                    continue
+                if self.is_valid_source(url) and url not in exclude_urls:
+                    collected_results.append(
+                        {
+                            "url": url,
+                            "title": title,
+                            "description": description,
+                            "snippets": snippets,
+                        }
+                    )
 
         return collected_results
 
@@ -1105,6 +1214,14 @@ class GoogleSearch(dspy.Retrieve):
         self.usage = 0
         return {"GoogleSearch": usage}
 
+    def cache_key_params(self):
+        return {
+            "google_cse_id": self.google_cse_id,
+            "k": self.k,
+            "source_filter": callable_key(self.is_valid_source),
+            **webpage_helper_key(self.webpage_helper),
+        }
+
     def forward(
         self, query_or_queries: Union[str, List[str]], exclude_urls: List[str] = []
     ):
@@ -1246,6 +1363,13 @@ class AzureAISearch(dspy.Retrieve):
 
         return {"AzureAISearch": usage}
 
+    def cache_key_params(self):
+        return {
+            "azure_ai_search_url": self.azure_ai_search_url,
+            "azure_ai_search_index_name": self.azure_ai_search_index_name,
+            "source_filter": callable_key(self.is_valid_source),
+        }
+
     def forward(
         self, query_or_queries: Union[str, List[str]], exclude_urls: List[str] = []
     ):
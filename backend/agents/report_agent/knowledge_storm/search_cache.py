@@ -0,0 +1,201 @@
+"""
+Shared cache of search results for the retrieval modules in rm.py.
+
+``Retriever.retrieve`` looks every query up here before calling its search
+API, so the same topic researched by several reports only costs one request
+per TTL. Entries are keyed by provider, normalized query, exclude_urls and the
+retriever's cache identity, and expire after a TTL that depends on the
+time_range: results restricted to the last day go stale much sooner than
+unrestricted ones.
+
+A retriever opts in by defining ``cache_key_params()``, returning everything
+that changes what a search returns: endpoint, index or engines, k, filters,
+snippet settings. Retrievers without it (e.g. VectorRM over a private
+collection) are never cached, so one instance cannot be served another's
+results.
+
+The backend is chosen with STORM_SEARCH_CACHE:
+
+- ``disk`` (default): a diskcache directory shared by all processes on the host
+- ``redis``: STORM_SEARCH_CACHE_REDIS_URL, shared by all hosts
+- ``off``: no caching
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STORM_SEARCH_CACHE = os.getenv("STORM_SEARCH_CACHE", "disk")
+STORM_SEARCH_CACHE_DIR = os.getenv(
+    "STORM_SEARCH_CACHE_DIR", "/tmp/deepsight_search_cache"
+)
+STORM_SEARCH_CACHE_SIZE = int(
+    os.getenv("STORM_SEARCH_CACHE_SIZE", str(1024**3))
+)
+STORM_SEARCH_CACHE_REDIS_URL = os.getenv(
+    "STORM_SEARCH_CACHE_REDIS_URL",
+    os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"),
+)
+
+# Seconds a result stays fresh, by the retriever's time_range (None: unrestricted)
+SEARCH_CACHE_TTL = {
+    "day": 60 * 60,
+    "week": 6 * 60 * 60,
+    "month": 24 * 60 * 60,
+    "year": 3 * 24 * 60 * 60,
+    None: int(os.getenv("STORM_SEARCH_CACHE_TTL", str(7 * 24 * 60 * 60))),
+}
+
+KEY_VERSION = "v2"
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def callable_key(fn: Optional[Callable]) -> Optional[str]:
+    """Stable name of a result filter such as is_valid_source, for cache_key_params."""
+    if fn is None:
+        return None
+    return f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', type(fn).__name__)}"
+
+
+def webpage_helper_key(helper) -> Dict[str, Any]:
+    """WebPageHelper settings that change the snippets it extracts."""
+    return {
+        "min_char_count": helper.min_char_count,
+        "snippet_chunk_size": helper.snippet_chunk_size,
+    }
+
+
+def cache_identity(rm) -> Optional[Dict[str, Any]]:
+    """The retriever's cache_key_params(), or None if it does not opt in to caching."""
+    cache_key_params = getattr(rm, "cache_key_params", None)
+    return cache_key_params() if cache_key_params is not None else None
+
+
+class SearchCache(ABC):
+    """Base class: subclasses store serialized result lists with a TTL."""
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, value: str, ttl: int) -> None:
+        pass
+
+    def make_key(self, rm, query: str, exclude_urls: List[str], identity: Dict[str, Any]) -> str:
+        """Key for query; identity is the retriever's cache_identity()."""
+        payload = json.dumps(
+            {
+                "query": normalize_query(query),
+                "exclude_urls": sorted(exclude_urls or []),
+                "identity": identity,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"storm-search:{KEY_VERSION}:{type(rm).__name__}:{digest}"
+
+    def ttl_for(self, rm) -> int:
+        time_range = getattr(rm, "time_range", None)
+        time_range = getattr(time_range, "value", time_range)
+        return SEARCH_CACHE_TTL.get(time_range, SEARCH_CACHE_TTL[None])
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        try:
+            value = self._get(key)
+        except Exception as e:
+            logger.warning(f"Search cache read failed: {e}")
+            return None
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, results: List[dict], ttl: int) -> None:
+        try:
+            self._set(key, json.dumps(results), ttl)
+        except Exception as e:
+            logger.warning(f"Search cache write failed: {e}")
+
+
+class DiskSearchCache(SearchCache):
+    def __init__(self, directory: str = STORM_SEARCH_CACHE_DIR, size_limit: int = STORM_SEARCH_CACHE_SIZE):
+        import diskcache
+
+        self.cache = diskcache.Cache(directory, size_limit=size_limit)
+
+    def _get(self, key):
+        return self.cache.get(key)
+
+    def _set(self, key, value, ttl):
+        self.cache.set(key, value, expire=ttl)
+
+
+class RedisSearchCache(SearchCache):
+    def __init__(self, url: str = STORM_SEARCH_CACHE_REDIS_URL):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def _get(self, key):
+        value = self.client.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def _set(self, key, value, ttl):
+        self.client.setex(key, ttl, value)
+
+
+class SearchCacheStats:
+    """Thread-safe hit/miss counters in the get_usage_and_reset format."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_usage_and_reset(self):
+        with self._lock:
+            usage = {
+                f"{self.provider}.cache_hits": self.hits,
+                f"{self.provider}.cache_misses": self.misses,
+            }
+            self.hits = self.misses = 0
+        return usage
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """The process-wide cache configured by STORM_SEARCH_CACHE, or None when disabled."""
+    global _cache
+    if STORM_SEARCH_CACHE == "off":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    if STORM_SEARCH_CACHE == "redis":
+                        _cache = RedisSearchCache()
+                    else:
+                        _cache = DiskSearchCache()
+                except Exception as e:
+                    logger.warning(f"Search cache unavailable, searching uncached: {e}")
+                    return None
+    return _cache
@@ -3,7 +3,6 @@ import copy
 import logging
 from concurrent.futures import as_completed
 from typing import List, Union, Dict, Any, Optional
-from sentence_transformers import CrossEncoder
 import dspy
 import re
 import torch
@@ -14,6 +13,7 @@ from ...interface import ArticleGenerationModule, Information
 from ...utils import ArticleTextProcessing
 from .enhanced_rag import EnhancedStormInformationTable
 from prompts import import_prompts
+from backend.model_registry import get_cross_encoder
 
 import json
 
@@ -116,17 +116,34 @@ class StormArticleGenerationModule(ArticleGenerationModule):
         self.section_gen = ConvToSection(article_gen_lm)
         self._predict_lock = threading.Lock()
         device = get_device()
-        self.reranker = CrossEncoder(
-            reranker_model_name,
-            device=device,
-            activation_fn=torch.nn.Sigmoid(),
-            trust_remote_code=True,
-        )
+        self.reranker = get_cross_encoder(reranker_model_name, device, owner=self)
         self.rerank_top_k = rerank_top_k
         self.query_logger = None
         self.query_rewrite = dspy.Predict(QueryRewrite)
         self.reranker_threshold = reranker_threshold
 
+    def _prepare_enhanced_table(
+        self, information_table: StormInformationTable
+    ) -> EnhancedStormInformationTable:
+        """
+        Return an enhanced table ready for retrieval, building the vectors and
+        BM25 index only if that has not been done yet. The table shares this
+        module's reranker and _predict_lock.
+        """
+        if isinstance(information_table, EnhancedStormInformationTable):
+            enhanced_table = information_table
+        else:
+            logging.info("Converting standard information table to enhanced table")
+            enhanced_table = EnhancedStormInformationTable(
+                reranker_threshold=self.reranker_threshold,
+                reranker=self.reranker,
+                predict_lock=self._predict_lock,
+            ).from_standard_table(information_table)
+
+        if not enhanced_table.is_prepared:
+            enhanced_table.prepare_table_for_retrieval()
+        return enhanced_table
+
     def generate_section(
         self,
         text_input: str,
@@ -143,17 +160,8 @@ class StormArticleGenerationModule(ArticleGenerationModule):
         """
         logging.info(f"Generating section '{section_name}' using enhanced RAG pipeline")
 
-        # Convert the standard information table to enhanced table if needed
-        if not isinstance(information_table, EnhancedStormInformationTable):
-            logging.info("Converting standard information table to enhanced table")
-            enhanced_table = EnhancedStormInformationTable(
-                reranker_threshold=self.reranker_threshold
-            ).from_standard_table(information_table)
-
-            # Prepare the table for retrieval
-            enhanced_table.prepare_table_for_retrieval()
-        else:
-            enhanced_table = information_table
+        # No-op when called from generate_article, which prepares the table once
+        enhanced_table = self._prepare_enhanced_table(information_table)
 
         # Rewrite the queries to improve retrieval
         logging.info(f"Original search queries: {section_query}")
@@ -219,19 +227,9 @@ class StormArticleGenerationModule(ArticleGenerationModule):
         if topic is None:
             raise ValueError("Topic must be provided for article generation.")
 
-        # If using enhanced RAG, prepare the enhanced information table
-        if not isinstance(information_table, EnhancedStormInformationTable):
-            logging.info(
-                "Converting to enhanced information table for article generation"
-            )
-            enhanced_table = EnhancedStormInformationTable().from_standard_table(
-                information_table
-            )
-
-            enhanced_table.prepare_table_for_retrieval()
-            information_table = enhanced_table
-        else:
-            information_table.prepare_table_for_retrieval()
+        # Build the enhanced table (vectors and BM25 index) once; section
+        # workers share it read-only
+        information_table = self._prepare_enhanced_table(information_table)
 
         if article_with_outline is None:
             # If no outline provided, create a basic article object.
@@ -2,7 +2,8 @@ import logging
 import threading
 from typing import List, Dict, Set, Tuple, Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer, CrossEncoder
+from scipy import sparse
+from sentence_transformers import CrossEncoder
 from rank_bm25 import BM25Okapi
 import torch
 from ...interface import Information
@@ -10,6 +11,7 @@ from ...utils import ArticleTextProcessing
 import torch.nn.functional as F
 import dspy
 
+from backend.model_registry import get_cross_encoder
 from .storm_dataclass import StormInformationTable
 
 
@@ -32,7 +34,14 @@ class EnhancedStormInformationTable(StormInformationTable):
 
     RERANKER_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L6-v2"
 
-    def __init__(self, conversations=None, url_to_info=None, reranker_threshold=0.5):
+    def __init__(
+        self,
+        conversations=None,
+        url_to_info=None,
+        reranker_threshold=0.5,
+        reranker: Optional[CrossEncoder] = None,
+        predict_lock: Optional[threading.Lock] = None,
+    ):
         """
         Initialize the enhanced information table.
 
@@ -40,6 +49,8 @@ class EnhancedStormInformationTable(StormInformationTable):
             conversations: Optional list of conversations to initialize from
             url_to_info: Optional dictionary mapping URLs to Information objects
             reranker_threshold: Minimum score threshold for reranker results (0 to 1)
+            reranker: Optional already-loaded CrossEncoder to use instead of loading one
+            predict_lock: Optional lock to serialize model inference with the reranker's owner
         """
         if conversations:
             super().__init__(conversations)
@@ -52,29 +63,51 @@ class EnhancedStormInformationTable(StormInformationTable):
         self.bm25_index_original = None
         self.bm25_tokenized_original = []
 
+        # Batched retrieval: unit-norm snippet vectors, and BM25 term weights as a
+        # sparse (snippets x vocabulary) matrix with the vocabulary's column index
+        self.normalized_snippets = None
+        self.bm25_term_weights = None
+        self.bm25_vocabulary: Dict[str, int] = {}
+
         # Store reranker threshold
         self.reranker_threshold = reranker_threshold
 
+        # Share the caller's lock so all inference on shared models is serialized
+        if predict_lock is not None:
+            self._predict_lock = predict_lock
+
         # Initialize reranker
-        self.reranker = CrossEncoder(
-            self.RERANKER_MODEL_NAME,
-            device=self._device,
-            activation_fn=torch.nn.Sigmoid(),
-            trust_remote_code=True,
+        self.reranker = reranker or get_cross_encoder(
+            self.RERANKER_MODEL_NAME, self._device, owner=self
         )
 
+        # Set once snippets are encoded and indexed
+        self.is_prepared = False
+
         # Debug info
         self.debug_info = {}
 
     def prepare_table_for_retrieval(self):
         """
         Enhanced preparation that includes both vector encoding and BM25 indexing.
+
+        Once prepared, the table is only read by retrieval and can be shared by
+        concurrent section workers.
         """
         # First do the basic vector preparation from parent class
         super().prepare_table_for_retrieval()
 
         # Reset BM25 collections
         self.bm25_tokenized_original = []
+        self.bm25_index_original = None
+        self.bm25_term_weights = None
+        self.bm25_vocabulary = {}
+        self.normalized_snippets = (
+            F.normalize(self.encoded_snippets, dim=1)
+            if self.collected_snippets
+            else None
+        )
+        self.is_prepared = True
 
         # Ensure we have original snippets
         if not self.collected_snippets:
@@ -92,6 +125,7 @@ class EnhancedStormInformationTable(StormInformationTable):
         ):
             try:
                 self.bm25_index_original = BM25Okapi(self.bm25_tokenized_original)
+                self._build_bm25_term_weights()
                 logging.info(
                     f"Original content BM25 index built successfully with {len(self.bm25_tokenized_original)} documents"
                 )
@@ -101,6 +135,110 @@ class EnhancedStormInformationTable(StormInformationTable):
                 )
                 self.bm25_index_original = None
 
+    def _build_bm25_term_weights(self):
+        """
+        Precompute each snippet's BM25 contribution per term, using the fitted
+        BM25Okapi's idf, k1, b and length statistics, so that BM25 scores for a
+        batch of queries are one sparse matrix product.
+        """
+        bm25 = self.bm25_index_original
+        self.bm25_vocabulary = {term: i for i, term in enumerate(bm25.idf)}
+        rows, cols, weights = [], [], []
+        for doc_idx, (term_freqs, doc_len) in enumerate(
+            zip(bm25.doc_freqs, bm25.doc_len)
+        ):
+            norm = bm25.k1 * (1 - bm25.b + bm25.b * doc_len / bm25.avgdl)
+            for term, tf in term_freqs.items():
+                rows.append(doc_idx)
+                cols.append(self.bm25_vocabulary[term])
+                weights.append(bm25.idf[term] * tf * (bm25.k1 + 1) / (tf + norm))
+        self.bm25_term_weights = sparse.csr_matrix(
+            (weights, (rows, cols)),
+            shape=(len(bm25.doc_freqs), len(self.bm25_vocabulary)),
+        )
+
+    def _batch_vector_search(self, queries: List[str], k: int):
+        """Top-k snippet indices and cosine scores for every query, from one encode call."""
+        self._initialize_encoder()
+        with self._predict_lock:
+            encoded_queries = self.encoder.encode(queries, convert_to_tensor=True)
+        encoded_queries = F.normalize(
+            encoded_queries.to(self.normalized_snippets.device), dim=1
+        )
+        similarities = encoded_queries @ self.normalized_snippets.T
+        top = torch.topk(similarities, k=min(k, similarities.shape[1]), dim=1)
+        return top.indices.cpu().numpy(), top.values.cpu().numpy()
+
+    def _batch_bm25_search(self, queries: List[str], k: int):
+        """Top-k snippet indices and max-normalized BM25 scores for every query."""
+        if self.bm25_term_weights is None:
+            return None, None
+        rows, cols = [], []
+        for query_idx, query in enumerate(queries):
+            for token in query.lower().split():
+                col = self.bm25_vocabulary.get(token)
+                if col is not None:
+                    rows.append(query_idx)
+                    cols.append(col)
+        # Repeated query tokens are summed, as in BM25Okapi.get_scores
+        query_terms = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=(len(queries), len(self.bm25_vocabulary)),
+        )
+        scores = (query_terms @ self.bm25_term_weights.T).toarray()
+        max_scores = scores.max(axis=1, keepdims=True)
+        scores = scores / np.where(max_scores > 0, max_scores, 1.0)
+
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        return (
+            np.take_along_axis(top, order, axis=1),
+            np.take_along_axis(top_scores, order, axis=1),
+        )
+
+    def _fuse_indices(
+        self, vector_idx, vector_scores, bm25_idx, bm25_scores, vector_weight, bm25_weight, k
+    ) -> List[Tuple[int, float]]:
+        """
+        Index-based equivalent of _rank_fusion: snippets are fused per URL, and
+        the Information objects are only built for the final results.
+        """
+        vector_url_to_score, bm25_url_to_score, url_to_idx = {}, {}, {}
+        for idx, score in zip(vector_idx, vector_scores):
+            url = self.collected_urls[idx]
+            if url in self.url_to_info:
+                vector_url_to_score[url] = float(score)
+                url_to_idx[url] = idx
+        for idx, score in zip(bm25_idx, bm25_scores):
+            url = self.collected_urls[idx]
+            if url in self.url_to_info:
+                bm25_url_to_score[url] = float(score)
+                url_to_idx.setdefault(url, idx)  # Prefer the vector hit on overlap
+
+        fused = [
+            (
+                idx,
+                vector_weight * vector_url_to_score.get(url, 0.0)
+                + bm25_weight * bm25_url_to_score.get(url, 0.0),
+            )
+            for url, idx in url_to_idx.items()
+        ]
+        fused.sort(key=lambda x: x[1], reverse=True)
+        return fused[:k]
+
+    def _snippet_info(self, idx: int) -> Information:
+        url = self.collected_urls[idx]
+        original_info = self.url_to_info[url]
+        return Information(
+            url=url,
+            description=original_info.description,
+            snippets=[self.collected_snippets[idx]],
+            title=original_info.title,
+            meta=original_info.meta.copy() if original_info.meta else {},
+        )
+
     def retrieve_information(
         self,
         queries: List[str],
@@ -115,6 +253,10 @@ class EnhancedStormInformationTable(StormInformationTable):
         1. Initial retrieval: Get top-N chunks using hybrid search (vector + BM25)
         2. Rerank: Get top-K chunks using cross-encoder reranking
 
+        All queries are handled together: one encoder call and one matrix product
+        for vector search, one sparse matrix product for BM25, and one
+        cross-encoder batch over every query's candidates.
+
         Args:
             queries: List of search queries
             initial_retrieval_k: Number of chunks to retrieve in initial phase (default 150)
@@ -128,89 +270,83 @@ class EnhancedStormInformationTable(StormInformationTable):
         """
         if not isinstance(queries, list):
             queries = [queries]
+        if not queries or not self.collected_snippets:
+            return []
+        if self.normalized_snippets is None:
+            self.prepare_table_for_retrieval()
 
-        all_results = []
-
-        # Process each query separately
-        for query in queries:
-            # --- Logging Setup ---
-            current_query_log_data = {"queries": [query], "retrieval_steps": {}}
-
-            # Step 1: Initial retrieval using both vector and BM25
-            vector_hits, vector_scores = self._vector_search(
-                query, k=initial_retrieval_k
+        # Step 1: Initial retrieval for all queries at once
+        vector_idx, vector_scores = self._batch_vector_search(
+            queries, k=initial_retrieval_k
+        )
+        bm25_idx, bm25_scores = self._batch_bm25_search(queries, k=initial_retrieval_k)
+        if bm25_idx is None:
+            logging.warning(
+                "BM25 index not prepared. Call prepare_table_for_retrieval first."
             )
-            bm25_hits, bm25_scores = self._bm25_search(query, k=initial_retrieval_k)
 
-            # Log initial retrieval results
-            try:
-                current_query_log_data["retrieval_steps"]["initial_vector"] = [
-                    {"title": info.title, "url": info.url} for info in vector_hits
-                ]
-                current_query_log_data["retrieval_steps"]["initial_bm25"] = [
-                    {"title": info.title, "url": info.url} for info in bm25_hits
-                ]
-            except Exception as e:
-                logging.warning(f"Failed to format initial retrieval log data: {e}")
-
-            # Step 2: Combine results using rank fusion
-            fused_results = self._rank_fusion(
-                query=query,
-                vector_hits=vector_hits,
-                vector_scores=vector_scores,
-                bm25_hits=bm25_hits,
-                bm25_scores=bm25_scores,
+        # Step 2: Combine results per query using rank fusion
+        fused_per_query = [
+            self._fuse_indices(
+                vector_idx[q],
+                vector_scores[q],
+                bm25_idx[q] if bm25_idx is not None else [],
+                bm25_scores[q] if bm25_idx is not None else [],
                 vector_weight=vector_weight,
                 bm25_weight=bm25_weight,
                 k=initial_retrieval_k,
             )
+            for q in range(len(queries))
+        ]
+
+        # Step 3: One cross-encoder batch over the union of candidates; a
+        # (query, url, snippet) pair is scored once however often it appears
+        pair_index: Dict[Tuple[str, int], int] = {}
+        rerank_pairs = []
+        for query, fused in zip(queries, fused_per_query):
+            for idx, _ in fused:
+                if self.collected_snippets[idx] and (query, idx) not in pair_index:
+                    pair_index[(query, idx)] = len(rerank_pairs)
+                    rerank_pairs.append((query, self.collected_snippets[idx]))
+        rerank_scores = []
+        if rerank_pairs:
+            with self._predict_lock:
+                rerank_scores = self.reranker.predict(
+                    rerank_pairs, show_progress_bar=False
+                )
+
+        all_results = []
+        for q, (query, fused) in enumerate(zip(queries, fused_per_query)):
+            scored = [
+                (idx, float(rerank_scores[pair_index[(query, idx)]]))
+                for idx, _ in fused
+                if (query, idx) in pair_index
+            ]
+            if scored:
+                reranked = [
+                    (idx, score)
+                    for idx, score in scored
+                    if score >= self.reranker_threshold
+                ]
+                reranked.sort(key=lambda x: x[1], reverse=True)
+            else:
+                logging.warning(
+                    "No valid candidates with non-empty snippets for reranking."
+                )
+                reranked = fused
+            top = reranked[:final_context_k]
 
-            # Log fusion results
-            try:
-                fusion_log_data = []
-                for info, score in fused_results:
-                    fusion_log_data.append(
-                        {"title": info.title, "url": info.url, "score": float(score)}
-                    )
-                current_query_log_data["retrieval_steps"]["fusion"] = fusion_log_data
-            except Exception as e:
-                logging.warning(f"Failed to format fusion log data: {e}")
-
-            query_results = []
-            # Step 3: Rerank using cross-encoder
-            if len(fused_results) > 0:
-                reranked_results = self._cross_encoder_rerank(query, fused_results)
-
-                # Log reranked results
-                try:
-                    rerank_log_data = []
-                    for info, score in reranked_results[:final_context_k]:
-                        rerank_log_data.append(
-                            {
-                                "title": info.title,
-                                "url": info.url,
-                                "score": float(score),
-                            }
-                        )
-                    current_query_log_data["retrieval_steps"]["rerank"] = (
-                        rerank_log_data
-                    )
-                except Exception as e:
-                    logging.warning(f"Failed to format rerank log data: {e}")
-
-                # Add final top-k results to query_results
-                for info, _ in reranked_results[:final_context_k]:
-                    query_results.append(info)
-
-            # Write log entry
             if query_logger:
-                try:
-                    query_logger.log(current_query_log_data)
-                except Exception as e:
-                    logging.error(f"Failed to log query data for query '{query}': {e}")
+                self._log_query(
+                    query_logger,
+                    query,
+                    vector_idx[q],
+                    bm25_idx[q] if bm25_idx is not None else [],
+                    fused,
+                    top,
+                )
 
-            # Add results from this query to the overall results
-            all_results.extend(query_results)
+            all_results.extend(self._snippet_info(idx) for idx, _ in top)
 
         # Deduplicate results based on URL
         seen_urls = set()
@@ -222,6 +358,38 @@ class EnhancedStormInformationTable(StormInformationTable):
 
         return final_results
 
+    def _log_query(self, query_logger, query, vector_idx, bm25_idx, fused, reranked):
+        """Write the retrieval steps for one query in the QueryLogger format."""
+
+        def describe(idx, score=None):
+            info = self.url_to_info[self.collected_urls[idx]]
+            entry = {"title": info.title, "url": info.url}
+            if score is not None:
+                entry["score"] = float(score)
+            return entry
+
+        try:
+            query_log_data = {
+                "queries": [query],
+                "retrieval_steps": {
+                    "initial_vector": [
+                        describe(idx)
+                        for idx in vector_idx
+                        if self.collected_urls[idx] in self.url_to_info
+                    ],
+                    "initial_bm25": [
+                        describe(idx)
+                        for idx in bm25_idx
+                        if self.collected_urls[idx] in self.url_to_info
+                    ],
+                    "fusion": [describe(idx, score) for idx, score in fused],
+                    "rerank": [describe(idx, score) for idx, score in reranked],
+                },
+            }
+            query_logger.log(query_log_data)
+        except Exception as e:
+            logging.error(f"Failed to log query data for query '{query}': {e}")
+
     def from_standard_table(self, standard_table):
         """
         Convert a standard StormInformationTable to an enhanced one.
@@ -280,7 +448,8 @@ class EnhancedStormInformationTable(StormInformationTable):
         self._initialize_encoder()
 
         # Encode query
-        encoded_query = self.encoder.encode(query, convert_to_tensor=True)
+        with self._predict_lock:
+            encoded_query = self.encoder.encode(query, convert_to_tensor=True)
         encoded_query = encoded_query.to(self.encoded_snippets.device)
 
         # Calculate similarities
@@ -5,10 +5,10 @@ from collections import OrderedDict
 from typing import Union, Optional, Any, List, Tuple, Dict
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import torch
 
+from backend.model_registry import get_sentence_transformer
 from ...interface import Information, InformationTable, Article, ArticleSectionNode
 from ...utils import ArticleTextProcessing, FileIOHelper
 
@@ -88,15 +88,11 @@ class StormInformationTable(InformationTable):
         self.encoded_snippets = None
 
     def _initialize_encoder(self):
-        """Initialize the sentence encoder if not already initialized."""
+        """Initialize the sentence encoder if not already initialized (shared process-wide)."""
         if self.encoder is None:
-            with self._predict_lock:
-                if self.encoder is None:
-                    self.encoder = SentenceTransformer(
-                        self.ENCODER_MODEL_NAME,
-                        trust_remote_code=True,
-                        device=self._device,
-                    )
+            self.encoder = get_sentence_transformer(
+                self.ENCODER_MODEL_NAME, self._device, owner=self
+            )
 
     @staticmethod
     def construct_url_to_info(
@@ -1,6 +1,5 @@
-import concurrent.futures
+import asyncio
 import dspy
-import httpx
 import json
 import logging
 import os
@@ -16,6 +15,7 @@ from tqdm import tqdm
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from trafilatura import extract
 
+from .fetch import get_fetch_layer
 from .lm import LitellmModel
 
 logging.getLogger("httpx").setLevel(logging.WARNING)  # Disable INFO logging for httpx.
@@ -706,10 +706,13 @@ class WebPageHelper:
         Args:
             min_char_count: Minimum character count for the article to be considered valid.
             snippet_chunk_size: Maximum character count for each snippet.
-            max_thread_num: Maximum number of threads to use for concurrent requests (e.g., downloading webpages).
+            max_thread_num: Maximum number of concurrent webpage downloads for this helper.
+
+        Downloads go through the process-wide pooled fetch layer (see fetch.py).
         """
-        self.httpx_client = httpx.Client(verify=False)
+        self.fetch_layer = get_fetch_layer()
         self.min_char_count = min_char_count
+        self.snippet_chunk_size = snippet_chunk_size
         self.max_thread_num = max_thread_num
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=snippet_chunk_size,
@@ -732,21 +735,27 @@ class WebPageHelper:
         )
 
     def download_webpage(self, url: str):
-        try:
-            res = self.httpx_client.get(url, timeout=4)
-            if res.status_code >= 400:
-                res.raise_for_status()
-            return res.content
-        except httpx.HTTPError as exc:
-            print(f"Error while requesting {exc.request.url!r} - {exc!r}")
-            return None
+        return self.fetch_layer.fetch_all([url], timeout=4)[0]
+
+    async def adownload_webpages(self, urls: List[str]) -> List:
+        """Download urls concurrently, at most max_thread_num at a time; failures are None."""
+        semaphore = asyncio.Semaphore(self.max_thread_num)
+
+        async def download(url):
+            async with semaphore:
+                return (await self.fetch_layer.afetch_all([url], timeout=4))[0]
+
+        return await asyncio.gather(*[download(url) for url in urls])
 
     def urls_to_articles(self, urls: List[str]) -> Dict:
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=self.max_thread_num
-        ) as executor:
-            htmls = list(executor.map(self.download_webpage, urls))
+        return self._extract_articles(urls, self.fetch_layer.run(self.adownload_webpages(urls)))
+
+    async def aurls_to_articles(self, urls: List[str]) -> Dict:
+        htmls = await self.adownload_webpages(urls)
+        # trafilatura is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(self._extract_articles, urls, htmls)
 
+    def _extract_articles(self, urls: List[str], htmls: List) -> Dict:
         articles = {}
 
         for h, u in zip(htmls, urls):
@@ -770,6 +779,13 @@ class WebPageHelper:
 
         return articles
 
+    async def aurls_to_snippets(self, urls: List[str]) -> Dict:
+        articles = await self.aurls_to_articles(urls)
+        for u in articles:
+            articles[u]["snippets"] = self.text_splitter.split_text(articles[u]["text"])
+
+        return articles
+
 
 def user_input_appropriateness_check(user_input):
     my_openai_model = LitellmModel(
@@ -2,6 +2,10 @@
 ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with ``uvicorn backend.asgi:application`` so streaming responses run
+on the event loop: chat, the upload/file status and file list SSE streams, and
+MinIO file serving all switch to async iterators for ASGI requests (see
+notebooks.utils.view_mixins.is_asgi_request).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -4,8 +4,9 @@ Celery configuration for Django project.
 
 import os
 import sys
+import threading
 from celery import Celery
-from celery.signals import worker_init
+from celery.signals import celeryd_init, worker_process_init
 from django.conf import settings
 
 # Set the default Django settings module for the 'celery' program.
@@ -71,6 +72,46 @@ app.conf.update(
 )
 
 
+# Set in the prefork parent when models must be warmed up in each child instead
+_warm_up_in_children = False
+
+
+def _forks_children(options) -> bool:
+    pool = (options or {}).get("pool_cls") or app.conf.worker_pool
+    name = pool if isinstance(pool, str) else getattr(pool, "__module__", "")
+    return "prefork" in name or name == "processes"
+
+
+@celeryd_init.connect
+def warm_up_models(options=None, **kwargs):
+    """
+    Preload MODEL_REGISTRY_WARMUP models.
+
+    CPU models are loaded in the parent so prefork children share them. A child
+    cannot use CUDA once it was initialized before the fork, so on GPU hosts
+    the prefork parent leaves warm-up to each child.
+    """
+    global _warm_up_in_children
+    from backend.model_registry import default_device, warm_up
+
+    if _forks_children(options) and default_device() == "cuda":
+        _warm_up_in_children = True
+        return
+    warm_up()
+
+
+@worker_process_init.connect
+def warm_up_models_in_child(**kwargs):
+    """Warm up a prefork child on GPU hosts (see warm_up_models)."""
+    if not _warm_up_in_children:
+        return
+    from backend.model_registry import warm_up
+
+    # The child must report ready within worker_proc_alive_timeout; tasks that
+    # need a model meanwhile wait on the registry's load lock
+    threading.Thread(target=warm_up, name="model-warm-up", daemon=True).start()
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f"Request: {self.request!r}")
@@ -0,0 +1,261 @@
+"""
+Process-wide registry of heavy ML models.
+
+SentenceTransformer, CrossEncoder, CLIP and faster-whisper models are loaded
+once per process and shared by every caller that asks for the same
+(model name, device, dtype) key, instead of each table, processor or service
+loading its own copy.
+
+Callers that keep a model pass ``owner=self``: the model is referenced until
+every owner has been garbage collected. Models nobody references are evicted
+after MODEL_REGISTRY_IDLE_TTL seconds to give the memory back.
+``warm_up`` preloads models when a Celery worker starts, pinned for the
+process lifetime, so tasks do not pay for loading. CPU models are loaded in
+the prefork parent and inherited copy-on-write; on GPU hosts each child loads
+its own, since CUDA does not survive fork (see backend/celery.py).
+
+This module has no Django dependency and imports ML libraries lazily.
+"""
+
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ─────────────────────────────────────────────────────────
+# Seconds an unreferenced model stays loaded; 0 keeps models for the process lifetime
+MODEL_REGISTRY_IDLE_TTL  = float(os.getenv("MODEL_REGISTRY_IDLE_TTL", "900"))
+# Comma-separated models loaded at Celery worker start: sentence_transformer,
+# cross_encoder, clip, whisper
+MODEL_REGISTRY_WARMUP    = os.getenv("MODEL_REGISTRY_WARMUP", "")
+
+SENTENCE_TRANSFORMER_MODEL = "all-mpnet-base-v2"
+CROSS_ENCODER_MODEL        = "cross-encoder/ms-marco-MiniLM-L6-v2"
+CLIP_MODEL                 = "ViT-L-14-quickgelu"
+CLIP_PRETRAINED            = "dfn2b"
+WHISPER_MODEL              = "large-v3-turbo"
+
+
+class ModelKey(NamedTuple):
+    name: str
+    device: str
+    dtype: Optional[str] = None
+
+
+class _Entry:
+    __slots__ = ("model", "refcount", "last_used")
+
+    def __init__(self, model: Any):
+        self.model = model
+        self.refcount = 0
+        self.last_used = time.monotonic()
+
+
+class ModelRegistry:
+    """
+    Thread-safe, lazily populated model cache with reference counting.
+
+    Loads of the same key are serialized so a model is never loaded twice;
+    loads of different keys run in parallel.
+    """
+
+    def __init__(self, idle_ttl: float = MODEL_REGISTRY_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[ModelKey, _Entry] = {}
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+        self._sweeper_pid: Optional[int] = None
+
+    def get(self, key: ModelKey, loader: Callable[[], Any], owner: Any = None) -> Any:
+        """
+        Return the model for key, calling loader() on first use.
+
+        With owner, the model counts as referenced until owner is garbage collected.
+        """
+        entry = self._load(key, loader)
+        with self._lock:
+            entry.last_used = time.monotonic()
+            if owner is not None:
+                entry.refcount += 1
+        if owner is not None:
+            weakref.finalize(owner, self.release, key)
+        return entry.model
+
+    def release(self, key: ModelKey) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.refcount > 0:
+                entry.refcount -= 1
+                entry.last_used = time.monotonic()
+
+    @contextmanager
+    def lease(self, key: ModelKey, loader: Callable[[], Any]):
+        """Hold a reference to the model for the duration of a with block."""
+        entry = self._load(key, loader)
+        with self._lock:
+            entry.refcount += 1
+        try:
+            yield entry.model
+        finally:
+            self.release(key)
+
+    def _load(self, key: ModelKey, loader: Callable[[], Any]) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            started = time.monotonic()
+            model = loader()
+            logger.info("Loaded model %s on %s in %.1fs", key.name, key.device, time.monotonic() - started)
+            entry = _Entry(model)
+            with self._lock:
+                self._entries[key] = entry
+        self._start_sweeper()
+        return entry
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop unreferenced models idle for longer than idle_ttl; returns the number evicted."""
+        if self.idle_ttl <= 0:
+            return 0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [
+                key for key, entry in self._entries.items()
+                if entry.refcount == 0 and now - entry.last_used > self.idle_ttl
+            ]
+            for key in idle:
+                del self._entries[key]
+        if idle:
+            logger.info("Evicted idle models: %s", ", ".join(key.name for key in idle))
+            gc.collect()
+            torch = sys.modules.get("torch")
+            if torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        return len(idle)
+
+    def _start_sweeper(self) -> None:
+        # Threads do not survive fork, so a prefork child starts its own sweeper
+        if self.idle_ttl <= 0 or self._sweeper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+            threading.Thread(target=self._sweep, name="model-registry-sweeper", daemon=True).start()
+
+    def _sweep(self) -> None:
+        interval = max(1.0, min(self.idle_ttl / 2, 60.0))
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.warning("Model eviction failed: %s", e)
+
+    def __contains__(self, key: ModelKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+model_registry = ModelRegistry()
+
+
+def default_device() -> str:
+    """Same policy as the existing call sites: CUDA when available, otherwise CPU."""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda"
+    except ImportError:
+        pass
+    return "cpu"
+
+
+# ─── Shared loaders ────────────────────────────────────────────────────────
+def get_sentence_transformer(name: str = SENTENCE_TRANSFORMER_MODEL, device: Optional[str] = None, owner: Any = None):
+    device = device or default_device()
+
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(name, trust_remote_code=True, device=device)
+
+    return model_registry.get(ModelKey(name, device), load, owner=owner)
+
+
+def get_cross_encoder(name: str = CROSS_ENCODER_MODEL, device: Optional[str] = None, owner: Any = None):
+    """CrossEncoder with a sigmoid activation, so scores are in [0, 1]."""
+    device = device or default_device()
+
+    def load():
+        import torch
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(name, device=device, activation_fn=torch.nn.Sigmoid(), trust_remote_code=True)
+
+    return model_registry.get(ModelKey(name, device, "sigmoid"), load, owner=owner)
+
+
+def get_clip_model(device: str, loader: Callable[[], Any], owner: Any = None):
+    """(model, preprocess, device) for the image deduplication CLIP model on an already resolved device."""
+    return model_registry.get(ModelKey(f"open_clip:{CLIP_MODEL}/{CLIP_PRETRAINED}", device), loader, owner=owner)
+
+
+def get_whisper_model(name: str = WHISPER_MODEL, device: Optional[str] = None, owner: Any = None):
+    """faster-whisper model; it only supports CUDA and CPU (float16 on CUDA, int8 on CPU)."""
+    device = "cuda" if (device or default_device()) == "cuda" else "cpu"
+    compute_type = "float16" if device == "cuda" else "int8"
+
+    def load():
+        from faster_whisper import WhisperModel
+        return WhisperModel(name, device=device, compute_type=compute_type)
+
+    return model_registry.get(ModelKey(f"faster_whisper:{name}", device, compute_type), load, owner=owner)
+
+
+def _warm_clip(owner: Any = None):
+    from notebooks.utils.image_processing import load_clip_model_and_preprocessing
+    load_clip_model_and_preprocessing(owner=owner)
+
+
+# Warmed models are owned by this object, which lives as long as the process,
+# so they are never evicted
+_WARM_OWNER = type("_WarmOwner", (), {})()
+
+WARMUP_LOADERS: Dict[str, Callable[..., Any]] = {
+    "sentence_transformer": get_sentence_transformer,
+    "cross_encoder": get_cross_encoder,
+    "clip": _warm_clip,
+    "whisper": get_whisper_model,
+}
+
+
+def warm_up(names: Optional[Iterable[str]] = None) -> None:
+    """Load the named models (default: MODEL_REGISTRY_WARMUP) so first requests do not pay for it."""
+    if names is None:
+        names = [name.strip() for name in MODEL_REGISTRY_WARMUP.split(",") if name.strip()]
+    for name in names:
+        loader = WARMUP_LOADERS.get(name)
+        if loader is None:
+            logger.warning("Unknown model %r in MODEL_REGISTRY_WARMUP", name)
+            continue
+        try:
+            loader(owner=_WARM_OWNER)
+        except Exception as e:
+            logger.warning("Warm-up of %s failed: %s", name, e)
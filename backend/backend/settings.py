@@ -241,6 +241,31 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 
+# Notebook file change feed (redis pub/sub on the broker; "local" for a single process)
+NOTEBOOKS_CHANGE_FEED_BACKEND = os.getenv("NOTEBOOKS_CHANGE_FEED_BACKEND", "redis")
+NOTEBOOKS_CHANGE_FEED_REDIS_URL = os.getenv("NOTEBOOKS_CHANGE_FEED_REDIS_URL", CELERY_BROKER_URL)
+
+# Resident marker PDF converter service (python manage.py run_pdf_converter)
+NOTEBOOKS_PDF_CONVERTER_ADDRESS = os.getenv(
+    "NOTEBOOKS_PDF_CONVERTER_ADDRESS", str(BASE_DIR / "pdf_converter.sock")
+)
+# Shared secret for the converter socket; the service and its clients stay disabled until it is set
+NOTEBOOKS_PDF_CONVERTER_AUTHKEY = os.getenv("NOTEBOOKS_PDF_CONVERTER_AUTHKEY", "")
+# Seconds an upload task waits for one conversion before converting in-process
+NOTEBOOKS_PDF_CONVERTER_TIMEOUT = int(os.getenv("NOTEBOOKS_PDF_CONVERTER_TIMEOUT", "900"))
+NOTEBOOKS_PDF_CONVERTER_WORKERS = int(os.getenv("NOTEBOOKS_PDF_CONVERTER_WORKERS", "1"))
+NOTEBOOKS_PDF_PAGE_SHARD_SIZE = int(os.getenv("NOTEBOOKS_PDF_PAGE_SHARD_SIZE", "20"))
+NOTEBOOKS_PDF_PAGE_WORKERS = int(os.getenv("NOTEBOOKS_PDF_PAGE_WORKERS", "4"))
+
+# Streaming uploads (temp-file chunk size and MinIO multipart part size, in bytes)
+NOTEBOOKS_UPLOAD_CHUNK_SIZE = int(os.getenv("NOTEBOOKS_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+NOTEBOOKS_MINIO_PART_SIZE = int(os.getenv("NOTEBOOKS_MINIO_PART_SIZE", str(16 * 1024 * 1024)))
+NOTEBOOKS_DOWNLOAD_CHUNK_SIZE = int(os.getenv("NOTEBOOKS_DOWNLOAD_CHUNK_SIZE", str(256 * 1024)))
+
+# Image caption generation (concurrent OpenAI vision requests per task)
+NOTEBOOKS_CAPTION_CONCURRENCY = int(os.getenv("NOTEBOOKS_CAPTION_CONCURRENCY", "8"))
+NOTEBOOKS_CAPTION_MAX_RETRIES = int(os.getenv("NOTEBOOKS_CAPTION_MAX_RETRIES", "3"))
+
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_ORG = os.getenv("OPENAI_ORG")
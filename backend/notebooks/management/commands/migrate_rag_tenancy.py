@@ -0,0 +1,160 @@
+"""
+Copy per-user RAG collections (user_files_<id>) into the shared partition-key
+collection used when RAG_TENANCY_MODE=partition_key.
+
+Rows are upserted by primary key, so the command can be re-run safely. Source
+collections are only dropped with --drop-source, and only once the shared
+collection holds at least as many vectors for that user as the source did.
+Chunk manifests (KnowledgeBaseItem.rag_manifest) naming a migrated collection
+are pointed at the shared one, so re-ingests and deletes find the copied rows.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from pymilvus import Collection, DataType, utility
+
+from notebooks.models import KnowledgeBaseItem
+from rag.rag import BASE_COLLECTION, RAG_TENANCY_MODE, SHARED_COLLECTION, user_filter
+from rag.vector_store import connect, ensure_partitioned_collection, invalidate_vector_store
+
+
+class Command(BaseCommand):
+    help = "Migrate per-user Milvus collections into the shared user_id partition-key collection"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the collections that would be migrated without copying anything',
+        )
+        parser.add_argument(
+            '--collection',
+            action='append',
+            default=None,
+            help='Only migrate this collection (may be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows read and upserted per batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--drop-source',
+            action='store_true',
+            help='Drop each source collection after its rows are verified in the shared collection',
+        )
+
+    def handle(self, *args, **options):
+        connect()
+        if RAG_TENANCY_MODE != "partition_key":
+            self.stdout.write(self.style.WARNING(
+                "RAG_TENANCY_MODE is not 'partition_key'; migrated data will not be read until it is"
+            ))
+
+        prefix = f"{BASE_COLLECTION}_"
+        sources = [
+            name for name in utility.list_collections()
+            if name.startswith(prefix) and name != SHARED_COLLECTION
+        ]
+        if options['collection']:
+            sources = [name for name in sources if name in options['collection']]
+
+        self.stdout.write(f"Found {len(sources)} per-user collections to migrate into '{SHARED_COLLECTION}'")
+        if not sources:
+            return
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("DRY RUN - No changes will be made"))
+            for name in sources:
+                self.stdout.write(f"Would migrate: {name} ({Collection(name).num_entities} vectors)")
+            return
+
+        ensure_partitioned_collection(SHARED_COLLECTION)
+        shared = Collection(SHARED_COLLECTION)
+        shared_dim = self._vector_field(shared).params['dim']
+
+        migrated, failed = 0, 0
+        for name in sources:
+            try:
+                copied = self._migrate_collection(name, shared, shared_dim, prefix, options)
+                migrated += 1
+                self.stdout.write(self.style.SUCCESS(f"Migrated {name}: {copied} vectors"))
+            except CommandError as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"Skipped {name}: {e}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Migration completed: {migrated} migrated, {failed} skipped"))
+
+    def _vector_field(self, collection):
+        for field in collection.schema.fields:
+            if field.dtype == DataType.FLOAT_VECTOR:
+                return field
+        raise CommandError(f"{collection.name} has no float vector field")
+
+    def _migrate_collection(self, name, shared, shared_dim, prefix, options) -> int:
+        source = Collection(name)
+        field_names = {field.name for field in source.schema.fields}
+        vector_field = self._vector_field(source)
+        if 'text' not in field_names:
+            raise CommandError("legacy schema without a text field; re-ingest this user's files instead")
+        if vector_field.params['dim'] != shared_dim:
+            raise CommandError(f"vector dimension {vector_field.params['dim']} does not match {shared_dim}")
+
+        primary_field = source.schema.primary_field.name
+        output_fields = [primary_field, 'text', vector_field.name] + [
+            field for field in ('user_id', 'source', 'kb_item_id') if field in field_names
+        ]
+        default_user_id = name[len(prefix):]
+
+        source.load()
+        source_count = source.num_entities
+        copied = 0
+        user_ids = set()
+        iterator = source.query_iterator(batch_size=options['batch_size'], output_fields=output_fields)
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                batch = []
+                for row in rows:
+                    user_id = str(row.get('user_id') or default_user_id)
+                    user_ids.add(user_id)
+                    batch.append({
+                        'pk': str(row[primary_field]),
+                        'text': row['text'],
+                        'vector': row[vector_field.name],
+                        'user_id': user_id,
+                        'source': str(row.get('source') or ''),
+                        'kb_item_id': str(row.get('kb_item_id') or ''),
+                    })
+                shared.upsert(batch)
+                copied += len(batch)
+        finally:
+            iterator.close()
+        shared.flush()
+        self._repoint_manifests(name)
+
+        if options['drop_source']:
+            stored = 0
+            for user_id in user_ids:
+                result = shared.query(expr=user_filter(user_id), output_fields=['count(*)'])
+                stored += int(result[0]['count(*)']) if result else 0
+            if stored < source_count:
+                raise CommandError(f"only {stored} of {source_count} vectors found after copy; source kept")
+            utility.drop_collection(name)
+            invalidate_vector_store(name)
+            self.stdout.write(f"Dropped {name}")
+
+        return copied
+
+    def _repoint_manifests(self, name) -> int:
+        """Point chunk manifests at the shared collection; chunk IDs are kept by the copy."""
+        updated = 0
+        for kb_item in KnowledgeBaseItem.objects.filter(rag_manifest__collection=name).only('id', 'rag_manifest'):
+            manifest = dict(kb_item.rag_manifest, collection=SHARED_COLLECTION)
+            # update() rather than save(): no signals, updated_at unchanged
+            updated += KnowledgeBaseItem.objects.filter(pk=kb_item.pk).update(rag_manifest=manifest)
+        if updated:
+            self.stdout.write(f"Updated {updated} chunk manifest(s) for {name}")
+        return updated
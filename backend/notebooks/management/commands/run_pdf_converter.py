@@ -0,0 +1,90 @@
+"""
+Django management command to run the resident marker PDF conversion service.
+"""
+
+from django.core.management.base import BaseCommand
+
+from notebooks.processors.pdf_conversion_service import (
+    PdfConversionPool,
+    PdfConversionServer,
+    PdfConversionClient,
+)
+from notebooks.utils.helpers import config
+
+
+class Command(BaseCommand):
+    help = 'Run a long-lived PDF conversion service that keeps marker models loaded'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=config.PDF_CONVERTER_WORKERS,
+            help='Number of resident marker converters (one process each)',
+        )
+        parser.add_argument(
+            '--address',
+            type=str,
+            default=config.PDF_CONVERTER_ADDRESS,
+            help='Unix socket path to listen on',
+        )
+        parser.add_argument(
+            '--device',
+            type=str,
+            default=None,
+            help='Torch device for marker (cuda, mps or cpu); auto-detected by default',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print the running service stats (queue depth, workers) and exit',
+        )
+
+    def handle(self, *args, **options):
+        address = options['address']
+        if not address:
+            self.stderr.write(self.style.ERROR('NOTEBOOKS_PDF_CONVERTER_ADDRESS is not configured'))
+            return
+
+        if not config.PDF_CONVERTER_AUTHKEY:
+            self.stderr.write(self.style.ERROR(
+                'NOTEBOOKS_PDF_CONVERTER_AUTHKEY is not configured; set it to a random secret '
+                'shared by the service and the Celery workers'
+            ))
+            return
+        authkey = config.PDF_CONVERTER_AUTHKEY.encode('utf-8')
+
+        if options['stats']:
+            client = PdfConversionClient(address, authkey)
+            if not client.is_available():
+                self.stderr.write(self.style.ERROR(f'No PDF conversion service at {address}'))
+                return
+            for key, value in client.stats().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+
+        device = options['device'] or self._detect_device()
+        self.stdout.write(f"Starting {options['workers']} marker converter(s) on {device}")
+
+        pool = PdfConversionPool(workers=options['workers'], device=device)
+        pool.warm_up()
+        self.stdout.write(self.style.SUCCESS(f'✓ PDF conversion service ready on {address}'))
+
+        server = PdfConversionServer(pool, address, authkey)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Shutting down PDF conversion service')
+        finally:
+            pool.shutdown()
+
+    def _detect_device(self):
+        try:
+            import torch
+            if torch.cuda.is_available():
+                return 'cuda'
+            if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
+                return 'mps'
+        except ImportError:
+            pass
+        return 'cpu'
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-16 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebooks', '0010_remove_source_needs_processing_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='knowledgebaseitem',
+            name='rag_manifest',
+            field=models.JSONField(blank=True, default=dict, help_text='RAG chunk manifest: collection, source and (chunk id, content hash) pairs'),
+        ),
+    ]
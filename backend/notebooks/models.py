@@ -221,6 +221,11 @@ class KnowledgeBaseItem(models.Model):
         default=dict,
         help_text="File metadata stored in database (replaces file system metadata)"
     )
+    rag_manifest = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="RAG chunk manifest: collection, source and (chunk id, content hash) pairs",
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -54,12 +54,12 @@ class FileProcessor:
     
     @property 
     def whisper_model(self):
-        """Lazy load whisper model."""
+        """Lazy load whisper model, shared through the process-wide model registry."""
         if self._whisper_model is None:
             try:
-                import faster_whisper
+                from backend.model_registry import get_whisper_model
                 device = self._detect_device()
-                self._whisper_model = faster_whisper.WhisperModel("large-v3-turbo", device=device)
+                self._whisper_model = get_whisper_model(device=device, owner=self)
                 self.logger.info(f"Loaded Whisper model on {device}")
             except ImportError:
                 self.logger.warning("faster-whisper not available")
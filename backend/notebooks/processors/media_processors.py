@@ -85,12 +85,12 @@ class MediaProcessor:
 
     @property
     def whisper_model(self):
-        """Lazy load whisper model."""
+        """Lazy load whisper model, shared through the process-wide model registry."""
         if self._whisper_model is None:
             try:
-                import faster_whisper
+                from backend.model_registry import get_whisper_model
                 device = self._detect_device()
-                self._whisper_model = faster_whisper.WhisperModel("large-v3-turbo", device=device)
+                self._whisper_model = get_whisper_model(device=device, owner=self)
                 self.logger.info(f"Loaded Whisper model on {device}")
             except ImportError:
                 self.logger.warning("faster-whisper not available")
@@ -238,7 +238,7 @@ class MediaProcessor:
             # Import the image processing functions
             from ..utils.image_processing import load_clip_model_and_preprocessing
             
-            self._clip_model, self._clip_preprocess, self._device = load_clip_model_and_preprocessing(device)
+            self._clip_model, self._clip_preprocess, self._device = load_clip_model_and_preprocessing(device, owner=self)
             self.logger.info(f"CLIP model loaded successfully for image deduplication on device: {self._device}")
         except Exception as e:
             self.logger.error(f"Failed to load CLIP model: {e}")
@@ -252,7 +252,8 @@ class MediaProcessor:
         pixel_threshold: Optional[int] = None,
         sequential_deep_threshold: Optional[float] = None,
         global_deep_threshold: Optional[float] = None,
-        min_words: Optional[int] = None
+        min_words: Optional[int] = None,
+        global_deep_method: Optional[str] = None
     ) -> Dict[str, Any]:
         """Build extraction options dictionary from individual parameters with validation."""
         
@@ -262,7 +263,8 @@ class MediaProcessor:
             "pixel_threshold": 3,
             "sequential_deep_threshold": 0.8,
             "global_deep_threshold": 0.85,
-            "min_words": 5
+            "min_words": 5,
+            "global_deep_method": "exact"
         }
         
         options = {}
@@ -298,6 +300,12 @@ class MediaProcessor:
             if min_words != SYSTEM_DEFAULTS["min_words"]:
                 options["min_words"] = min_words
         
+        if global_deep_method is not None:
+            if global_deep_method not in ("exact", "ann"):
+                raise ValueError("global_deep_method must be 'exact' or 'ann'")
+            if global_deep_method != SYSTEM_DEFAULTS["global_deep_method"]:
+                options["global_deep_method"] = global_deep_method
+        
         # If no custom options, return None to use system defaults
         return options if options else None
 
@@ -334,11 +342,14 @@ class MediaProcessor:
             "pixel_threshold": 3,
             "sequential_deep_threshold": 0.8,
             "global_deep_threshold": 0.85,
+            "global_deep_method": "exact",
             "device": None,
             "caption_prompt": "Look at the image and do the following in one sentences: Focus more on important numbers or text shown in the image (such as signs, titles, or numbers), and briefly summarize the key points from the text. Give your answer in one clear sentences. Add a tag at the end if you find <chart> or <table> in the image.",
             "ocr_lang": "en",
             "ocr_gpu": True,
             "min_words": 5,
+            "embedding_batch_size": 32,
+            "decode_workers": 4,
             **(extraction_options or {})
         }
 
@@ -402,6 +413,15 @@ class MediaProcessor:
             logs_pix_global, logs_deep_seq, logs_deep_global, logs_text_ocr = [], [], [], []
             removed_pix_global, removed_deep_seq, removed_deep_global, removed_text_ocr = 0, 0, 0, 0
 
+            # CLIP embeddings keyed by image hash, shared by both deep passes so
+            # each frame is encoded once per run
+            embedding_cache = {}
+            embedding_options = {
+                "batch_size": options["embedding_batch_size"],
+                "decode_workers": options["decode_workers"],
+                "embedding_cache": embedding_cache,
+            }
+
             # Step 4a: Global pixel deduplication
             self.logger.info("Running global pixel-based deduplication...")
             removed_pix_global, logs_pix_global = global_pixel_dedupe(temp_dedup_dir, options["pixel_threshold"])
@@ -409,13 +429,16 @@ class MediaProcessor:
             # Step 4b: Sequential deep deduplication
             self.logger.info("Running sequential deep deduplication...")
             removed_deep_seq, logs_deep_seq = sequential_deep_dedupe(
-                temp_dedup_dir, options["sequential_deep_threshold"], self._device, self._clip_model, self._clip_preprocess
+                temp_dedup_dir, options["sequential_deep_threshold"], self._device, self._clip_model, self._clip_preprocess,
+                **embedding_options
             )
 
             # Step 4c: Global deep deduplication
             self.logger.info("Running global deep deduplication...")
             removed_deep_global, logs_deep_global = global_deep_dedupe(
-                temp_dedup_dir, options["global_deep_threshold"], self._device, self._clip_model, self._clip_preprocess
+                temp_dedup_dir, options["global_deep_threshold"], self._device, self._clip_model, self._clip_preprocess,
+                method=options["global_deep_method"],
+                **embedding_options
             )
 
             # Step 4d: Text-based filtering
@@ -526,6 +549,7 @@ class MediaProcessor:
                 "pixel_threshold": options.get('pixel_threshold', 3),
                 "sequential_deep_threshold": options.get('sequential_deep_threshold', 0.8),
                 "global_deep_threshold": options.get('global_deep_threshold', 0.85),
+                "global_deep_method": options.get('global_deep_method', 'exact'),
                 "min_words": options.get('min_words', 5),
                 "enable_ocr_filter": options.get('enable_ocr_filter', True),
                 "enable_global_pixel_dedupe": options.get('enable_global_pixel_dedupe', True),
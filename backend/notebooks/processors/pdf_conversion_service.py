@@ -0,0 +1,343 @@
+"""
+Long-lived marker PDF conversion service.
+
+Loading the marker models (``create_model_dict()``) takes several seconds, and
+Celery children are recycled every ``worker_max_tasks_per_child`` tasks. This
+module keeps a configurable number of converters resident in a process pool
+and serves conversion jobs over a local socket, so upload tasks only pay the
+conversion cost itself.
+
+Run the service with ``python manage.py run_pdf_converter``. Upload tasks use
+it automatically when ``NOTEBOOKS_PDF_CONVERTER_ADDRESS`` is reachable and fall
+back to in-process conversion otherwise.
+
+Messages on the socket are pickled, so the service only runs with a
+``NOTEBOOKS_PDF_CONVERTER_AUTHKEY`` secret configured and its socket is only
+accessible to the owning user.
+"""
+
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Converter held by each pool worker process (set by _init_worker)
+_worker_converter = None
+
+
+def build_marker_converter(use_gpu: bool = False):
+    """Build a marker PdfConverter with markdown output, or None if marker is missing."""
+    from .upload_processor import get_marker_imports
+
+    marker_imports = get_marker_imports()
+    if not marker_imports.get('available'):
+        return None
+
+    ConfigParser = marker_imports['ConfigParser']
+    config_parser = ConfigParser({"output_format": "markdown", "use_gpu": use_gpu})
+    return marker_imports['PdfConverter'](
+        config=config_parser.generate_config_dict(),
+        processor_list=config_parser.get_processors(),
+        renderer=config_parser.get_renderer(),
+        artifact_dict=marker_imports['create_model_dict'](),
+    )
+
+
+def _init_worker(device: str):
+    """Pool initializer: load the marker models once per worker process."""
+    global _worker_converter
+    os.environ["TORCH_DEVICE"] = device
+    start_time = time.time()
+    _worker_converter = build_marker_converter(use_gpu=device in ('cuda', 'mps'))
+    logger.info(
+        f"PDF converter worker {os.getpid()} ready on {device} "
+        f"in {time.time() - start_time:.2f}s"
+    )
+
+
+def _convert_in_worker(
+    file_path: str, output_dir: str, page_range: Optional[Tuple[int, int]] = None
+) -> Dict[str, Any]:
+    """
+    Convert a PDF with the resident converter and write marker output to output_dir.
+
+    page_range is a half-open (start, end) range of zero-based page indices; when
+    given only those pages are converted.
+    """
+    if _worker_converter is None:
+        raise RuntimeError("marker converter is not available in this worker")
+
+    from marker.output import save_output
+
+    start_time = time.time()
+    # Each worker process runs one job at a time, so swapping the page range on
+    # the resident converter's config is safe here.
+    previous_range = _worker_converter.config.get('page_range')
+    if page_range is not None:
+        _worker_converter.config['page_range'] = list(range(*page_range))
+    try:
+        rendered = _worker_converter(str(file_path))
+    finally:
+        _worker_converter.config['page_range'] = previous_range
+    content = rendered.markdown if hasattr(rendered, 'markdown') else str(rendered)
+    save_output(rendered, output_dir, "markdown")
+    return {
+        'content': content,
+        'output_dir': output_dir,
+        'page_range': page_range,
+        'duration': time.time() - start_time,
+        'worker_pid': os.getpid(),
+    }
+
+
+def split_page_ranges(page_count: int, shard_size: int) -> List[Tuple[int, int]]:
+    """Split page_count pages into consecutive half-open (start, end) ranges."""
+    shard_size = max(1, int(shard_size))
+    return [
+        (start, min(start + shard_size, page_count))
+        for start in range(0, page_count, shard_size)
+    ]
+
+
+def extract_text_range(file_path: str, start: int, end: int) -> str:
+    """Extract plain text for pages [start, end) with PyMuPDF (process-pool safe)."""
+    import fitz
+
+    parts = []
+    with fitz.open(file_path) as doc:
+        for page_num in range(start, min(end, doc.page_count)):
+            parts.append(f"\n=== Page {page_num + 1} ===\n")
+            parts.append(doc[page_num].get_text())
+    return "".join(parts)
+
+
+class PdfConversionPool:
+    """Process pool whose workers each keep a warm marker converter."""
+
+    def __init__(self, workers: int = 1, device: str = 'cpu'):
+        self.workers = max(1, int(workers))
+        self.device = device
+        self._executor = self._new_executor()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._restarts = 0
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.device,),
+        )
+
+    def _replace_broken(self, executor: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """
+        Replace executor if it is still the current one and return the current executor.
+
+        A worker that dies (e.g. OOM-killed on a large PDF) breaks the whole
+        ProcessPoolExecutor; without a new one every later job would fail too.
+        """
+        with self._lock:
+            if self._executor is executor:
+                logger.warning("PDF conversion pool broken, starting new workers")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._new_executor()
+                self._restarts += 1
+            return self._executor
+
+    def _on_done(self, executor, future):
+        error = future.exception()
+        with self._lock:
+            self._pending -= 1
+            if error is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+        if isinstance(error, BrokenProcessPool):
+            self._replace_broken(executor)
+
+    def submit(self, file_path: str, output_dir: str, page_range: Optional[Tuple[int, int]] = None):
+        """Queue a conversion job and return its future."""
+        with self._lock:
+            self._pending += 1
+            executor = self._executor
+        try:
+            future = executor.submit(_convert_in_worker, file_path, output_dir, page_range)
+        except BrokenProcessPool:
+            executor = self._replace_broken(executor)
+            try:
+                future = executor.submit(_convert_in_worker, file_path, output_dir, page_range)
+            except Exception:
+                with self._lock:
+                    self._pending -= 1
+                raise
+        future.add_done_callback(functools.partial(self._on_done, executor))
+        return future
+
+    def convert(
+        self,
+        file_path: str,
+        output_dir: str,
+        page_range: Optional[Tuple[int, int]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Convert a PDF (or one page range of it) and block until the result is available."""
+        return self.submit(file_path, output_dir, page_range).result(timeout=timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs submitted but not yet finished beyond the resident workers."""
+        with self._lock:
+            return max(0, self._pending - self.workers)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool size and job counters."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'device': self.device,
+                'in_flight': self._pending,
+                'queue_depth': max(0, self._pending - self.workers),
+                'completed': self._completed,
+                'failed': self._failed,
+                'restarts': self._restarts,
+            }
+
+    def warm_up(self):
+        """Force every worker process to start and load its models."""
+        futures = [self._executor.submit(os.getpid) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class PdfConversionServer:
+    """Serve PdfConversionPool jobs over a local socket (one thread per connection)."""
+
+    def __init__(self, pool: PdfConversionPool, address: str, authkey: bytes):
+        if not authkey:
+            raise ValueError("PDF conversion service requires NOTEBOOKS_PDF_CONVERTER_AUTHKEY")
+        self.pool = pool
+        self.address = address
+        self.authkey = authkey
+        self._listener = None
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        # Create the socket owner-only; connecting to it needs write permission
+        previous_umask = os.umask(0o177)
+        try:
+            self._listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        finally:
+            os.umask(previous_umask)
+        os.chmod(self.address, 0o600)
+        logger.info(f"PDF conversion service listening on {self.address}")
+        try:
+            while True:
+                conn = self._listener.accept()
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+
+    def _handle(self, conn):
+        try:
+            request = conn.recv()
+            op = request.get('op')
+            if op == 'convert':
+                page_range = request.get('page_range')
+                result = self.pool.convert(
+                    request['file_path'],
+                    request['output_dir'],
+                    tuple(page_range) if page_range else None,
+                )
+                conn.send({'success': True, 'result': result})
+            elif op == 'stats':
+                conn.send({'success': True, 'result': self.pool.stats()})
+            else:
+                conn.send({'success': False, 'error': f"Unknown operation: {op}"})
+        except Exception as e:
+            logger.error(f"PDF conversion request failed: {e}")
+            try:
+                conn.send({'success': False, 'error': str(e)})
+            except Exception:
+                pass
+        finally:
+            conn.close()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class PdfConversionClient:
+    """Client used by upload tasks to submit jobs to the conversion service."""
+
+    # Seconds to wait for a stats reply
+    STATS_TIMEOUT = 10
+
+    def __init__(self, address: str, authkey: bytes, timeout: float = 900):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+
+    def is_available(self) -> bool:
+        return bool(self.address) and bool(self.authkey) and os.path.exists(self.address)
+
+    def _request(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        timeout = self.timeout if timeout is None else timeout
+        conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+        try:
+            conn.send(payload)
+            if not conn.poll(timeout):
+                raise TimeoutError(f"PDF conversion service did not reply within {timeout}s")
+            response = conn.recv()
+        finally:
+            conn.close()
+        if not response.get('success'):
+            raise RuntimeError(response.get('error', 'PDF conversion service error'))
+        return response['result']
+
+    def convert(
+        self, file_path: str, output_dir: str, page_range: Optional[Tuple[int, int]] = None
+    ) -> Dict[str, Any]:
+        """Convert file_path, writing marker output into output_dir (must be on local disk)."""
+        return self._request({
+            'op': 'convert',
+            'file_path': os.path.abspath(file_path),
+            'output_dir': os.path.abspath(output_dir),
+            'page_range': page_range,
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request({'op': 'stats'}, timeout=self.STATS_TIMEOUT)
+
+
+def get_pdf_conversion_client() -> Optional[PdfConversionClient]:
+    """Return a client for the configured service, or None if it is not running."""
+    try:
+        from ..utils.helpers import config
+    except ImportError:
+        return None
+
+    address = getattr(config, 'PDF_CONVERTER_ADDRESS', None)
+    authkey = getattr(config, 'PDF_CONVERTER_AUTHKEY', '')
+    if not address or not authkey:
+        return None
+    client = PdfConversionClient(
+        address, authkey.encode('utf-8'), timeout=getattr(config, 'PDF_CONVERTER_TIMEOUT', 900)
+    )
+    return client if client.is_available() else None
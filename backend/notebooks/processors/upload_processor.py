@@ -11,7 +11,11 @@ import asyncio
 import logging
 import time
 import re
-from typing import Dict, Any, Optional
+import hashlib
+import threading
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 from datetime import datetime, timezone
 
@@ -28,6 +32,8 @@ from django.core.exceptions import ValidationError
 try:
     from ..utils.storage import FileStorageService
     from ..utils.helpers import ContentIndexingService, config as settings, clean_title
+    from ..utils.extraction_cache import get_extraction_cache
+    from ..utils.upload_status import get_upload_status_store
     from ..utils.validators import FileValidator
     # Import caption generation dependencies
     from reports.image_utils import extract_figure_data_from_markdown
@@ -39,9 +45,13 @@ except ImportError:
     FileValidator = None
     settings = None
     clean_title = None
+    get_extraction_cache = None
+    get_upload_status_store = None
     extract_figure_data_from_markdown = None
     generate_caption_for_image = None
 
+from .pdf_conversion_service import split_page_ranges, extract_text_range
+
 # Marker imports with lazy loading
 marker_imports = {}
 
@@ -69,6 +79,13 @@ def get_marker_imports():
     return marker_imports
 
 
+# Marker converter shared by every UploadProcessor in this process. Tasks build a
+# new UploadProcessor per upload, so caching on the instance reloaded the models
+# for every PDF.
+_shared_marker_converter = None
+_shared_marker_lock = threading.Lock()
+
+
 class UploadProcessor:
     """Handles immediate processing of uploaded files with MinIO storage only."""
 
@@ -82,13 +99,16 @@ class UploadProcessor:
             ContentIndexingService() if ContentIndexingService else None
         )
         self.validator = FileValidator() if FileValidator else None
+        self.extraction_cache = get_extraction_cache() if get_extraction_cache else None
 
         # Initialize whisper model lazily
         self._whisper_model = None
         self._marker_models = None
         
-        # Track upload statuses in memory (in production, use Redis or database)
+        # Statuses of uploads processed by this instance; every update is also
+        # written to the shared store, which other processes read
         self._upload_statuses = {}
+        self.status_store = get_upload_status_store() if get_upload_status_store else None
 
     def log_operation(self, operation: str, details: str = "", level: str = "info"):
         """Log service operations with consistent formatting."""
@@ -179,6 +199,20 @@ class UploadProcessor:
     @property
     def pdf_processor(self):
         """Lazy load marker PDF processor with proper device configuration."""
+        global _shared_marker_converter
+        if self._marker_models is None and _shared_marker_converter is not None:
+            self._marker_models = _shared_marker_converter
+        if self._marker_models is None:
+            with _shared_marker_lock:
+                if _shared_marker_converter is None:
+                    self._load_marker_converter()
+                    _shared_marker_converter = self._marker_models
+                else:
+                    self._marker_models = _shared_marker_converter
+        return self._marker_models
+
+    def _load_marker_converter(self):
+        """Build the marker PdfConverter for this process."""
         if self._marker_models is None:
             try:
                 marker_imports = get_marker_imports()
@@ -236,11 +270,10 @@ class UploadProcessor:
             except ImportError as e:
                 self.log_operation("pdf_processor_import_error", f"marker package not available: {e}", "warning")
                 self._marker_models = None
-        return self._marker_models
     
     @property
     def whisper_model(self):
-        """Lazy load faster-whisper model."""
+        """Lazy load faster-whisper model, shared through the process-wide model registry."""
         if self._whisper_model is None:
             try:
                 # Suppress known semaphore tracker warnings on macOS
@@ -249,15 +282,15 @@ class UploadProcessor:
                 if sys.platform == "darwin":  # macOS
                     warnings.filterwarnings("ignore", message=".*semaphore_tracker.*", category=UserWarning)
                 
-                import torch
-                from faster_whisper import WhisperModel, BatchedInferencePipeline
+                from faster_whisper import BatchedInferencePipeline
+                from backend.model_registry import get_whisper_model
                 
                 device = self._get_device()
                 compute_type = "float16" if device == "cuda" else "int8"  # Use int8 for CPU to save memory
                 
                 self.log_operation("faster_whisper_device_selected", f"Selected device: {device} (faster-whisper only supports CUDA and CPU)")
                 
-                self._whisper_model = WhisperModel("large-v3-turbo", device=device, compute_type=compute_type)
+                self._whisper_model = get_whisper_model(device=device, owner=self)
                 # Create batched model for better performance
                 self._batched_model = BatchedInferencePipeline(model=self._whisper_model)
                 
@@ -341,6 +374,12 @@ class UploadProcessor:
             if upload_file_id in self._upload_statuses:
                 return self._upload_statuses[upload_file_id]
 
+            # Uploads processed by a Celery worker report through the shared store
+            if self.status_store:
+                status = self.status_store.get(upload_file_id)
+                if status:
+                    return status
+
             # Check if file is already processed and stored
             if self.file_storage:
                 file_metadata = self.file_storage.get_file_by_upload_id(
@@ -370,6 +409,8 @@ class UploadProcessor:
             # Remove from in-memory tracking
             if upload_file_id in self._upload_statuses:
                 del self._upload_statuses[upload_file_id]
+            if self.status_store:
+                self.status_store.delete(upload_file_id)
 
             # Delete from storage
             if self.file_storage:
@@ -402,6 +443,8 @@ class UploadProcessor:
                 }
             )
             self._upload_statuses[upload_file_id] = current_status
+            if self.status_store:
+                self.status_store.set(upload_file_id, current_status)
 
     async def process_upload(
         self,
@@ -440,7 +483,7 @@ class UploadProcessor:
                 )
 
             # Save file temporarily
-            temp_path = self._save_uploaded_file(file)
+            temp_path, file_hash = self._save_uploaded_file(file)
 
             # Additional content validation
             content_validation = self.validator.validate_file_content(temp_path)
@@ -483,8 +526,23 @@ class UploadProcessor:
             if hasattr(file, '_source_url') and file._source_url:
                 file_metadata["source_url"] = file._source_url
 
-            # Process based on file type
-            processing_result = await self._process_file_by_type(temp_path, file_metadata)
+            from asgiref.sync import sync_to_async
+
+            # Reuse a cached extraction of identical bytes, otherwise process based on file type
+            file_metadata["file_hash"] = file_hash
+            processing_result = None
+            if self.extraction_cache:
+                lookup_sync = sync_to_async(self.extraction_cache.lookup, thread_sensitive=False)
+                manifest = await lookup_sync(file_hash, file_metadata["file_extension"])
+                if manifest:
+                    processing_result = self.extraction_cache.build_processing_result(manifest, clean_base_name)
+                    self.log_operation("extraction_cache_hit", f"Skipping conversion of {clean_filename}")
+
+            if processing_result is None:
+                processing_result = await self._process_file_by_type(temp_path, file_metadata)
+                if self.extraction_cache:
+                    store_cache_sync = sync_to_async(self.extraction_cache.store, thread_sensitive=False)
+                    await store_cache_sync(file_hash, file_metadata["file_extension"], processing_result)
 
             # Update file metadata with parsing status
             file_metadata["parsing_status"] = "completed"
@@ -502,8 +560,6 @@ class UploadProcessor:
 
             # Run synchronous file storage in executor
             # Use thread_sensitive=False to run in thread pool where sync ORM calls are allowed
-            from asgiref.sync import sync_to_async
-            
             if not self.file_storage:
                 raise Exception("MinIO file storage service not available")
                 
@@ -585,30 +641,45 @@ class UploadProcessor:
             self.log_operation("process_upload_error", str(e), "error")
             raise Exception(f"Processing failed: {str(e)}")
 
-    def _save_uploaded_file(self, file: UploadFile) -> str:
-        """Save uploaded file to temporary directory."""
+    def _save_uploaded_file(self, file: UploadFile) -> Tuple[str, str]:
+        """
+        Stream an uploaded file to a temporary file chunk by chunk.
+
+        The SHA-256 of the raw bytes is computed in the same pass, so peak memory
+        stays at one chunk regardless of upload size. Returns (temp_path, sha256).
+        """
         try:
             suffix = Path(file.name).suffix.lower()
+            sha256 = hashlib.sha256()
+            total_size = 0
             with tempfile.NamedTemporaryFile(
                 delete=False, suffix=suffix, prefix="deepsight_minio_"
             ) as tmp_file:
-                content = file.read()
+                if hasattr(file, 'seek'):
+                    file.seek(0)
 
-                # Reset file pointer for potential future reads
-                file.seek(0)
+                for chunk in file.chunks(chunk_size=settings.UPLOAD_CHUNK_SIZE):
+                    total_size += len(chunk)
 
-                # Additional size check
-                if len(content) > self.validator.max_file_size:
-                    os.unlink(tmp_file.name)
-                    raise ValueError(
-                        f"File size {len(content) / (1024 * 1024):.1f}MB exceeds maximum allowed size"
-                    )
+                    # Additional size check
+                    if total_size > self.validator.max_file_size:
+                        tmp_file.close()
+                        os.unlink(tmp_file.name)
+                        raise ValueError(
+                            f"File size {total_size / (1024 * 1024):.1f}MB exceeds maximum allowed size"
+                        )
+
+                    sha256.update(chunk)
+                    tmp_file.write(chunk)
 
-                tmp_file.write(content)
                 tmp_file.flush()
 
-                self.log_operation("save_file", f"Saved {file.name} to {tmp_file.name}")
-                return tmp_file.name
+                # Reset file pointer for potential future reads
+                if hasattr(file, 'seek'):
+                    file.seek(0)
+
+                self.log_operation("save_file", f"Saved {file.name} to {tmp_file.name} ({total_size} bytes)")
+                return tmp_file.name, sha256.hexdigest()
 
         except Exception as e:
             self.log_operation(
@@ -653,18 +724,25 @@ class UploadProcessor:
             self.log_operation("pdf_marker_start", f"Starting marker processing of {file_path}")
             start_time = time.time()
 
-            # Get the marker PDF processor (already configured with GPU if available)
-            pdf_processor = self.pdf_processor
-            if not pdf_processor:
-                # Fallback to PyMuPDF if marker processor failed to load
-                return self._process_pdf_pymupdf_fallback(file_path, file_metadata)
-
             # Generate clean filename for PDF
             original_filename = file_metadata.get('filename', 'document')
             # Remove file extension
             base_title = original_filename.rsplit('.', 1)[0] if '.' in original_filename else original_filename
             clean_pdf_title = clean_title(base_title)
 
+            # Prefer the resident conversion service so this worker does not load marker models
+            temp_marker_dir = self._convert_pdf_with_service(file_path, file_metadata)
+            if temp_marker_dir:
+                return self._build_marker_result(
+                    file_path, temp_marker_dir, clean_pdf_title, start_time
+                )
+
+            # Get the marker PDF processor (already configured with GPU if available)
+            pdf_processor = self.pdf_processor
+            if not pdf_processor:
+                # Fallback to PyMuPDF if marker processor failed to load
+                return self._process_pdf_pymupdf_fallback(file_path, file_metadata)
+
             # Convert the PDF to markdown using marker (this generates images directly)
             rendered = pdf_processor(str(file_path))
 
@@ -672,7 +750,6 @@ class UploadProcessor:
             content = rendered.text_content if hasattr(rendered, 'text_content') else str(rendered)
 
             # Save the original marker output to temporary directory for later processing
-            temp_marker_dir = None
             try:
                 temp_marker_dir = tempfile.mkdtemp(suffix='_marker_output')
                 from marker.output import save_output
@@ -699,63 +776,200 @@ class UploadProcessor:
                     self.log_operation("pdf_marker_save_error", f"Failed to save marker output: {save_error}", "error")
                     temp_marker_dir = None
 
-            # Get basic PDF metadata using PyMuPDF for metadata extraction
-            try:
-                if fitz:
-                    doc = fitz.open(file_path)
-                    pdf_metadata = {
-                        'page_count': doc.page_count,
-                        'title': doc.metadata.get('title', ''),
-                        'author': doc.metadata.get('author', ''),
-                        'creation_date': doc.metadata.get('creationDate', ''),
-                        'modification_date': doc.metadata.get('modDate', ''),
-                        'processing_method': 'marker',
-                        'has_marker_extraction': temp_marker_dir is not None
-                    }
-                    doc.close()
-                else:
-                    pdf_metadata = {
-                        'processing_method': 'marker',
-                        'has_marker_extraction': temp_marker_dir is not None
-                    }
-            except Exception as e:
-                self.log_operation("pdf_metadata_warning", f"Could not extract PDF metadata: {e}", "warning")
+            return self._build_marker_result(file_path, temp_marker_dir, clean_pdf_title, start_time)
+
+        except Exception as e:
+            self.log_operation("pdf_marker_error", f"Marker processing failed: {e}", "warning")
+            # Fallback to PyMuPDF if marker fails
+            return self._process_pdf_pymupdf_fallback(file_path, file_metadata)
+
+    def _convert_pdf_with_service(self, file_path: str, file_metadata: Dict) -> Optional[str]:
+        """
+        Convert a PDF with the resident conversion service if it is running.
+
+        Documents longer than one page shard are split into page ranges that the
+        service's workers convert in parallel. Returns the temporary directory holding
+        the marker output, or None when the service is unavailable or the job failed
+        (callers then convert in-process).
+        """
+        try:
+            from .pdf_conversion_service import get_pdf_conversion_client
+            client = get_pdf_conversion_client()
+        except ImportError:
+            client = None
+        if not client:
+            return None
+
+        try:
+            page_count = self._get_pdf_page_count(file_path)
+            service_workers = client.stats().get('workers', 1)
+            page_ranges = split_page_ranges(page_count, settings.PDF_PAGE_SHARD_SIZE) if page_count else []
+            if len(page_ranges) > 1 and service_workers > 1:
+                return self._convert_pdf_sharded(
+                    client, file_path, file_metadata, page_ranges, service_workers
+                )
+        except Exception as e:
+            self.log_operation("pdf_marker_shard_warning", f"Page-sharded conversion failed, converting whole document: {e}", "warning")
+
+        temp_marker_dir = tempfile.mkdtemp(suffix='_marker_output')
+        try:
+            service_result = client.convert(file_path, temp_marker_dir)
+            self.log_operation(
+                "pdf_marker_service",
+                f"Converted {file_path} in resident worker {service_result.get('worker_pid')} "
+                f"in {service_result.get('duration', 0):.2f}s",
+            )
+            return temp_marker_dir
+        except Exception as e:
+            self.log_operation("pdf_marker_service_warning", f"Conversion service failed, converting in-process: {e}", "warning")
+            shutil.rmtree(temp_marker_dir, ignore_errors=True)
+            return None
+
+    def _convert_pdf_sharded(
+        self,
+        client,
+        file_path: str,
+        file_metadata: Dict,
+        page_ranges: List[Tuple[int, int]],
+        max_workers: int,
+    ) -> str:
+        """
+        Convert page ranges concurrently through the conversion service and merge them.
+
+        Shard markdown is assembled in page order into a single markdown.md, and shard
+        images are moved next to it (renamed on collision).
+        """
+        page_count = page_ranges[-1][1]
+        shard_dirs = [tempfile.mkdtemp(suffix=f'_marker_shard_{idx}') for idx in range(len(page_ranges))]
+        temp_marker_dir = tempfile.mkdtemp(suffix='_marker_output')
+        try:
+            pages_done = 0
+            self._report_page_progress(file_metadata, pages_done, page_count)
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(page_ranges))) as executor:
+                futures = {
+                    executor.submit(client.convert, file_path, shard_dirs[idx], page_range): idx
+                    for idx, page_range in enumerate(page_ranges)
+                }
+                for future in as_completed(futures):
+                    future.result()
+                    start, end = page_ranges[futures[future]]
+                    pages_done += end - start
+                    self._report_page_progress(file_metadata, pages_done, page_count)
+
+            markdown_parts = []
+            for idx, shard_dir in enumerate(shard_dirs):
+                shard_markdown = ""
+                renamed = {}
+                for root, _, files in os.walk(shard_dir):
+                    for name in files:
+                        source_file = os.path.join(root, name)
+                        if name.endswith('.md'):
+                            with open(source_file, 'r', encoding='utf-8') as f:
+                                shard_markdown = f.read()
+                        elif not name.endswith('.json'):
+                            target_name = name
+                            if os.path.exists(os.path.join(temp_marker_dir, target_name)):
+                                target_name = f"shard{idx}_{name}"
+                                renamed[name] = target_name
+                            shutil.move(source_file, os.path.join(temp_marker_dir, target_name))
+                for old_name, new_name in renamed.items():
+                    shard_markdown = shard_markdown.replace(f"]({old_name})", f"]({new_name})")
+                markdown_parts.append(shard_markdown)
+
+            with open(os.path.join(temp_marker_dir, "markdown.md"), 'w', encoding='utf-8') as f:
+                f.write("\n\n".join(markdown_parts))
+
+            self.log_operation(
+                "pdf_marker_sharded",
+                f"Converted {page_count} pages of {file_path} in {len(page_ranges)} shards",
+            )
+            return temp_marker_dir
+        except Exception:
+            shutil.rmtree(temp_marker_dir, ignore_errors=True)
+            raise
+        finally:
+            for shard_dir in shard_dirs:
+                shutil.rmtree(shard_dir, ignore_errors=True)
+
+    def _get_pdf_page_count(self, file_path: str) -> int:
+        """Return the PDF page count, or 0 if PyMuPDF cannot read it."""
+        if not fitz:
+            return 0
+        try:
+            with fitz.open(file_path) as doc:
+                return doc.page_count
+        except Exception:
+            return 0
+
+    def _report_page_progress(self, file_metadata: Dict, pages_done: int, page_count: int):
+        """Publish per-page extraction progress to the upload status."""
+        if not page_count:
+            return
+        self._update_upload_status(
+            file_metadata.get('upload_file_id'),
+            "processing",
+            pages_processed=pages_done,
+            page_count=page_count,
+            progress=f"Extracted {pages_done} of {page_count} pages",
+            progress_percentage=int(pages_done * 100 / page_count),
+        )
+
+    def _build_marker_result(
+        self, file_path: str, temp_marker_dir: Optional[str], clean_pdf_title: str, start_time: float
+    ) -> Dict[str, Any]:
+        """Build the processing result for a marker conversion stored in temp_marker_dir."""
+        # Get basic PDF metadata using PyMuPDF for metadata extraction
+        try:
+            if fitz:
+                doc = fitz.open(file_path)
                 pdf_metadata = {
+                    'page_count': doc.page_count,
+                    'title': doc.metadata.get('title', ''),
+                    'author': doc.metadata.get('author', ''),
+                    'creation_date': doc.metadata.get('creationDate', ''),
+                    'modification_date': doc.metadata.get('modDate', ''),
                     'processing_method': 'marker',
-                    'metadata_error': str(e),
                     'has_marker_extraction': temp_marker_dir is not None
                 }
+                doc.close()
+            else:
+                pdf_metadata = {
+                    'processing_method': 'marker',
+                    'has_marker_extraction': temp_marker_dir is not None
+                }
+        except Exception as e:
+            self.log_operation("pdf_metadata_warning", f"Could not extract PDF metadata: {e}", "warning")
+            pdf_metadata = {
+                'processing_method': 'marker',
+                'metadata_error': str(e),
+                'has_marker_extraction': temp_marker_dir is not None
+            }
 
-            # For marker PDFs, we don't store content separately since marker files contain everything
-            summary_content = ""
-
-            end_time = time.time()
-            duration = end_time - start_time
-            self.log_operation("pdf_marker_completed", f"Marker processing completed in {duration:.2f} seconds")
+        # For marker PDFs, we don't store content separately since marker files contain everything
+        summary_content = ""
 
-            result = {
-                'content': summary_content,
-                'content_filename': f"{clean_pdf_title}.md", 
-                'metadata': pdf_metadata,
-                'features_available': ['advanced_pdf_extraction', 'figure_extraction', 'table_extraction', 'formula_extraction', 'layout_analysis'],
-                'processing_time': f'{duration:.2f}s',
-                'skip_content_file': True  # Flag to skip creating extracted_content.md since marker provides better content
-            }
+        end_time = time.time()
+        duration = end_time - start_time
+        self.log_operation("pdf_marker_completed", f"Marker processing completed in {duration:.2f} seconds")
 
-            # Add marker extraction result for post-processing
-            if temp_marker_dir:
-                result['marker_extraction_result'] = {
-                    'success': True,
-                    'temp_marker_dir': temp_marker_dir,
-                    'clean_title': clean_pdf_title
-                }
+        result = {
+            'content': summary_content,
+            'content_filename': f"{clean_pdf_title}.md", 
+            'metadata': pdf_metadata,
+            'features_available': ['advanced_pdf_extraction', 'figure_extraction', 'table_extraction', 'formula_extraction', 'layout_analysis'],
+            'processing_time': f'{duration:.2f}s',
+            'skip_content_file': True  # Flag to skip creating extracted_content.md since marker provides better content
+        }
 
-            return result
+        # Add marker extraction result for post-processing
+        if temp_marker_dir:
+            result['marker_extraction_result'] = {
+                'success': True,
+                'temp_marker_dir': temp_marker_dir,
+                'clean_title': clean_pdf_title
+            }
 
-        except Exception as e:
-            self.log_operation("pdf_marker_error", f"Marker processing failed: {e}", "warning")
-            # Fallback to PyMuPDF if marker fails
-            return self._process_pdf_pymupdf_fallback(file_path, file_metadata)
+        return result
 
     def _process_pdf_pymupdf_fallback(self, file_path: str, file_metadata: Dict) -> Dict[str, Any]:
         """Fallback PDF text extraction using PyMuPDF when marker is not available."""
@@ -766,7 +980,6 @@ class UploadProcessor:
                 raise Exception("PyMuPDF (fitz) is not available")
 
             doc = fitz.open(file_path)
-            content = ""
 
             # Extract basic metadata
             pdf_metadata = {
@@ -777,16 +990,13 @@ class UploadProcessor:
                 'modification_date': doc.metadata.get('modDate', ''),
                 'processing_method': 'pymupdf_fallback'
             }
-
-            # Extract text from all pages
-            for page_num in range(doc.page_count):
-                page = doc[page_num]
-                content += f"\n=== Page {page_num + 1} ===\n"
-                page_text = page.get_text()
-                content += page_text
-
+            page_count = doc.page_count
             doc.close()
 
+            # Extract text page range by page range and assemble in order
+            page_ranges = split_page_ranges(page_count, settings.PDF_PAGE_SHARD_SIZE)
+            content = "".join(self._extract_pdf_text_ranges(file_path, file_metadata, page_ranges))
+
             # Check if content extraction was successful
             if not content.strip():
                 content = f"PDF document '{file_metadata['filename']}' appears to be image-based or empty. Text extraction may require OCR processing."
@@ -805,6 +1015,43 @@ class UploadProcessor:
         except Exception as e:
             raise Exception(f"PDF processing failed: {str(e)}")
 
+    def _extract_pdf_text_ranges(
+        self, file_path: str, file_metadata: Dict, page_ranges: List[Tuple[int, int]]
+    ) -> List[str]:
+        """
+        Extract text for each page range, fanning out across a process pool when the
+        document spans several shards. Returns the per-range text in page order.
+        """
+        page_count = page_ranges[-1][1] if page_ranges else 0
+        parts = [""] * len(page_ranges)
+        pages_done = 0
+
+        workers = min(settings.PDF_PAGE_WORKERS, len(page_ranges))
+        if workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = {
+                        executor.submit(extract_text_range, file_path, start, end): idx
+                        for idx, (start, end) in enumerate(page_ranges)
+                    }
+                    for future in as_completed(futures):
+                        idx = futures[future]
+                        parts[idx] = future.result()
+                        start, end = page_ranges[idx]
+                        pages_done += end - start
+                        self._report_page_progress(file_metadata, pages_done, page_count)
+                return parts
+            except Exception as e:
+                # Daemonic Celery children cannot always start subprocesses
+                self.log_operation("pdf_page_pool_warning", f"Page pool unavailable, extracting serially: {e}", "warning")
+                pages_done = 0
+
+        for idx, (start, end) in enumerate(page_ranges):
+            parts[idx] = extract_text_range(file_path, start, end)
+            pages_done += end - start
+            self._report_page_progress(file_metadata, pages_done, page_count)
+        return parts
+
     async def _process_audio_immediate(
         self, file_path: str, file_metadata: Dict
     ) -> Dict[str, Any]:
@@ -1253,8 +1500,9 @@ class UploadProcessor:
                 return
 
             temp_marker_dir = marker_extraction_result.get("temp_marker_dir")
+            cached_files = marker_extraction_result.get("cached_files")
 
-            if not temp_marker_dir or not os.path.exists(temp_marker_dir):
+            if not cached_files and (not temp_marker_dir or not os.path.exists(temp_marker_dir)):
                 return
 
             # Get the MinIO storage service
@@ -1280,151 +1528,159 @@ class UploadProcessor:
                 image_files = []
                 markdown_content = None  # Store markdown content for figure name extraction
                 
-                for root, _, files in os.walk(temp_marker_dir):
-                    for file in files:
-                        source_file = os.path.join(root, file)
+                for entry in self._marker_output_entries(marker_extraction_result):
+                    file = entry['name']
                         
-                        # Skip all JSON metadata files generated by marker-pdf
-                        if file.endswith('.json'):
-                            continue
+                    # Skip all JSON metadata files generated by marker-pdf
+                    if file.endswith('.json'):
+                        continue
                         
-                        # Read file content
-                        with open(source_file, 'rb') as f:
+                    # Read file content (cached objects are copied in MinIO, only markdown is read back)
+                    if entry.get('path'):
+                        with open(entry['path'], 'rb') as f:
                             file_content = f.read()
+                    elif file.endswith('.md'):
+                        file_content = self.file_storage.minio_backend.get_file(entry['cache_key']) or b''
+                    else:
+                        file_content = None
+                    file_size = len(file_content) if file_content is not None else entry.get('size', 0)
                         
-                        # Determine file type and store in appropriate MinIO prefix
-                        if file.endswith(('.md', '.json')):
-                            # Content files go to 'kb' prefix
-                            if file.endswith('.md'):
-                                # For any markdown file (from marker_single or marker_pdf), use clean title
-                                target_filename = f"{clean_title}.md"
-                            else:
-                                target_filename = file
-                            
-                            # Store in MinIO using file ID structure
-                            object_key = self.file_storage.minio_backend.save_file_with_auto_key(
-                                content=file_content,
-                                filename=target_filename,
-                                prefix="kb",
-                                content_type="text/markdown" if file.endswith('.md') else "application/json",
-                                metadata={
-                                    'kb_item_id': str(kb_item.id),
-                                    'user_id': str(kb_item.user.id),
-                                    'file_type': 'marker_content',
-                                    'marker_original_file': file,
-                                },
-                                user_id=str(kb_item.user.id),
-                                file_id=str(kb_item.id)
-                            )
-                            
-                            content_files.append({
-                                'original_filename': file,
-                                'target_filename': target_filename,
-                                'object_key': object_key
-                            })
-                            
-                            # Update the knowledge base item's file_object_key if this is a markdown file
-                            if file.endswith('.md'):
-                                kb_item.file_object_key = object_key
-                                # Also store markdown content inline for RAG system compatibility
-                                markdown_content = file_content.decode('utf-8', errors='ignore')
-                                kb_item.content = markdown_content
-                                
-                        elif file.endswith(('.jpg', '.jpeg', '.png', '.gif', '.svg')):
-                            # Image files go to kb folder with file ID structure in images subfolder
-                            target_filename = file
-                            
-                            # Determine content type
-                            import mimetypes
-                            content_type, _ = mimetypes.guess_type(target_filename)
-                            content_type = content_type or 'application/octet-stream'
-                            
-                            # Create KnowledgeBaseImage record first to get ID
-                            from ..models import KnowledgeBaseImage
-                            
-                            # Process images without figure names
-                            
-                            # Create a temporary record to get the ID
-                            kb_image = KnowledgeBaseImage(
-                                knowledge_base_item=kb_item,
-                                image_caption="",  # Will be filled later if caption data is available
-                                content_type=content_type,
-                                file_size=len(file_content),
-                                image_metadata={
-                                    'original_filename': target_filename,
-                                    'file_size': len(file_content),
-                                    'content_type': content_type,
-                                    'kb_item_id': str(kb_item.id),
-                                    'source': 'marker_extraction',
-                                    'marker_original_file': file,
-                                }
-                            )
-                            
-                            # Store in MinIO using file ID structure with images subfolder and UUID
-                            object_key = self.file_storage.minio_backend.save_file_with_auto_key(
-                                content=file_content,
-                                filename=target_filename,
-                                prefix="kb",
-                                content_type=content_type,
-                                metadata={
-                                    'kb_item_id': str(kb_item.id),
-                                    'user_id': str(kb_item.user.id),
-                                    'file_type': 'marker_image',
-                                    'marker_original_file': file,
-                                },
-                                user_id=str(kb_item.user.id),
-                                file_id=str(kb_item.id),
-                                subfolder="images",
-                                subfolder_uuid=str(kb_image.id)
-                            )
-                            
-                            # Now set the object key and save the record
-                            try:
-                                kb_image.minio_object_key = object_key
-                                kb_image.save()
-                                
-                                self.log_operation(
-                                    "marker_image_db_created", 
-                                    f"Created KnowledgeBaseImage record: id={kb_image.id}, object_key={object_key}"
-                                )
-                                
-                            except Exception as e:
-                                self.log_operation(
-                                    "marker_image_db_error", 
-                                    f"Failed to create KnowledgeBaseImage record for {target_filename}: {str(e)}", 
-                                    "error"
-                            )
-                            
-                            image_files.append({
-                                'original_filename': file,
-                                'target_filename': target_filename,
-                                'object_key': object_key
-                            })
-                            
+                    # Determine file type and store in appropriate MinIO prefix
+                    if file.endswith(('.md', '.json')):
+                        # Content files go to 'kb' prefix
+                        if file.endswith('.md'):
+                            # For any markdown file (from marker_single or marker_pdf), use clean title
+                            target_filename = f"{clean_title}.md"
                         else:
-                            # Other files go to 'kb' prefix as content
                             target_filename = file
+                        
+                        # Store in MinIO using file ID structure
+                        object_key = self._save_marker_object(
+                            entry,
+                            file_content,
+                            filename=target_filename,
+                            prefix="kb",
+                            content_type="text/markdown" if file.endswith('.md') else "application/json",
+                            metadata={
+                                'kb_item_id': str(kb_item.id),
+                                'user_id': str(kb_item.user.id),
+                                'file_type': 'marker_content',
+                                'marker_original_file': file,
+                            },
+                            user_id=str(kb_item.user.id),
+                            file_id=str(kb_item.id)
+                        )
+                        
+                        content_files.append({
+                            'original_filename': file,
+                            'target_filename': target_filename,
+                            'object_key': object_key
+                        })
+                        
+                        # Update the knowledge base item's file_object_key if this is a markdown file
+                        if file.endswith('.md'):
+                            kb_item.file_object_key = object_key
+                            # Also store markdown content inline for RAG system compatibility
+                            markdown_content = file_content.decode('utf-8', errors='ignore')
+                            kb_item.content = markdown_content
                             
-                            # Store in MinIO using file ID structure
-                            object_key = self.file_storage.minio_backend.save_file_with_auto_key(
-                                content=file_content,
-                                filename=target_filename,
-                                prefix="kb",
-                                metadata={
-                                    'kb_item_id': str(kb_item.id),
-                                    'user_id': str(kb_item.user.id),
-                                    'file_type': 'marker_other',
-                                    'marker_original_file': file,
-                                },
-                                user_id=str(kb_item.user.id),
-                                file_id=str(kb_item.id)
+                    elif file.endswith(('.jpg', '.jpeg', '.png', '.gif', '.svg')):
+                        # Image files go to kb folder with file ID structure in images subfolder
+                        target_filename = file
+                        
+                        # Determine content type
+                        import mimetypes
+                        content_type, _ = mimetypes.guess_type(target_filename)
+                        content_type = content_type or 'application/octet-stream'
+                        
+                        # Create KnowledgeBaseImage record first to get ID
+                        from ..models import KnowledgeBaseImage
+                        
+                        # Process images without figure names
+                        
+                        # Create a temporary record to get the ID
+                        kb_image = KnowledgeBaseImage(
+                            knowledge_base_item=kb_item,
+                            image_caption="",  # Will be filled later if caption data is available
+                            content_type=content_type,
+                            file_size=file_size,
+                            image_metadata={
+                                'original_filename': target_filename,
+                                'file_size': file_size,
+                                'content_type': content_type,
+                                'kb_item_id': str(kb_item.id),
+                                'source': 'marker_extraction',
+                                'marker_original_file': file,
+                            }
+                        )
+                        
+                        # Store in MinIO using file ID structure with images subfolder and UUID
+                        object_key = self._save_marker_object(
+                            entry,
+                            file_content,
+                            filename=target_filename,
+                            prefix="kb",
+                            content_type=content_type,
+                            metadata={
+                                'kb_item_id': str(kb_item.id),
+                                'user_id': str(kb_item.user.id),
+                                'file_type': 'marker_image',
+                                'marker_original_file': file,
+                            },
+                            user_id=str(kb_item.user.id),
+                            file_id=str(kb_item.id),
+                            subfolder="images",
+                            subfolder_uuid=str(kb_image.id)
+                        )
+                        
+                        # Now set the object key and save the record
+                        try:
+                            kb_image.minio_object_key = object_key
+                            kb_image.save()
+                            
+                            self.log_operation(
+                                "marker_image_db_created", 
+                                f"Created KnowledgeBaseImage record: id={kb_image.id}, object_key={object_key}"
                             )
                             
-                            content_files.append({
-                                'original_filename': file,
-                                'target_filename': target_filename,
-                                'object_key': object_key
-                            })
+                        except Exception as e:
+                            self.log_operation(
+                                "marker_image_db_error", 
+                                f"Failed to create KnowledgeBaseImage record for {target_filename}: {str(e)}", 
+                                "error"
+                        )
+                        
+                        image_files.append({
+                            'original_filename': file,
+                            'target_filename': target_filename,
+                            'object_key': object_key
+                        })
+                        
+                    else:
+                        # Other files go to 'kb' prefix as content
+                        target_filename = file
+                        
+                        # Store in MinIO using file ID structure
+                        object_key = self._save_marker_object(
+                            entry,
+                            file_content,
+                            filename=target_filename,
+                            prefix="kb",
+                            metadata={
+                                'kb_item_id': str(kb_item.id),
+                                'user_id': str(kb_item.user.id),
+                                'file_type': 'marker_other',
+                                'marker_original_file': file,
+                            },
+                            user_id=str(kb_item.user.id),
+                            file_id=str(kb_item.id)
+                        )
+                        
+                        content_files.append({
+                            'original_filename': file,
+                            'target_filename': target_filename,
+                            'object_key': object_key
+                        })
                 
                 # Update the knowledge base item's metadata with MinIO object keys
                 if not kb_item.file_metadata:
@@ -1493,12 +1749,13 @@ class UploadProcessor:
                     self.log_operation("marker_image_files_minio", f"Image files stored: {image_file_names}")
                 
                 # Clean up the now-empty temp directory
-                try:
-                    import shutil
-                    shutil.rmtree(temp_marker_dir)
-                    self.log_operation("marker_cleanup", f"Cleaned up temporary directory: {temp_marker_dir}")
-                except Exception as cleanup_error:
-                    self.log_operation("marker_cleanup_warning", f"Could not clean up temp marker directory: {cleanup_error}", "warning")
+                if temp_marker_dir:
+                    try:
+                        import shutil
+                        shutil.rmtree(temp_marker_dir)
+                        self.log_operation("marker_cleanup", f"Cleaned up temporary directory: {temp_marker_dir}")
+                    except Exception as cleanup_error:
+                        self.log_operation("marker_cleanup_warning", f"Could not clean up temp marker directory: {cleanup_error}", "warning")
                     
             except Exception as e:
                 self.log_operation("marker_extraction_minio_error", f"MinIO storage error while processing file_id {file_id}: {e}", "error")
@@ -1514,6 +1771,48 @@ class UploadProcessor:
                 except Exception as cleanup_error:
                     self.log_operation("marker_cleanup_warning", f"Could not clean up temp marker directory: {cleanup_error}", "warning")
 
+    def _marker_output_entries(self, marker_extraction_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        List marker output files as entries with either a local 'path' (fresh
+        conversion) or a 'cache_key' (extraction cache hit).
+        """
+        cached_files = marker_extraction_result.get("cached_files")
+        if cached_files:
+            return list(cached_files)
+
+        entries = []
+        temp_marker_dir = marker_extraction_result.get("temp_marker_dir")
+        for root, _, files in os.walk(temp_marker_dir):
+            for file in files:
+                entries.append({'name': file, 'path': os.path.join(root, file)})
+        return entries
+
+    def _save_marker_object(self, entry: Dict[str, Any], file_content: Optional[bytes], **save_kwargs) -> str:
+        """
+        Store one marker output file for a KB item. Cached files are copied
+        server-side with copy_file; fresh files are uploaded from file_content.
+        """
+        minio_backend = self.file_storage.minio_backend
+        cache_key = entry.get('cache_key')
+        if cache_key:
+            object_key = minio_backend.copy_file_with_auto_key(
+                cache_key,
+                save_kwargs['filename'],
+                save_kwargs['prefix'],
+                user_id=save_kwargs.get('user_id'),
+                file_id=save_kwargs.get('file_id'),
+                subfolder=save_kwargs.get('subfolder'),
+                subfolder_uuid=save_kwargs.get('subfolder_uuid'),
+            )
+            if object_key:
+                return object_key
+            # Fall back to a regular upload if the server-side copy failed
+            file_content = file_content if file_content is not None else minio_backend.get_file(cache_key)
+            if file_content is None:
+                raise Exception(f"Cached marker file {cache_key} is not available")
+
+        return minio_backend.save_file_with_auto_key(content=file_content, **save_kwargs)
+
     def _populate_image_captions_for_kb_item(self, kb_item, markdown_content=None):
         """
         Populate image captions for all images in a knowledge base item.
@@ -111,6 +111,11 @@ class VideoImageExtractionSerializer(serializers.Serializer):
         max_value=1.0,
         help_text="Cosine similarity threshold for global deep deduplication (default: 0.85)"
     )
+    global_deep_method = serializers.ChoiceField(
+        choices=["exact", "ann"],
+        default="exact",
+        help_text="Global deep deduplication method: all-pairs 'exact' or faiss 'ann' for long videos (default: exact)"
+    )
     min_words = serializers.IntegerField(
         default=20,
         min_value=0,
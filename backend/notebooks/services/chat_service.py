@@ -3,14 +3,14 @@ Chat Service - Handle chat functionality business logic
 """
 import json
 import logging
+from asgiref.sync import sync_to_async
 from django.db import transaction
 from rest_framework import status
 
-from pymilvus import Collection
 from pymilvus.exceptions import SchemaNotReadyException, CollectionNotExistException
 
 from ..models import Notebook, NotebookChatMessage
-from rag.rag import RAGChatbot, SuggestionRAGAgent, user_collection
+from rag.rag import RAGChatbot, SuggestionRAGAgent, user_vector_count
 
 logger = logging.getLogger(__name__)
 
@@ -29,11 +29,9 @@ class ChatService:
         return None
 
     def check_user_knowledge_base(self, user_id):
-        """Check if user has data in their Milvus collection"""
-        coll_name = user_collection(user_id)
+        """Check if user has data in their Milvus collection (or partition)"""
         try:
-            coll = Collection(coll_name)
-            existing = coll.num_entities
+            existing = user_vector_count(user_id)
         except (CollectionNotExistException, SchemaNotReadyException):
             existing = 0
 
@@ -76,14 +74,26 @@ class ChatService:
         file_ids=None,         # <-- add file_ids param
         notebook=None,
         collections=None,
+        use_async=False,
     ):
-        """Create RAG chat stream with message recording"""
+        """
+        Create RAG chat stream with message recording.
+
+        With use_async (ASGI deployments) an async generator is returned, so the
+        stream runs on the event loop without a thread per request.
+        """
         # Get the chatbot singleton
         bot = RAGChatbot(
             user_id=user_id,
             extra_collections=collections  # <-- pass collections to RAGChatbot
         )
 
+        if use_async:
+            return self._wrap_async_stream(
+                bot.astream(question=question, history=history, file_ids=file_ids),
+                notebook,
+            )
+
         # Get raw stream from chatbot
         raw_stream = bot.stream(
             question=question,
@@ -96,17 +106,8 @@ class ChatService:
             buffer = []
             for chunk in raw_stream:
                 yield chunk
-                # Parse only token events
-                if chunk.startswith("data: "):
-                    try:
-                        payload = json.loads(chunk[len("data: "):])
-                        if payload.get("type") == "token":
-                            buffer.append(payload.get("text", ""))
-                    except json.JSONDecodeError:
-                        # Skip malformed JSON
-                        continue
-                # Ignore metadata and done events
-            
+                self._collect_token(chunk, buffer)
+
             # Once stream finishes, save the full assistant response
             full_response = "".join(buffer).strip()
             if full_response:
@@ -114,6 +115,29 @@ class ChatService:
 
         return wrapped_stream()
 
+    async def _wrap_async_stream(self, raw_stream, notebook):
+        """Async counterpart of wrapped_stream in create_chat_stream."""
+        buffer = []
+        async for chunk in raw_stream:
+            yield chunk
+            self._collect_token(chunk, buffer)
+
+        full_response = "".join(buffer).strip()
+        if full_response:
+            await sync_to_async(self.record_assistant_message)(notebook, full_response)
+
+    @staticmethod
+    def _collect_token(chunk, buffer):
+        """Append the text of an SSE token event to buffer; other events are ignored."""
+        if chunk.startswith("data: "):
+            try:
+                payload = json.loads(chunk[len("data: "):])
+                if payload.get("type") == "token":
+                    buffer.append(payload.get("text", ""))
+            except json.JSONDecodeError:
+                # Skip malformed JSON
+                pass
+
     def get_formatted_chat_history(self, notebook):
         """Get formatted chat history for display"""
         messages = NotebookChatMessage.objects.filter(notebook=notebook).order_by("timestamp")
@@ -56,15 +56,17 @@ class FileService:
                 )
 
             # Step 2: Queue file processing to Celery (async)
+            staged = None
             try:
-                # Read file data for Celery task
-                file_data = file_obj.read()
-                file_obj.seek(0)  # Reset file pointer
+                # Stage the upload in MinIO; the task only receives the claim check
+                staged = self.stage_upload(file_obj, user.pk, upload_id)
                 
                 # Queue the processing task
                 from ..tasks import process_file_upload_task
                 process_file_upload_task.delay(
-                    file_data=file_data,
+                    staged_object_key=staged['object_key'],
+                    file_size=staged['size'],
+                    file_hash=staged['sha256'],
                     filename=file_obj.name,
                     notebook_id=notebook.id,
                     user_id=user.pk,
@@ -79,6 +81,9 @@ class FileService:
                 kb_item.processing_status = "error"
                 kb_item.save(update_fields=["processing_status"])
                 logger.error(f"Failed to queue processing for {file_obj.name}: {queue_error}")
+                # No task will consume the staged upload, so remove it
+                if staged:
+                    self.delete_staged_upload(staged)
                 # Don't re-raise - return success so frontend shows the item with error status
                 
             return {
@@ -110,52 +115,58 @@ class FileService:
             # Process each file and create source/knowledge base items immediately
             for file_obj in files:
                 upload_id = uuid4().hex
-                data = file_obj.read()
-                file_obj.seek(0)
-
-                # Create Source record immediately
-                source = Source.objects.create(
-                    notebook=notebook,
-                    source_type="file",
-                    title=file_obj.name,
-                )
+                staged = self.stage_upload(file_obj, user.pk, upload_id)
+
+                try:
+                    # Create Source record immediately
+                    source = Source.objects.create(
+                        notebook=notebook,
+                        source_type="file",
+                        title=file_obj.name,
+                    )
                 
-                # Create KnowledgeBaseItem with processing_status="in_progress" and link to source
-                kb_item = KnowledgeBaseItem.objects.create(
-                    user=user,
-                    title=file_obj.name,
-                    content_type="document",
-                    source=source,
-                    processing_status="in_progress"
-                )
+                    # Create KnowledgeBaseItem with processing_status="in_progress" and link to source
+                    kb_item = KnowledgeBaseItem.objects.create(
+                        user=user,
+                        title=file_obj.name,
+                        content_type="document",
+                        source=source,
+                        processing_status="in_progress"
+                    )
                 
-                # Create KnowledgeItem link
-                ki = KnowledgeItem.objects.create(
-                    notebook=notebook,
-                    knowledge_base_item=kb_item,
-                    source=source,
-                    notes=f"Processing {file_obj.name}"
-                )
-
-                batch_item = BatchJobItem.objects.create(
-                    batch_job=batch_job,
-                    item_data={'filename': file_obj.name, 'size': len(data), 'kb_item_id': str(kb_item.id)},
-                    upload_id=upload_id,
-                    status='pending'
-                )
-
-                # Enqueue Celery task for background processing
-                from ..tasks import process_file_upload_task
-                process_file_upload_task.delay(
-                    file_data=data,
-                    filename=file_obj.name,
-                    notebook_id=notebook.id,
-                    user_id=user.pk,
-                    upload_file_id=upload_id,
-                    batch_job_id=batch_job.id,
-                    batch_item_id=batch_item.id,
-                    kb_item_id=str(kb_item.id)  # Pass the kb_item_id to the task
-                )
+                    # Create KnowledgeItem link
+                    ki = KnowledgeItem.objects.create(
+                        notebook=notebook,
+                        knowledge_base_item=kb_item,
+                        source=source,
+                        notes=f"Processing {file_obj.name}"
+                    )
+
+                    batch_item = BatchJobItem.objects.create(
+                        batch_job=batch_job,
+                        item_data={'filename': file_obj.name, 'size': staged['size'], 'kb_item_id': str(kb_item.id)},
+                        upload_id=upload_id,
+                        status='pending'
+                    )
+
+                    # Enqueue Celery task for background processing
+                    from ..tasks import process_file_upload_task
+                    process_file_upload_task.delay(
+                        staged_object_key=staged['object_key'],
+                        file_size=staged['size'],
+                        file_hash=staged['sha256'],
+                        filename=file_obj.name,
+                        notebook_id=notebook.id,
+                        user_id=user.pk,
+                        upload_file_id=upload_id,
+                        batch_job_id=batch_job.id,
+                        batch_item_id=batch_item.id,
+                        kb_item_id=str(kb_item.id)  # Pass the kb_item_id to the task
+                    )
+                except Exception:
+                    # No task will consume this staged upload, so remove it
+                    self.delete_staged_upload(staged)
+                    raise
 
             return {
                 'success': True,
@@ -169,6 +180,19 @@ class FileService:
             logger.exception(f"Batch file upload failed: {e}")
             raise
 
+    def stage_upload(self, file_obj, user_id, upload_id):
+        """Stream an upload to the MinIO staging prefix and return its claim check."""
+        from ..utils.storage import get_minio_backend
+        return get_minio_backend().stage_upload(file_obj, user_id, upload_id)
+
+    def delete_staged_upload(self, staged):
+        """Remove a staged upload that no task will consume; failures are only logged."""
+        from ..utils.storage import get_minio_backend
+        try:
+            get_minio_backend().delete_file(staged['object_key'])
+        except Exception as cleanup_error:
+            logger.warning(f"Failed to delete staged upload {staged['object_key']}: {cleanup_error}")
+
     def process_file_by_type(self, file_path, file_metadata):
         """Process file using focused file processor"""
         return async_to_sync(self.file_processor.process_file_by_type)(file_path, file_metadata)
@@ -390,12 +390,22 @@ def process_url_document_task(self, url, notebook_id, user_id, upload_url_id=Non
 
 
 @shared_task(bind=True)
-def process_file_upload_task(self, file_data, filename, notebook_id, user_id, upload_file_id=None, batch_job_id=None, batch_item_id=None, kb_item_id=None):
-    """Process a single file upload asynchronously with actual file processing."""
+def process_file_upload_task(self, file_data=None, filename=None, notebook_id=None, user_id=None, upload_file_id=None, batch_job_id=None, batch_item_id=None, kb_item_id=None, staged_object_key=None, file_size=None, file_hash=None):
+    """
+    Process a single file upload asynchronously with actual file processing.
+    
+    Uploads are normally passed by claim check: staged_object_key points at the
+    file staged in MinIO by the web tier, with its size and SHA-256. The staged
+    object is streamed to local disk here and removed afterwards. Raw file_data
+    is still accepted for small in-process callers.
+    """
+    temp_path = None
+    temp_file = None
     try:
         # Import services and processors lazily to avoid circular imports
         from .processors.upload_processor import UploadProcessor
         from .services.notebook_service import NotebookService
+        from django.core.files import File
         from django.core.files.base import ContentFile
         from django.shortcuts import get_object_or_404
         from rag.rag import add_user_files
@@ -407,7 +417,7 @@ def process_file_upload_task(self, file_data, filename, notebook_id, user_id, up
         notebook_service = NotebookService()
         
         # Validate inputs
-        if not file_data or not filename or not notebook_id or not user_id:
+        if not (file_data or staged_object_key) or not filename or not notebook_id or not user_id:
             raise ValidationError("Missing required parameters")
         
         # Get required objects
@@ -418,18 +428,25 @@ def process_file_upload_task(self, file_data, filename, notebook_id, user_id, up
         if batch_item_id:
             _update_batch_item_status(batch_item_id, 'processing')
         
-        # Create a temporary file-like object from the file data
-        temp_file = ContentFile(file_data, name=filename)
-        
-        # Log file size for debugging and check limits
-        file_size_mb = len(file_data) / 1024 / 1024
-        logger.info(f"Processing file {filename}: {file_size_mb:.2f} MB")
-        
         # Check file size limit (prevent worker crashes on huge files)
         MAX_FILE_SIZE_MB = 500  # 500MB limit
+        if staged_object_key:
+            file_size_mb = (file_size or 0) / 1024 / 1024
+        else:
+            file_size_mb = len(file_data) / 1024 / 1024
         if file_size_mb > MAX_FILE_SIZE_MB:
             raise ValidationError(f"File too large: {file_size_mb:.2f}MB (max: {MAX_FILE_SIZE_MB}MB)")
         
+        # Create a temporary file-like object from the staged object or the file data
+        if staged_object_key:
+            temp_path = _download_staged_upload(staged_object_key, filename, file_size, file_hash)
+            temp_file = File(open(temp_path, 'rb'), name=filename)
+        else:
+            temp_file = ContentFile(file_data, name=filename)
+        
+        # Log file size for debugging
+        logger.info(f"Processing file {filename}: {file_size_mb:.2f} MB")
+        
         # Get the pre-created KnowledgeBaseItem if provided
         kb_item = None
         if kb_item_id:
@@ -485,7 +502,6 @@ def process_file_upload_task(self, file_data, filename, notebook_id, user_id, up
         
         # Clean up memory
         del file_data
-        del temp_file
         
         return result
         
@@ -511,6 +527,44 @@ def process_file_upload_task(self, file_data, filename, notebook_id, user_id, up
             _check_batch_completion(batch_job_id)
         
         raise FileProcessingError(f"Failed to process file upload: {str(e)}")
+    
+    finally:
+        if temp_file is not None:
+            temp_file.close()
+        if temp_path and os.path.exists(temp_path):
+            os.unlink(temp_path)
+        if staged_object_key:
+            _delete_staged_upload(staged_object_key)
+
+
+def _download_staged_upload(staged_object_key, filename, file_size=None, file_hash=None):
+    """Stream a staged upload from MinIO to a local temp file and verify its claim check."""
+    from .utils.storage import get_minio_backend
+    
+    suffix = os.path.splitext(filename)[1].lower()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, prefix="deepsight_staged_") as tmp_file:
+        temp_path = tmp_file.name
+    
+    try:
+        size, sha256 = get_minio_backend().download_to_path(staged_object_key, temp_path)
+        if file_size is not None and size != file_size:
+            raise ValidationError(f"Staged upload {staged_object_key} is {size} bytes, expected {file_size}")
+        if file_hash and sha256 != file_hash:
+            raise ValidationError(f"Staged upload {staged_object_key} failed hash verification")
+    except Exception:
+        os.unlink(temp_path)
+        raise
+    
+    return temp_path
+
+
+def _delete_staged_upload(staged_object_key):
+    """Remove a staged upload once its task has finished with it."""
+    try:
+        from .utils.storage import get_minio_backend
+        get_minio_backend().delete_file(staged_object_key)
+    except Exception as e:
+        logger.warning(f"Failed to delete staged upload {staged_object_key}: {e}")
 
 
 def _update_batch_item_status(batch_item_id, status, result_data=None, error_message=None):
@@ -563,6 +617,27 @@ def _check_batch_completion(batch_job_id):
         logger.warning(f"Batch job {batch_job_id} not found")
 
 
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_backoff_max=3600,
+    max_retries=None,
+)
+def delete_kb_item_vectors_task(self, user_id, kb_item_id, collection=None, chunk_ids=None):
+    """
+    Delete the RAG chunks of a deleted knowledge base item.
+
+    Runs after the item's rows are gone, so arguments come from
+    rag.rag.vector_cleanup_args; retried with backoff while Milvus is unreachable.
+    """
+    from rag.rag import delete_chunk_vectors
+
+    removed = delete_chunk_vectors(user_id, kb_item_id, collection=collection, chunk_ids=chunk_ids)
+    logger.info(f"Deleted {removed} RAG chunk(s) for deleted KB item {kb_item_id}")
+    return removed
+
+
 @shared_task
 def cleanup_old_batch_jobs():
     """Cleanup old completed batch jobs (older than 7 days)."""
@@ -588,8 +663,10 @@ def generate_image_captions_task(self, kb_item_id):
     """Generate captions for images in a knowledge base item asynchronously."""
     try:
         from .models import KnowledgeBaseItem, KnowledgeBaseImage
+        from .utils.helpers import config
         from datetime import datetime
         from uuid import UUID
+        from django.utils import timezone
         
         logger.info(f"Starting caption generation task for KB item: {kb_item_id}")
         
@@ -660,48 +737,49 @@ def generate_image_captions_task(self, kb_item_id):
                 except Exception as e:
                     logger.warning(f"Could not extract figure data for KB item {kb_item_id}: {e}")
             
-            # Process each image
-            for image in images_needing_captions:
-                try:
-                    caption = None
-                    caption_source = None
-                    
-                    # Try to find caption from markdown first
-                    if figure_data:
-                        caption = _find_caption_for_image(image, figure_data, images_needing_captions)
+            images = list(images_needing_captions)
+            captions = {}
+            caption_sources = {}
+
+            # Try to find captions from markdown first
+            if figure_data:
+                for image in images:
+                    try:
+                        caption = _find_caption_for_image(image, figure_data, images)
                         if caption:
-                            caption_source = "markdown"
-                    
-                    # Use AI generation as fallback if no caption found from markdown
-                    if not caption:
-                        try:
-                            from notebooks.utils.image_processing.caption_generator import generate_caption_for_image
-                            
-                            # Download image to temp file for AI captioning
-                            temp_image_path = _download_image_to_temp(image)
-                            if temp_image_path:
-                                try:
-                                    caption = generate_caption_for_image(temp_image_path)
-                                    if caption and not caption.startswith("Caption generation failed"):
-                                        caption_source = "AI"
-                                        ai_generated_count += 1
-                                finally:
-                                    if os.path.exists(temp_image_path):
-                                        os.unlink(temp_image_path)
-                        except Exception as e:
-                            logger.warning(f"AI caption generation failed for image {image.id}: {e}")
-                    
-                    # Update the image with the caption
-                    if caption:
-                        image.image_caption = caption
-                        image.save(update_fields=['image_caption', 'updated_at'])
-                        updated_count += 1
-                        logger.info(f"Updated image {image.id} with {caption_source} caption: {caption[:50]}...")
-                    else:
-                        logger.warning(f"No caption found for image {image.id}")
-                
-                except Exception as e:
-                    logger.error(f"Error processing image {image.id}: {e}")
+                            captions[image.id] = caption
+                            caption_sources[image.id] = "markdown"
+                    except Exception as e:
+                        logger.error(f"Error processing image {image.id}: {e}")
+
+            # Use AI generation as fallback for images without a markdown caption
+            images_for_ai = [image for image in images if image.id not in captions]
+            if images_for_ai:
+                ai_captions = _generate_ai_captions(images_for_ai, config.CAPTION_CONCURRENCY, config.CAPTION_MAX_RETRIES)
+                for image_id, (caption, source) in ai_captions.items():
+                    captions[image_id] = caption
+                    caption_sources[image_id] = source
+                    if source == "AI":
+                        ai_generated_count += 1
+
+            # Write all captions with a single bulk_update
+            now = timezone.now()
+            images_to_update = []
+            for image in images:
+                caption = captions.get(image.id)
+                if caption:
+                    image.image_caption = caption
+                    image.updated_at = now
+                    images_to_update.append(image)
+                    logger.info(f"Updated image {image.id} with {caption_sources[image.id]} caption: {caption[:50]}...")
+                else:
+                    logger.warning(f"No caption found for image {image.id}")
+
+            if images_to_update:
+                KnowledgeBaseImage.objects.bulk_update(
+                    images_to_update, ['image_caption', 'image_metadata', 'updated_at']
+                )
+            updated_count = len(images_to_update)
             
             # Mark as completed
             kb_item.file_metadata['caption_generation_status'] = 'completed'
@@ -760,50 +838,65 @@ def _find_caption_for_image(image, figure_data, all_images):
         return None
 
 
-def _download_image_to_temp(image):
-    """Download image from MinIO to a temporary file for caption generation."""
-    try:
-        # Get image content from MinIO
-        image_content = image.get_image_content()
-        
-        if not image_content:
-            return None
-        
-        # Determine file extension from content type or object key
-        file_extension = '.png'  # default
-        if image.content_type:
-            if 'jpeg' in image.content_type or 'jpg' in image.content_type:
-                file_extension = '.jpg'
-            elif 'png' in image.content_type:
-                file_extension = '.png'
-            elif 'gif' in image.content_type:
-                file_extension = '.gif'
-            elif 'webp' in image.content_type:
-                file_extension = '.webp'
-        elif image.minio_object_key:
-            object_key_lower = image.minio_object_key.lower()
-            if object_key_lower.endswith('.jpg') or object_key_lower.endswith('.jpeg'):
-                file_extension = '.jpg'
-            elif object_key_lower.endswith('.png'):
-                file_extension = '.png'
-            elif object_key_lower.endswith('.gif'):
-                file_extension = '.gif'
-            elif object_key_lower.endswith('.webp'):
-                file_extension = '.webp'
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(
-            suffix=file_extension, 
-            delete=False
-        ) as temp_file:
-            temp_file.write(image_content)
-            temp_file_path = temp_file.name
-        
-        return temp_file_path
-        
-    except Exception as e:
-        logger.error(f"Error downloading image {image.id} to temp file: {e}")
-        return None
+def _generate_ai_captions(images, max_workers, max_retries):
+    """
+    Caption images with the vision model, reusing captions of identical images.
+
+    Images are downloaded concurrently and keyed by the SHA-256 of their bytes,
+    which is recorded in image_metadata['content_hash']. A hash that already has
+    a caption on any knowledge base image is reused instead of calling the
+    model, and each distinct image in the batch is captioned once.
+
+    Returns a mapping of image id to (caption, source).
+    """
+    import hashlib
+    from concurrent.futures import ThreadPoolExecutor
+    from .models import KnowledgeBaseImage
+    from .utils.image_processing.caption_generator import generate_captions_concurrently
+
+    def download(image):
+        try:
+            return image, image.get_image_content()
+        except Exception as e:
+            logger.warning(f"Could not download image {image.id} for captioning: {e}")
+            return image, None
+
+    images_by_hash = {}
+    image_data = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(images)))) as executor:
+        for image, content in executor.map(download, images):
+            if not content:
+                continue
+            content_hash = hashlib.sha256(content).hexdigest()
+            image.image_metadata = {**(image.image_metadata or {}), 'content_hash': content_hash}
+            images_by_hash.setdefault(content_hash, []).append(image)
+            image_data.setdefault(content_hash, (content, image.content_type or None))
+
+    # Captions already generated for the same bytes in any knowledge base item
+    cached_captions = dict(
+        KnowledgeBaseImage.objects.filter(image_metadata__content_hash__in=list(images_by_hash))
+        .exclude(image_caption__in=['', None])
+        .values_list('image_metadata__content_hash', 'image_caption')
+    )
+
+    uncached = {h: data for h, data in image_data.items() if h not in cached_captions}
+    generated = generate_captions_concurrently(uncached, max_workers=max_workers, max_retries=max_retries)
+    logger.info(
+        f"Captioned {len(generated)} of {len(uncached)} distinct images "
+        f"({len(image_data) - len(uncached)} reused from cache)"
+    )
+
+    results = {}
+    for content_hash, hash_images in images_by_hash.items():
+        if content_hash in cached_captions:
+            caption, source = cached_captions[content_hash], "cache"
+        elif content_hash in generated:
+            caption, source = generated[content_hash], "AI"
+        else:
+            continue
+        for image in hash_images:
+            results[image.id] = (caption, source)
+    return results
 
 
 @shared_task
@@ -7,7 +7,11 @@ This package contains focused test modules:
 - test_views.py: View tests
 - test_services.py: Service tests
 - test_tasks.py: Task tests
+- test_processors.py: Processor tests
 - test_validators.py: Validator tests
+- test_model_registry.py: Model registry tests
+- test_extraction_cache.py: Extraction cache tests
+- test_change_feed.py: File change feed tests
 """
 
 # Import all test modules for test discovery
@@ -16,4 +20,8 @@ from .test_serializers import *
 from .test_views import *
 from .test_services import *
 from .test_tasks import *
-from .test_validators import * 
\ No newline at end of file
+from .test_processors import *
+from .test_validators import * 
+from .test_model_registry import *
+from .test_extraction_cache import *
+from .test_change_feed import *
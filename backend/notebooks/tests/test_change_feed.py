@@ -0,0 +1,61 @@
+"""
+Change feed tests for the notebooks module.
+"""
+
+from django.test import TestCase
+
+from ..utils.change_feed import FileChangeFeed, LocalRedis
+
+
+class FileChangeFeedTests(TestCase):
+    """Test cases for the pub/sub notebook file change feed."""
+
+    def setUp(self):
+        self.feed = FileChangeFeed(redis_client=LocalRedis())
+
+    def test_subscriber_receives_published_delta(self):
+        """A published change reaches subscribers of the same notebook only."""
+        subscription = self.feed.subscribe("nb-1")
+        other = self.feed.subscribe("nb-2")
+        try:
+            self.feed.publish(
+                "nb-1", "file_status_updated",
+                file_data={"file_id": "f1", "status": "completed"},
+                file_entry={"file_id": "f1", "parsing_status": "done"},
+            )
+
+            event = subscription.get_event(timeout=1)
+            self.assertEqual(event["type"], "file_status_updated")
+            self.assertEqual(event["file_data"]["file_id"], "f1")
+            self.assertEqual(event["file"]["parsing_status"], "done")
+            self.assertIsNone(other.get_event(timeout=0.05))
+        finally:
+            subscription.close()
+            other.close()
+
+    def test_get_event_times_out_without_changes(self):
+        """Waiting on an idle channel returns None after the timeout."""
+        subscription = self.feed.subscribe("nb-1")
+        try:
+            self.assertIsNone(subscription.get_event(timeout=0.05))
+        finally:
+            subscription.close()
+
+    def test_aget_event_waits_without_blocking(self):
+        """The async wait returns a change published while it is pending."""
+        import asyncio
+
+        subscription = self.feed.subscribe("nb-1")
+
+        async def wait_for_change():
+            pending = asyncio.ensure_future(subscription.aget_event(timeout=2))
+            await asyncio.sleep(0.05)
+            self.feed.publish("nb-1", "file_uploaded", file_data={"file_id": "f1"})
+            return await pending
+
+        try:
+            event = asyncio.run(wait_for_change())
+            self.assertEqual(event["type"], "file_uploaded")
+            self.assertIsNone(asyncio.run(subscription.aget_event(timeout=0.05)))
+        finally:
+            subscription.close()
@@ -0,0 +1,134 @@
+"""
+Tests for the content-addressed extraction cache.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from ..utils.extraction_cache import PROCESSOR_VERSIONS, ExtractionCache
+
+
+class _MemoryBackend:
+    """In-memory stand-in for MinIOBackend that records write order."""
+
+    def __init__(self):
+        self.objects = {}
+        self.writes = []
+
+    def file_exists(self, object_key):
+        return object_key in self.objects
+
+    def get_file(self, object_key):
+        return self.objects.get(object_key)
+
+    def store_file(self, object_key, file_content, content_type=None):
+        self.objects[object_key] = file_content
+        self.writes.append(object_key)
+        return True
+
+    def store_file_from_path(self, object_key, file_path, content_type=None):
+        with open(file_path, 'rb') as f:
+            return self.store_file(object_key, f.read(), content_type)
+
+
+class ExtractionCacheTests(TestCase):
+    """Test cases for ExtractionCache."""
+
+    def setUp(self):
+        self.backend = _MemoryBackend()
+        self.cache = ExtractionCache(minio_backend=self.backend)
+        self.cache.enabled = True
+        self.cache.prefix = "extraction_cache"
+        self.file_hash = "ab" * 32
+        self.marker_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.marker_dir, ignore_errors=True)
+
+    def _write(self, relative_path, content):
+        path = os.path.join(self.marker_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def _marker_result(self):
+        return {
+            'content': "# Paper",
+            'metadata': {'pages': 2},
+            'content_filename': "upload_one.md",
+            'marker_extraction_result': {'success': True, 'temp_marker_dir': self.marker_dir},
+        }
+
+    def test_lookup_miss(self):
+        """Nothing stored, uncacheable extensions and a disabled cache all miss."""
+        self.assertIsNone(self.cache.lookup(self.file_hash, ".pdf"))
+        self.assertIsNone(self.cache.lookup(self.file_hash, ".txt"))
+        self.cache.enabled = False
+        self.assertIsNone(self.cache.lookup(self.file_hash, ".pdf"))
+
+    def test_store_then_lookup_hit(self):
+        """A stored marker result is found under the same hash and extension."""
+        self._write("paper.md", "# Paper")
+        self._write("_page_0_Figure_1.jpeg", "jpeg")
+        self.assertTrue(self.cache.store(self.file_hash, ".pdf", self._marker_result()))
+
+        manifest = self.cache.lookup(self.file_hash, ".pdf")
+        self.assertEqual(manifest['version'], PROCESSOR_VERSIONS['marker_pdf'])
+        self.assertEqual(manifest['result']['content'], "# Paper")
+        self.assertNotIn('content_filename', manifest['result'])
+        self.assertEqual({f['name'] for f in manifest['files']}, {"paper.md", "_page_0_Figure_1.jpeg"})
+        # Another processor's cache is keyed separately
+        self.assertIsNone(self.cache.lookup(self.file_hash, ".docx"))
+
+    def test_manifest_written_last(self):
+        """Readers never see a manifest whose files are still being uploaded."""
+        self._write("paper.md", "# Paper")
+        self._write("paper_meta.json", "{}")
+        self.cache.store(self.file_hash, ".pdf", self._marker_result())
+
+        self.assertTrue(self.backend.writes[-1].endswith("/manifest.json"))
+        self.assertFalse(any(key.endswith("paper_meta.json") for key in self.backend.writes))
+
+    def test_same_name_in_subdirectories_kept_apart(self):
+        """Files with the same basename in different subdirectories get distinct cache keys."""
+        self._write("a/figure.png", "first")
+        self._write("b/figure.png", "second")
+        self.cache.store(self.file_hash, ".pdf", self._marker_result())
+
+        files = self.cache.lookup(self.file_hash, ".pdf")['files']
+        self.assertEqual(sorted(f['relative_path'] for f in files), ["a/figure.png", "b/figure.png"])
+        self.assertEqual(
+            sorted(self.backend.get_file(f['cache_key']) for f in files), [b"first", b"second"]
+        )
+
+    def test_failed_results_not_stored(self):
+        """Fallback results (marker failed) are not cached."""
+        result = self._marker_result()
+        result['marker_extraction_result'] = {'success': False}
+        self.assertFalse(self.cache.store(self.file_hash, ".pdf", result))
+        self.assertEqual(self.backend.writes, [])
+
+    def test_build_processing_result_for_marker(self):
+        """Filename-dependent fields come from the new upload."""
+        self._write("paper.md", "# Paper")
+        self.cache.store(self.file_hash, ".pdf", self._marker_result())
+
+        result = self.cache.build_processing_result(self.cache.lookup(self.file_hash, ".pdf"), "upload_two")
+        self.assertEqual(result['content'], "# Paper")
+        self.assertEqual(result['content_filename'], "upload_two.md")
+        self.assertTrue(result['metadata']['extraction_cache_hit'])
+        self.assertEqual(result['marker_extraction_result']['clean_title'], "upload_two")
+        self.assertEqual(len(result['marker_extraction_result']['cached_files']), 1)
+
+    def test_transcript_round_trip(self):
+        """Whisper transcripts are cached as content and renamed for the new upload."""
+        result = {'content': "hello world", 'metadata': {'has_transcript': True}}
+        self.assertTrue(self.cache.store(self.file_hash, ".mp3", result))
+
+        manifest = self.cache.lookup(self.file_hash, ".mp3")
+        self.assertEqual(self.backend.get_file(manifest['transcript_key']), b"hello world")
+        rebuilt = self.cache.build_processing_result(manifest, "talk")
+        self.assertEqual(rebuilt['transcript_filename'], "talk.md")
+        self.assertEqual(json.loads(self.backend.get_file(self.backend.writes[-1]))['processor'], "whisper")
@@ -0,0 +1,71 @@
+"""
+Tests for the process-wide model registry.
+"""
+
+import gc
+import threading
+from unittest import mock
+
+from django.test import TestCase
+
+from backend.model_registry import ModelKey, ModelRegistry
+
+
+class _Owner:
+    pass
+
+
+class ModelRegistryTests(TestCase):
+    """Test cases for ModelRegistry."""
+
+    def setUp(self):
+        self.registry = ModelRegistry(idle_ttl=60)
+        self.key = ModelKey("encoder", "cpu")
+        self.loads = []
+
+    def _loader(self):
+        self.loads.append(1)
+        return object()
+
+    def test_model_loaded_once_across_threads(self):
+        """Concurrent callers share a single load."""
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.registry.get(self.key, self._loader)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.loads), 1)
+        self.assertTrue(all(model is results[0] for model in results))
+
+    def test_dtype_is_part_of_the_key(self):
+        """Different compute types are different models."""
+        self.registry.get(ModelKey("whisper", "cpu", "int8"), self._loader)
+        self.registry.get(ModelKey("whisper", "cpu", "float16"), self._loader)
+        self.assertEqual(len(self.loads), 2)
+
+    def test_owned_models_are_not_evicted(self):
+        """A model stays loaded while an owner is alive and becomes evictable after."""
+        owner = _Owner()
+        with mock.patch("backend.model_registry.time.monotonic", return_value=100.0):
+            self.registry.get(self.key, self._loader, owner=owner)
+
+        self.assertEqual(self.registry.evict_idle(now=1000.0), 0)
+        self.assertIn(self.key, self.registry)
+
+        with mock.patch("backend.model_registry.time.monotonic", return_value=100.0):
+            del owner
+            gc.collect()
+        self.assertEqual(self.registry.evict_idle(now=120.0), 0)
+        self.assertEqual(self.registry.evict_idle(now=1000.0), 1)
+        self.assertNotIn(self.key, self.registry)
+
+    def test_lease_holds_reference(self):
+        """Models in use by a lease are never evicted."""
+        with self.registry.lease(self.key, self._loader):
+            self.assertEqual(self.registry.evict_idle(now=10 ** 9), 0)
+        self.assertEqual(self.registry.evict_idle(now=10 ** 9), 1)
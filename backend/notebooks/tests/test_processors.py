@@ -0,0 +1,103 @@
+"""
+Processor tests for the notebooks module.
+"""
+
+import numpy as np
+from django.test import TestCase
+
+from ..processors.pdf_conversion_service import split_page_ranges
+from ..processors.upload_processor import UploadProcessor
+from ..utils.change_feed import LocalRedis
+from ..utils.upload_status import UploadStatusStore
+from ..utils.image_processing.image_deduplicator import (
+    find_duplicates, find_duplicates_ann, hamming_distances
+)
+
+
+class PdfPageShardingTests(TestCase):
+    """Test cases for page-sharded PDF extraction helpers."""
+
+    def test_split_page_ranges_covers_all_pages_in_order(self):
+        """Ranges are consecutive, half-open and cover every page once."""
+        ranges = split_page_ranges(45, 20)
+
+        self.assertEqual(ranges, [(0, 20), (20, 40), (40, 45)])
+
+    def test_split_page_ranges_single_shard(self):
+        """Short documents produce a single range."""
+        self.assertEqual(split_page_ranges(5, 20), [(0, 5)])
+
+    def test_split_page_ranges_empty_document(self):
+        """An empty document produces no ranges."""
+        self.assertEqual(split_page_ranges(0, 20), [])
+
+
+class UploadProgressTests(TestCase):
+    """Test cases for upload status shared between processes."""
+
+    def setUp(self):
+        store = UploadStatusStore(redis_client=LocalRedis())
+        # The Celery task and the status endpoints each have their own processor
+        self.worker = UploadProcessor()
+        self.web = UploadProcessor()
+        self.worker.status_store = self.web.status_store = store
+
+    def test_page_progress_visible_to_other_processor(self):
+        """Per-page progress reported by the worker is read back through get_upload_status."""
+        self.worker._report_page_progress({'upload_file_id': "up-1"}, 5, 20)
+
+        status = self.web.get_upload_status("up-1")
+        self.assertEqual(status['status'], "processing")
+        self.assertEqual(status['pages_processed'], 5)
+        self.assertEqual(status['page_count'], 20)
+        self.assertEqual(status['progress_percentage'], 25)
+
+        self.worker._report_page_progress({'upload_file_id': "up-1"}, 20, 20)
+        self.assertEqual(self.web.get_upload_status("up-1")['progress_percentage'], 100)
+
+    def test_deleted_upload_status_removed(self):
+        """Deleting an upload also drops its shared status."""
+        self.worker._report_page_progress({'upload_file_id': "up-1"}, 1, 2)
+        self.web.file_storage = None
+        self.web.delete_upload("up-1", user_pk=1)
+        self.assertIsNone(self.worker.status_store.get("up-1"))
+
+
+class ImageDeduplicationTests(TestCase):
+    """Test cases for the vectorized all-pairs deduplication engine."""
+
+    def test_hamming_distances_matches_bit_count(self):
+        """Distances equal the number of differing bits between packed hashes."""
+        hashes = np.array([0, 0b1011, 2**64 - 1], dtype=np.uint64)
+
+        distances = hamming_distances(hashes, hashes)
+
+        self.assertEqual(distances.tolist(), [[0, 3, 64], [3, 0, 61], [64, 61, 0]])
+
+    def test_find_duplicates_keeps_first_and_skips_removed(self):
+        """A removed item never removes others, matching the nested-loop semantics."""
+        # 0~1 and 1~2 are duplicates but 0 and 2 are not: only 1 is removed
+        scores = np.array([
+            [1.0, 0.9, 0.1],
+            [0.9, 1.0, 0.9],
+            [0.1, 0.9, 1.0],
+        ])
+
+        removals = find_duplicates(3, lambda start, end: scores[start:end], lambda s: s >= 0.85, block_size=2)
+
+        self.assertEqual([(i, j) for i, j, _ in removals], [(0, 1)])
+
+    def test_find_duplicates_ann_matches_exact_search(self):
+        """The faiss radius search removes the same frames as the all-pairs search."""
+        rng = np.random.default_rng(0)
+        base = rng.normal(size=(20, 16)).astype(np.float32)
+        embeddings = np.concatenate([base, base[:5] + 0.01]).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        exact = find_duplicates(
+            len(embeddings), lambda start, end: embeddings[start:end] @ embeddings.T, lambda s: s >= 0.95
+        )
+        ann = find_duplicates_ann(embeddings, 0.95)
+
+        self.assertEqual([(i, j) for i, j, _ in ann], [(i, j) for i, j, _ in exact])
+        self.assertEqual(sorted(j for _, j, _ in ann), [20, 21, 22, 23, 24])
@@ -6,7 +6,7 @@ from unittest.mock import Mock, patch
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
-from ..models import Notebook
+from ..models import KnowledgeBaseItem, Notebook
 from ..services.notebook_service import NotebookService
 from ..exceptions import NotebookNotFoundError
 
@@ -76,4 +76,94 @@ class NotebookServiceTests(TestCase):
         notebook = Notebook.objects.create(user=other_user, name="Other Notebook")
 
         with self.assertRaises(NotebookNotFoundError):
-            self.service.get_notebook_or_404(str(notebook.id), self.user) 
\ No newline at end of file
+            self.service.get_notebook_or_404(str(notebook.id), self.user) 
+
+
+class FileServiceUploadTests(TestCase):
+    """Test cases for claim-check uploads in FileService."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="uploader", email="uploader@example.com", password="testpass123"
+        )
+        self.notebook = Notebook.objects.create(user=self.user, name="Uploads")
+        with patch("notebooks.services.file_service.FileProcessor"), \
+                patch("notebooks.services.file_service.UploadProcessor"):
+            from ..services.file_service import FileService
+
+            self.service = FileService()
+        self.file_obj = Mock()
+        self.file_obj.name = "paper.pdf"
+
+    @patch("notebooks.utils.storage.get_minio_backend")
+    @patch("notebooks.tasks.process_file_upload_task")
+    def test_staged_upload_deleted_when_queueing_fails(self, mock_task, mock_get_backend):
+        """A staged object no task will consume is removed from MinIO."""
+        mock_task.delay.side_effect = ConnectionError("broker down")
+        staged = {"object_key": "staging/uploads/1/abc/paper.pdf", "size": 3, "sha256": "00"}
+
+        with patch.object(self.service, "stage_upload", return_value=staged):
+            result = self.service.handle_single_file_upload(self.file_obj, "abc", self.notebook, self.user)
+
+        self.assertTrue(result["success"])
+        mock_get_backend.return_value.delete_file.assert_called_once_with(staged["object_key"])
+        kb_item = KnowledgeBaseItem.objects.get(id=result["file_id"])
+        self.assertEqual(kb_item.processing_status, "error")
+
+    @patch("notebooks.utils.storage.get_minio_backend")
+    @patch("notebooks.tasks.process_file_upload_task")
+    def test_batch_staged_upload_deleted_when_queueing_fails(self, mock_task, mock_get_backend):
+        """The staged object of the file that failed to queue is removed; queued ones are left to their tasks."""
+        mock_task.delay.side_effect = [None, ConnectionError("broker down")]
+        second = Mock()
+        second.name = "notes.pdf"
+        staged = [
+            {"object_key": f"staging/uploads/1/{i}/file.pdf", "size": 3, "sha256": "00"} for i in range(2)
+        ]
+
+        with patch.object(self.service, "stage_upload", side_effect=staged):
+            with self.assertRaises(ConnectionError):
+                self.service.handle_batch_file_upload([self.file_obj, second], self.notebook, self.user)
+
+        mock_get_backend.return_value.delete_file.assert_called_once_with(staged[1]["object_key"])
+
+
+class FileStorageServiceDeleteTests(TestCase):
+    """Test cases for deleting knowledge base items in FileStorageService."""
+
+    def setUp(self):
+        from ..utils.storage import FileStorageService
+
+        self.user = User.objects.create_user(
+            username="deleter", email="deleter@example.com", password="testpass123"
+        )
+        self.service = FileStorageService()
+        self.service._minio_backend = Mock()
+        self.service._minio_backend.delete_folder.return_value = True
+
+    def _kb_item(self, **kwargs):
+        return KnowledgeBaseItem.objects.create(user=self.user, title="paper", content_type="document", **kwargs)
+
+    @patch("notebooks.tasks.delete_kb_item_vectors_task")
+    def test_vector_cleanup_queued_after_delete(self, mock_task):
+        """Chunks are removed by a retried task, so Milvus is never needed to delete the item."""
+        mock_task.delay.side_effect = ConnectionError("broker down")
+        manifest = {"collection": "user_files_1", "source": "paper.md", "chunks": [["c0", "h0"]]}
+        kb_item = self._kb_item(processing_status="done", rag_manifest=manifest)
+
+        with patch("rag.rag.collection_exists") as mock_exists:
+            self.assertTrue(self.service.delete_knowledge_base_item(str(kb_item.id), self.user.pk))
+
+        mock_exists.assert_not_called()
+        self.assertFalse(KnowledgeBaseItem.objects.filter(id=kb_item.id).exists())
+        mock_task.delay.assert_called_once_with(
+            self.user.pk, kb_item_id=str(kb_item.id), collection="user_files_1", chunk_ids=["c0"]
+        )
+
+    @patch("notebooks.tasks.delete_kb_item_vectors_task")
+    def test_never_ingested_item_skips_vector_cleanup(self, mock_task):
+        """An item whose processing never finished has no chunks to delete."""
+        kb_item = self._kb_item(processing_status="in_progress")
+
+        self.assertTrue(self.service.delete_knowledge_base_item(str(kb_item.id), self.user.pk))
+        mock_task.delay.assert_not_called()
@@ -11,6 +11,7 @@ from ..tasks import (
     process_url_task,
     process_file_upload_task,
     _check_batch_completion,
+    _download_staged_upload,
     cleanup_old_batch_jobs
 )
 
@@ -78,6 +79,21 @@ class TaskTests(TestCase):
         self.assertIsNotNone(result)
         mock_file_service.upload_file.assert_called_once()
 
+    @patch('notebooks.utils.storage.get_minio_backend')
+    def test_download_staged_upload_verifies_claim_check(self, mock_get_backend):
+        """A staged upload whose hash does not match the claim check is rejected."""
+        import os
+        from ..exceptions import ValidationError
+
+        mock_get_backend.return_value.download_to_path.return_value = (17, "abc")
+
+        temp_path = _download_staged_upload("staging/uploads/1/u1/test.txt", "test.txt", 17, "abc")
+        self.assertTrue(os.path.exists(temp_path))
+        os.unlink(temp_path)
+
+        with self.assertRaises(ValidationError):
+            _download_staged_upload("staging/uploads/1/u1/test.txt", "test.txt", 17, "def")
+
     def test_check_batch_completion(self):
         """Test batch completion checking."""
         # Create batch job with items
@@ -84,4 +84,77 @@ class NotebookViewTests(APITestCase):
         url = reverse("notebook-detail", kwargs={"pk": str(other_notebook.id)})
         response = self.client.get(url)
 
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND) 
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND) 
+
+class RangeHeaderParsingTests(TestCase):
+    """Test cases for HTTP Range parsing used by raw file streaming."""
+
+    def test_absent_or_unsupported_header_serves_full_object(self):
+        from ..utils.helpers import parse_range_header
+
+        self.assertIsNone(parse_range_header(None, 1000))
+        self.assertIsNone(parse_range_header("items=0-10", 1000))
+        self.assertIsNone(parse_range_header("bytes=0-10,20-30", 1000))
+        self.assertIsNone(parse_range_header("bytes=abc-", 1000))
+
+    def test_explicit_and_open_ended_ranges(self):
+        from ..utils.helpers import parse_range_header
+
+        self.assertEqual(parse_range_header("bytes=0-499", 1000), (0, 499))
+        self.assertEqual(parse_range_header("bytes=500-", 1000), (500, 999))
+        self.assertEqual(parse_range_header("bytes=900-5000", 1000), (900, 999))
+
+    def test_suffix_range(self):
+        from ..utils.helpers import parse_range_header
+
+        self.assertEqual(parse_range_header("bytes=-200", 1000), (800, 999))
+        self.assertEqual(parse_range_header("bytes=-5000", 1000), (0, 999))
+
+    def test_unsatisfiable_range(self):
+        from ..utils.helpers import parse_range_header
+
+        with self.assertRaises(ValueError):
+            parse_range_header("bytes=1000-", 1000)
+        with self.assertRaises(ValueError):
+            parse_range_header("bytes=-0", 1000)
+
+
+class AsgiStreamingTests(TestCase):
+    """Test cases for the helpers that keep streaming responses unbuffered under ASGI."""
+
+    def test_is_asgi_request(self):
+        from django.core.handlers.asgi import ASGIRequest
+        from django.test import RequestFactory
+        from ..utils.view_mixins import is_asgi_request
+
+        scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []}
+        self.assertTrue(is_asgi_request(ASGIRequest(scope, None)))
+        self.assertFalse(is_asgi_request(RequestFactory().get("/")))
+
+    def test_aiter_blocking_yields_in_order_and_closes(self):
+        import asyncio
+        from ..utils.view_mixins import aiter_blocking
+
+        closed = []
+
+        def chunks():
+            try:
+                yield b"a"
+                yield b"b"
+                yield b"c"
+            finally:
+                closed.append(True)
+
+        async def consume(limit):
+            received = []
+            stream = aiter_blocking(chunks())
+            async for chunk in stream:
+                received.append(chunk)
+                if len(received) == limit:
+                    break
+            await stream.aclose()
+            return received
+
+        self.assertEqual(asyncio.run(consume(limit=None)), [b"a", b"b", b"c"])
+        self.assertEqual(asyncio.run(consume(limit=1)), [b"a"])
+        self.assertEqual(closed, [True, True])
@@ -34,6 +34,7 @@ from .storage import (
 from .helpers import (
     clean_title,
     calculate_content_hash,
+    parse_range_header,
     calculate_user_content_hash,
     check_content_duplicate,
     calculate_source_hash,
@@ -101,6 +102,7 @@ __all__ = [
     # Helpers
     'clean_title',
     'calculate_content_hash',
+    'parse_range_header',
     'calculate_user_content_hash',
     'check_content_duplicate',
     'calculate_source_hash',
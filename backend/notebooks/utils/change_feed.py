@@ -0,0 +1,235 @@
+"""
+Notebook file change feed over Redis pub/sub.
+
+Signals in the web process and in Celery workers publish per-file deltas on
+``notebook_file_changes:{notebook_id}``; SSE streams subscribe to the channel
+and block on it instead of polling. The broker Redis (CELERY_BROKER_URL) is used
+by default. ``LocalRedis`` is an in-process stand-in implementing the subset of
+the redis-py API used here and by upload_status.py (pub/sub plus get/set with
+expiry), for tests and single-process development.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .helpers import config
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "notebook_file_changes"
+# Seconds between non-blocking reads in FileChangeSubscription.aget_event
+ASYNC_POLL_INTERVAL = 0.2
+
+
+def channel_for(notebook_id) -> str:
+    return f"{CHANNEL_PREFIX}:{notebook_id}"
+
+
+def serialize_file_entry(ki) -> Dict[str, Any]:
+    """Build the file list entry for a KnowledgeItem, as sent by the file list stream."""
+    metadata = ki.knowledge_base_item.metadata or {}
+    return {
+        "file_id": str(ki.knowledge_base_item.id),
+        "title": ki.knowledge_base_item.title,
+        "upload_timestamp": ki.added_at.isoformat() if ki.added_at else None,
+        "parsing_status": ki.knowledge_base_item.processing_status,
+        "original_filename": metadata.get('original_filename', ki.knowledge_base_item.title),
+        "file_extension": metadata.get('file_extension', ''),
+        "file_size": metadata.get('file_size', 0),
+        "metadata": metadata,
+        "knowledge_item_id": str(ki.id)
+    }
+
+
+class LocalPubSub:
+    """In-process stand-in for redis.client.PubSub."""
+
+    def __init__(self, broker: "LocalRedis"):
+        self._broker = broker
+        self._queue = queue.Queue()
+        self._channels = set()
+
+    def subscribe(self, *channels):
+        for channel in channels:
+            self._broker._add_subscriber(channel, self._queue)
+            self._channels.add(channel)
+
+    def unsubscribe(self, *channels):
+        for channel in channels or list(self._channels):
+            self._broker._remove_subscriber(channel, self._queue)
+            self._channels.discard(channel)
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        try:
+            return self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.unsubscribe()
+
+
+class LocalRedis:
+    """In-process stand-in for the redis-py client's publish/pubsub API."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, list] = {}
+        # name -> (expires_at or None, value)
+        self._values: Dict[str, tuple] = {}
+
+    def _add_subscriber(self, channel: str, subscriber: queue.Queue):
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(subscriber)
+
+    def _remove_subscriber(self, channel: str, subscriber: queue.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(channel, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+    def publish(self, channel: str, message) -> int:
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for subscriber in subscribers:
+            subscriber.put({'type': 'message', 'channel': channel.encode('utf-8'), 'data': message})
+        return len(subscribers)
+
+    def pubsub(self, **kwargs) -> LocalPubSub:
+        return LocalPubSub(self)
+
+    def set(self, name: str, value, ex: Optional[int] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        expires_at = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._values[name] = (expires_at, value)
+        return True
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._values.get(name)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._values[name]
+                return None
+            return value
+
+    def delete(self, *names) -> int:
+        with self._lock:
+            return sum(self._values.pop(name, None) is not None for name in names)
+
+
+class FileChangeSubscription:
+    """A subscription to one notebook's file change channel."""
+
+    def __init__(self, pubsub, channel: str):
+        self._pubsub = pubsub
+        self.channel = channel
+
+    def _read(self, timeout: float) -> Optional[Dict[str, Any]]:
+        message = self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message and message.get('type') == 'message':
+            try:
+                return json.loads(message['data'])
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Ignoring malformed change event on {self.channel}: {e}")
+        return None
+
+    def get_event(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Block up to timeout seconds for the next change event; None on timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            event = self._read(remaining)
+            if event is not None:
+                return event
+
+    async def aget_event(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        get_event for ASGI streams: the subscription is read without blocking
+        and the wait happens on the event loop, so no thread is held.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            event = self._read(0)
+            if event is not None:
+                return event
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(ASYNC_POLL_INTERVAL, remaining))
+
+    def close(self):
+        try:
+            self._pubsub.unsubscribe(self.channel)
+            self._pubsub.close()
+        except Exception as e:
+            logger.warning(f"Error closing change feed subscription {self.channel}: {e}")
+
+
+class FileChangeFeed:
+    """Publish and subscribe to notebook file change deltas."""
+
+    def __init__(self, redis_client=None):
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        """Lazy initialization of the Redis client."""
+        if self._redis is None:
+            if config.CHANGE_FEED_BACKEND == "local":
+                self._redis = LocalRedis()
+            else:
+                import redis
+                self._redis = redis.Redis.from_url(config.CHANGE_FEED_REDIS_URL)
+        return self._redis
+
+    def publish(self, notebook_id, change_type: str, file_data: Dict[str, Any] = None,
+                file_entry: Dict[str, Any] = None) -> bool:
+        """Publish one file change; file_entry is the full file list entry when available."""
+        event = {
+            'type': change_type,
+            'timestamp': time.time(),
+            'file_data': file_data,
+            'file': file_entry,
+            'notebook_id': str(notebook_id)
+        }
+        try:
+            self.redis.publish(channel_for(notebook_id), json.dumps(event))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to publish {change_type} for notebook {notebook_id}: {e}")
+            return False
+
+    def subscribe(self, notebook_id) -> FileChangeSubscription:
+        channel = channel_for(notebook_id)
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(channel)
+        return FileChangeSubscription(pubsub, channel)
+
+
+_change_feed = None
+_change_feed_lock = threading.Lock()
+
+
+def get_change_feed() -> FileChangeFeed:
+    """Get the process-wide file change feed."""
+    global _change_feed
+    with _change_feed_lock:
+        if _change_feed is None:
+            _change_feed = FileChangeFeed()
+        return _change_feed
@@ -0,0 +1,221 @@
+"""
+Content-addressed extraction cache for the notebooks module.
+
+Marker conversion and whisper transcription results are stored in MinIO under
+``{prefix}/{processor}/{version}/{sha256}/`` keyed by the SHA-256 of the raw
+uploaded file. A repeat upload of the same bytes, by any user or into any
+notebook, reuses the cached result and copies the cached objects into the new
+knowledge base item instead of converting again.
+"""
+
+import json
+import logging
+import mimetypes
+import os
+from typing import Any, Dict, List, Optional
+
+from .helpers import config
+
+# Bump a version to invalidate cached results for that processor
+PROCESSOR_VERSIONS = {
+    'marker_pdf': 'marker-1.7.5.1',
+    'marker_document': 'marker-1.7.5.1',
+    'whisper': 'faster-whisper-large-v3-turbo.1',
+}
+
+PROCESSOR_BY_EXTENSION = {
+    '.pdf': 'marker_pdf',
+    '.ppt': 'marker_document',
+    '.pptx': 'marker_document',
+    '.doc': 'marker_document',
+    '.docx': 'marker_document',
+    '.mp3': 'whisper',
+    '.wav': 'whisper',
+    '.m4a': 'whisper',
+    '.mp4': 'whisper',
+    '.avi': 'whisper',
+    '.mov': 'whisper',
+    '.mkv': 'whisper',
+    '.webm': 'whisper',
+    '.flv': 'whisper',
+    '.wmv': 'whisper',
+    '.3gp': 'whisper',
+    '.ogv': 'whisper',
+    '.m4v': 'whisper',
+}
+
+# Result fields that do not depend on the uploaded filename
+CACHED_RESULT_FIELDS = (
+    'content',
+    'metadata',
+    'features_available',
+    'skip_content_file',
+)
+
+
+class ExtractionCache:
+    """Global cache of processing results keyed by raw file hash and processor version."""
+
+    def __init__(self, minio_backend=None):
+        self.service_name = "extraction_cache"
+        self.logger = logging.getLogger(f"{__name__}.extraction_cache")
+        self.enabled = config.ENABLE_EXTRACTION_CACHE
+        self.prefix = config.EXTRACTION_CACHE_PREFIX
+        self._minio_backend = minio_backend
+
+    @property
+    def minio_backend(self):
+        """Lazy initialization of MinIO backend."""
+        if self._minio_backend is None:
+            from .storage import MinIOBackend
+            self._minio_backend = MinIOBackend()
+        return self._minio_backend
+
+    def log_operation(self, operation: str, details: str = "", level: str = "info"):
+        """Log service operations with consistent formatting."""
+        message = f"[{self.service_name}] {operation}"
+        if details:
+            message += f": {details}"
+        getattr(self.logger, level)(message)
+
+    def _cache_prefix(self, processor: str, file_hash: str) -> str:
+        return f"{self.prefix}/{processor}/{PROCESSOR_VERSIONS[processor]}/{file_hash}"
+
+    def processor_for(self, file_extension: str) -> Optional[str]:
+        """Return the cached processor name for an extension, or None if not cacheable."""
+        if not self.enabled:
+            return None
+        return PROCESSOR_BY_EXTENSION.get((file_extension or '').lower())
+
+    def lookup(self, file_hash: str, file_extension: str) -> Optional[Dict[str, Any]]:
+        """Return the cached manifest for this file, or None on a miss."""
+        processor = self.processor_for(file_extension)
+        if not processor or not file_hash:
+            return None
+
+        manifest_key = f"{self._cache_prefix(processor, file_hash)}/manifest.json"
+        try:
+            if not self.minio_backend.file_exists(manifest_key):
+                return None
+            manifest_bytes = self.minio_backend.get_file(manifest_key)
+            if not manifest_bytes:
+                return None
+            manifest = json.loads(manifest_bytes.decode('utf-8'))
+            self.log_operation("cache_hit", f"{processor} result for {file_hash[:16]}")
+            return manifest
+        except Exception as e:
+            self.log_operation("lookup_error", f"Failed to read cache manifest {manifest_key}: {e}", "warning")
+            return None
+
+    def store(self, file_hash: str, file_extension: str, processing_result: Dict[str, Any]) -> bool:
+        """
+        Store a successful processing result. Marker output files are uploaded from
+        the temporary marker directory; transcripts are stored as content.md.
+        """
+        processor = self.processor_for(file_extension)
+        if not processor or not file_hash or not self._is_cacheable(processor, processing_result):
+            return False
+
+        cache_prefix = self._cache_prefix(processor, file_hash)
+        try:
+            manifest = {
+                'processor': processor,
+                'version': PROCESSOR_VERSIONS[processor],
+                'file_hash': file_hash,
+                'result': {
+                    field: processing_result[field]
+                    for field in CACHED_RESULT_FIELDS
+                    if field in processing_result
+                },
+                'files': [],
+            }
+
+            marker_result = processing_result.get('marker_extraction_result') or {}
+            temp_marker_dir = marker_result.get('temp_marker_dir')
+            if temp_marker_dir:
+                manifest['files'] = self._store_marker_dir(cache_prefix, temp_marker_dir)
+            else:
+                transcript_key = f"{cache_prefix}/content.md"
+                if not self.minio_backend.store_file(
+                    transcript_key, processing_result.get('content', '').encode('utf-8'), 'text/markdown'
+                ):
+                    return False
+                manifest['transcript_key'] = transcript_key
+
+            # The manifest is written last so a partial upload is never served
+            manifest_bytes = json.dumps(manifest).encode('utf-8')
+            if not self.minio_backend.store_file(f"{cache_prefix}/manifest.json", manifest_bytes, 'application/json'):
+                return False
+
+            self.log_operation("cache_stored", f"{processor} result for {file_hash[:16]} ({len(manifest['files'])} files)")
+            return True
+        except Exception as e:
+            self.log_operation("store_error", f"Failed to cache {processor} result for {file_hash[:16]}: {e}", "warning")
+            return False
+
+    def _is_cacheable(self, processor: str, processing_result: Dict[str, Any]) -> bool:
+        """Only cache results produced by the primary (expensive) processor."""
+        if processor == 'whisper':
+            return bool((processing_result.get('metadata') or {}).get('has_transcript'))
+        marker_result = processing_result.get('marker_extraction_result') or {}
+        return bool(marker_result.get('success') and marker_result.get('temp_marker_dir'))
+
+    def _store_marker_dir(self, cache_prefix: str, temp_marker_dir: str) -> List[Dict[str, Any]]:
+        files = []
+        for root, _, names in os.walk(temp_marker_dir):
+            for name in names:
+                if name.endswith('.json'):
+                    continue
+                source_file = os.path.join(root, name)
+                # Keep subdirectories so same-named outputs do not overwrite each other
+                relative_path = os.path.relpath(source_file, temp_marker_dir).replace(os.sep, '/')
+                cache_key = f"{cache_prefix}/files/{relative_path}"
+                content_type, _ = mimetypes.guess_type(name)
+                if not self.minio_backend.store_file_from_path(cache_key, source_file, content_type):
+                    raise Exception(f"Failed to store cached file {cache_key}")
+                files.append({
+                    'name': name,
+                    'relative_path': relative_path,
+                    'cache_key': cache_key,
+                    'size': os.path.getsize(source_file),
+                })
+        return files
+
+    def build_processing_result(self, manifest: Dict[str, Any], clean_name: str) -> Dict[str, Any]:
+        """
+        Rebuild a processing result from a cache manifest for an upload named clean_name.
+
+        Filename-dependent fields (content and transcript filenames) are derived from
+        the current upload, not from the upload that populated the cache.
+        """
+        result = dict(manifest.get('result', {}))
+        metadata = dict(result.get('metadata') or {})
+        metadata['extraction_cache_hit'] = True
+        metadata['extraction_cache_version'] = manifest.get('version')
+        result['metadata'] = metadata
+        result['processing_time'] = 'cached'
+
+        if manifest.get('processor') == 'whisper':
+            transcript_filename = f"{clean_name}.md"
+            if metadata.get('has_transcript'):
+                metadata['transcript_filename'] = transcript_filename
+                result['transcript_filename'] = transcript_filename
+        else:
+            result['content_filename'] = f"{clean_name}.md"
+            result['marker_extraction_result'] = {
+                'success': True,
+                'cached_files': manifest.get('files', []),
+                'clean_title': clean_name,
+            }
+        return result
+
+
+_extraction_cache = None
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Get the process-wide extraction cache."""
+    global _extraction_cache
+    if _extraction_cache is None:
+        _extraction_cache = ExtractionCache()
+    return _extraction_cache
@@ -54,6 +54,39 @@ class NotebooksConfig:
         # Audio processing
         self.DEFAULT_WHISPER_MODEL = getattr(django_settings, "NOTEBOOKS_WHISPER_MODEL", "base")
 
+        # Resident marker PDF conversion service (see processors/pdf_conversion_service.py)
+        self.PDF_CONVERTER_ADDRESS = getattr(django_settings, "NOTEBOOKS_PDF_CONVERTER_ADDRESS", None)
+        self.PDF_CONVERTER_AUTHKEY = getattr(django_settings, "NOTEBOOKS_PDF_CONVERTER_AUTHKEY", "")
+        self.PDF_CONVERTER_TIMEOUT = getattr(django_settings, "NOTEBOOKS_PDF_CONVERTER_TIMEOUT", 900)
+        self.PDF_CONVERTER_WORKERS = getattr(django_settings, "NOTEBOOKS_PDF_CONVERTER_WORKERS", 1)
+
+        # Page-sharded PDF extraction (documents longer than one shard are split across workers)
+        self.PDF_PAGE_SHARD_SIZE = getattr(django_settings, "NOTEBOOKS_PDF_PAGE_SHARD_SIZE", 20)
+        self.PDF_PAGE_WORKERS = getattr(django_settings, "NOTEBOOKS_PDF_PAGE_WORKERS", min(4, os.cpu_count() or 1))
+
+        # Streaming uploads: chunk size for temp-file copies and MinIO multipart part size
+        self.UPLOAD_CHUNK_SIZE = getattr(django_settings, "NOTEBOOKS_UPLOAD_CHUNK_SIZE", 1024 * 1024)
+        self.MINIO_PART_SIZE = getattr(django_settings, "NOTEBOOKS_MINIO_PART_SIZE", 16 * 1024 * 1024)
+        self.DOWNLOAD_CHUNK_SIZE = getattr(django_settings, "NOTEBOOKS_DOWNLOAD_CHUNK_SIZE", 256 * 1024)
+
+        # Claim-check uploads: the web tier stages files here and tasks receive only the key
+        self.UPLOAD_STAGING_PREFIX = getattr(django_settings, "NOTEBOOKS_UPLOAD_STAGING_PREFIX", "staging/uploads")
+
+        # Content-addressed extraction cache (see utils/extraction_cache.py)
+        self.ENABLE_EXTRACTION_CACHE = getattr(django_settings, "NOTEBOOKS_ENABLE_EXTRACTION_CACHE", True)
+        self.EXTRACTION_CACHE_PREFIX = getattr(django_settings, "NOTEBOOKS_EXTRACTION_CACHE_PREFIX", "extraction_cache")
+
+        # Image captioning: concurrent vision requests per task and retries per image
+        self.CAPTION_CONCURRENCY = getattr(django_settings, "NOTEBOOKS_CAPTION_CONCURRENCY", 8)
+        self.CAPTION_MAX_RETRIES = getattr(django_settings, "NOTEBOOKS_CAPTION_MAX_RETRIES", 3)
+
+        # File change feed for SSE streams (redis pub/sub on the broker, or "local" in-process)
+        self.CHANGE_FEED_BACKEND = getattr(django_settings, "NOTEBOOKS_CHANGE_FEED_BACKEND", "redis")
+        self.CHANGE_FEED_REDIS_URL = getattr(
+            django_settings, "NOTEBOOKS_CHANGE_FEED_REDIS_URL",
+            getattr(django_settings, "CELERY_BROKER_URL", "redis://localhost:6379/0")
+        )
+
         # Content indexing
         self.ENABLE_CONTENT_INDEXING = getattr(django_settings, "NOTEBOOKS_ENABLE_CONTENT_INDEXING", True)
         self.MAX_SEARCH_RESULTS = getattr(django_settings, "NOTEBOOKS_MAX_SEARCH_RESULTS", 50)
@@ -134,6 +167,51 @@ def calculate_content_hash(content: Union[str, bytes]) -> str:
     return hashlib.sha256(content_bytes).hexdigest()
 
 
+def parse_range_header(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range HTTP Range header into an inclusive (start, end) byte range.
+    
+    Returns None when the header is absent, malformed or asks for multiple ranges,
+    in which case the whole object should be served. Raises ValueError when the
+    range cannot be satisfied for an object of the given size (416).
+    
+    Args:
+        range_header: Value of the Range request header
+        size: Total object size in bytes
+        
+    Returns:
+        (start, end) inclusive byte offsets, or None
+    """
+    if not range_header:
+        return None
+    
+    unit, _, ranges = range_header.strip().partition('=')
+    if unit.strip().lower() != 'bytes' or not ranges or ',' in ranges:
+        return None
+    
+    start_str, sep, end_str = ranges.strip().partition('-')
+    start_str, end_str = start_str.strip(), end_str.strip()
+    if not sep or not (start_str or end_str):
+        return None
+    if (start_str and not start_str.isdigit()) or (end_str and not end_str.isdigit()):
+        return None
+    
+    if not start_str:
+        # Suffix range: the last N bytes
+        suffix_length = int(end_str)
+        if suffix_length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - suffix_length), size - 1
+    
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
 def calculate_user_content_hash(content: str, user_id: int) -> str:
     """
     Calculate SHA256 hash of text content for duplicate detection of pasted text.
@@ -6,7 +6,7 @@ from .frame_extractor import extract_frames
 from .image_deduplicator import (
     prepare_work_dir, text_ocr_filter_dedupe, global_pixel_dedupe,
     sequential_deep_dedupe, global_deep_dedupe, load_clip_model_and_preprocessing,
-    setup_cuda_environment, get_optimal_device
+    setup_cuda_environment, get_optimal_device, encode_images
 )
 from .caption_generator import generate_captions_for_directory
 
@@ -20,5 +20,6 @@ __all__ = [
     'load_clip_model_and_preprocessing',
     'setup_cuda_environment',
     'get_optimal_device',
+    'encode_images',
     'generate_captions_for_directory'
 ]
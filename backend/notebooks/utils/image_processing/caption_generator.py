@@ -6,24 +6,135 @@ import os
 import base64
 import mimetypes
 import json
+import random
 import re
+import threading
+import time
 import logging
-from typing import List, Dict, Any, Optional
-from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Hashable, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CAPTION_PROMPT = "Look at the image and do the following in one sentences: Focus more on important numbers or text shown in the image (such as signs, titles, or numbers), and briefly summarize the key points from the text. Give your answer in one clear sentences. Add a tag at the end if you find <chart> or <table> in the image."
+CAPTION_MODEL = "gpt-4.1-mini"
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_MAX_WORKERS = 8
+
+# OpenAI clients are thread-safe and keep a connection pool, so one is shared per API key
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+def get_openai_client(api_key: Optional[str] = None):
+    """Return the shared OpenAI client for api_key (loaded from settings if not given)."""
+    from openai import OpenAI
+
+    if not api_key:
+        api_key = load_api_key_from_settings()
+
+    if not api_key:
+        raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY environment variable or provide api_key parameter.")
+
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = OpenAI(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
+def bytes_to_data_url(data: bytes, mime: Optional[str] = None) -> str:
+    """Return a data-URL string for in-memory image bytes."""
+    mime = mime or "application/octet-stream"
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
 def to_data_url(path: str) -> str:
     """Read an image file and return data-URL string suitable for OpenAI vision models."""
     mime, _ = mimetypes.guess_type(path)
-    mime = mime or "application/octet-stream"
     with open(path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode()
-    return f"data:{mime};base64,{b64}"
+        return bytes_to_data_url(f.read(), mime)
+
+def _is_retryable(error: Exception) -> bool:
+    """Retry rate limits, server errors and connection failures, not bad requests."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        return not isinstance(error, ValueError)
+    return status_code == 429 or status_code >= 500
+
+def request_caption(
+    data_url: str,
+    prompt: str = DEFAULT_CAPTION_PROMPT,
+    api_key: Optional[str] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff_base: float = 1.0,
+) -> str:
+    """
+    Request a caption for an image data URL, retrying transient failures.
+
+    Retries use exponential backoff with jitter. The last error is raised once
+    max_retries is exhausted.
+    """
+    client = get_openai_client(api_key)
+    attempt = 0
+    while True:
+        try:
+            chat = client.chat.completions.create(
+                model=CAPTION_MODEL,
+                messages=[{
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "image_url", "image_url": {"url": data_url}},
+                    ],
+                }],
+                max_tokens=100,
+            )
+            return chat.choices[0].message.content.strip()
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = backoff_base * (2 ** attempt) + random.uniform(0, backoff_base)
+            logger.warning(f"Caption request failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+def generate_captions_concurrently(
+    images: Dict[Hashable, Tuple[bytes, Optional[str]]],
+    prompt: str = DEFAULT_CAPTION_PROMPT,
+    api_key: Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+) -> Dict[Hashable, str]:
+    """
+    Caption many in-memory images with a bounded number of concurrent requests.
+
+    Args:
+        images: Mapping of caller key to (image bytes, MIME type)
+        prompt: Prompt for caption generation
+        api_key: OpenAI API key
+        max_workers: Maximum concurrent vision requests
+        max_retries: Retries per image for transient failures
+
+    Returns:
+        Mapping of key to caption for images that were captioned successfully
+    """
+    if not images:
+        return {}
+
+    def caption(item):
+        key, (data, mime) = item
+        try:
+            return key, request_caption(bytes_to_data_url(data, mime), prompt, api_key, max_retries)
+        except Exception as e:
+            logger.error(f"Caption generation failed for image {key}: {e}")
+            return key, None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(images)))) as executor:
+        results = executor.map(caption, images.items())
+        return {key: text for key, text in results if text}
 
 def generate_caption_for_image(
     image_path: str, 
-    prompt: str = "Look at the image and do the following in one sentences: Focus more on important numbers or text shown in the image (such as signs, titles, or numbers), and briefly summarize the key points from the text. Give your answer in one clear sentences. Add a tag at the end if you find <chart> or <table> in the image.",
+    prompt: str = DEFAULT_CAPTION_PROMPT,
     api_key: Optional[str] = None
 ) -> str:
     """
@@ -38,31 +149,7 @@ def generate_caption_for_image(
         Generated caption text
     """
     try:
-        from openai import OpenAI
-        
-        # Get API key
-        if not api_key:
-            api_key = load_api_key_from_settings()
-
-        if not api_key:
-            raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY environment variable or provide api_key parameter.")
-        
-        client = OpenAI(api_key=api_key)
-        data_url = to_data_url(image_path)
-        
-        chat = client.chat.completions.create(
-            model="gpt-4.1-mini",  # Using the latest vision model
-            messages=[{
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": data_url}},
-                ],
-            }],
-            max_tokens=100,
-        )
-        
-        return chat.choices[0].message.content.strip()
+        return request_caption(to_data_url(image_path), prompt, api_key)
         
     except Exception as e:
         logger.error(f"Caption generation failed for {image_path}: {e}")
@@ -71,7 +158,7 @@ def generate_caption_for_image(
 def generate_captions_for_directory(
     images_dir: str,
     output_file: str,
-    prompt: str = "Look at the image and do the following in one sentences: Focus more on important numbers or text shown in the image (such as signs, titles, or numbers), and briefly summarize the key points from the text. Give your answer in one clear sentences. Add a tag at the end if you find <chart> or <table> in the image.",
+    prompt: str = DEFAULT_CAPTION_PROMPT,
     api_key: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
@@ -100,19 +187,23 @@ def generate_captions_for_directory(
             logger.warning(f"No PNG images found in {images_dir}")
             return []
         
-        results = []
         total_images = len(images)
         logger.info(f"Starting caption generation for {total_images} images...")
         
-        # Use tqdm for progress bar
-        for img in tqdm(images, desc="Generating captions", unit="image"):
-            image_path = os.path.join(images_dir, img)
-            caption_text = generate_caption_for_image(image_path, prompt, api_key)
-            
-            results.append({
+        image_paths = [os.path.join(images_dir, img) for img in images]
+        image_data = {}
+        for image_path in image_paths:
+            with open(image_path, "rb") as f:
+                image_data[image_path] = (f.read(), mimetypes.guess_type(image_path)[0])
+        
+        captions = generate_captions_concurrently(image_data, prompt, api_key)
+        results = [
+            {
                 "image_path": image_path,
-                "caption": caption_text
-            })
+                "caption": captions.get(image_path, "Caption generation failed")
+            }
+            for image_path in image_paths
+        ]
         
         # Sort results by image number (extracted from filename)
         try:
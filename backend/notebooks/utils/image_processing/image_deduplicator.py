@@ -3,10 +3,14 @@ Image deduplication using pixel-level and semantic similarity methods.
 """
 
 import os
+import io
 import shutil
 import time
 import re
+import hashlib
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Dict, Any, Optional
 import numpy as np
 from PIL import Image
@@ -91,26 +95,36 @@ def get_optimal_device(force_device: Optional[str] = None) -> str:
         logger.warning(f"Device detection failed: {e}, using CPU")
         return "cpu"
 
-def load_clip_model_and_preprocessing(device: Optional[str] = None):
+def load_clip_model_and_preprocessing(device: Optional[str] = None, owner: Any = None):
     """
     Load CLIP model and preprocessing for semantic similarity using open_clip_torch.
 
+    The model is shared process-wide through the model registry, so repeated
+    calls on the same device do not load it again.
+
     Args:
         device: Device to load model on (cuda, mps, cpu). Auto-detect if None.
+        owner: Object keeping the model; it stays loaded while owner is alive.
 
     Returns:
         Tuple of (model, preprocess_function, actual_device_used)
     """
+    from backend.model_registry import get_clip_model
+
+    actual_device = get_optimal_device(device)
+    return get_clip_model(actual_device, lambda: _load_clip_model(actual_device), owner=owner)
+
+
+def _load_clip_model(actual_device: str):
     try:
         import torch
         import open_clip
+        from backend.model_registry import CLIP_MODEL, CLIP_PRETRAINED
 
-        # Get optimal device
-        actual_device = get_optimal_device(device)
         logger.info(f"Loading CLIP model on device: {actual_device}")
 
         # Load model using open_clip
-        model, _, preprocess = open_clip.create_model_and_transforms('ViT-L-14-quickgelu', pretrained='dfn2b')
+        model, _, preprocess = open_clip.create_model_and_transforms(CLIP_MODEL, pretrained=CLIP_PRETRAINED)
         
         # Move model to device with error handling
         try:
@@ -140,11 +154,162 @@ def load_clip_model_and_preprocessing(device: Optional[str] = None):
         logger.error(f"Failed to load CLIP model: {e}")
         raise
 
+# Rows of the pairwise score matrix computed per block; bounds peak memory to
+# DEDUPE_BLOCK_SIZE x n scores regardless of frame count
+DEDUPE_BLOCK_SIZE = 512
+
+# Images encoded per CLIP forward pass, and threads decoding/preprocessing ahead of it
+DEFAULT_EMBEDDING_BATCH_SIZE = 32
+DEFAULT_DECODE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Approximate-nearest-neighbour dedupe: below ANN_MIN_TRAIN_SIZE embeddings an exact
+# flat index is used; above it an IVF index with sqrt(n) lists, probing ANN_NPROBE
+ANN_MIN_TRAIN_SIZE = 2048
+ANN_NPROBE = 16
+ANN_QUERY_BATCH_SIZE = 4096
+
+# Bit counts for every byte value, used when numpy lacks bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def _list_work_images(work_dir: str) -> List[str]:
+    """List image files in work_dir in the order the dedupe passes compare them."""
+    return sorted([f for f in os.listdir(work_dir)
+                   if os.path.isfile(os.path.join(work_dir, f)) and not f.endswith("dedupe_log.json")], reverse=True)
+
+def dhash_to_uint64(img_hash) -> np.uint64:
+    """Pack a 64-bit imagehash (8x8 dHash) into a single unsigned integer."""
+    return np.packbits(img_hash.hash.flatten()).view(">u8")[0]
+
+def hamming_distances(hashes: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """
+    Pairwise Hamming distances between two arrays of packed uint64 hashes.
+    
+    Returns an array of shape (len(hashes), len(others)).
+    """
+    xor = np.bitwise_xor(hashes[:, None], others[None, :])
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).astype(np.int64)
+    return _POPCOUNT_TABLE[xor.view(np.uint8)].reshape(xor.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+def find_duplicates(
+    count: int,
+    score_block,
+    is_duplicate,
+    block_size: int = DEDUPE_BLOCK_SIZE,
+) -> List[Tuple[int, int, float]]:
+    """
+    Greedy "keep first, remove later" duplicate search over all pairs.
+    
+    Item i removes every later item j that is still kept and satisfies
+    is_duplicate(score). Items that were already removed never remove others,
+    matching the original nested-loop semantics.
+    
+    Args:
+        count: Number of items
+        score_block: Callable (start, end) -> scores of rows [start, end) against all items
+        is_duplicate: Vectorized predicate over a row of scores
+        block_size: Rows scored per block
+        
+    Returns:
+        List of (kept_index, removed_index, score) for each removal
+    """
+    removed = np.zeros(count, dtype=bool)
+    indices = np.arange(count)
+    removals = []
+    
+    for start in range(0, count, block_size):
+        end = min(start + block_size, count)
+        scores = score_block(start, end)
+        duplicates = is_duplicate(scores)
+        
+        for offset in range(end - start):
+            i = start + offset
+            if removed[i]:
+                continue
+            matches = np.flatnonzero(duplicates[offset] & ~removed & (indices > i))
+            if matches.size:
+                removed[matches] = True
+                removals.extend((i, int(j), float(scores[offset, j])) for j in matches)
+    
+    return removals
+
+def _build_faiss_index(embeddings: np.ndarray, nprobe: int = ANN_NPROBE):
+    """Build an inner-product faiss index over L2-normalised embeddings."""
+    import faiss
+
+    count, dim = embeddings.shape
+    if count < ANN_MIN_TRAIN_SIZE:
+        index = faiss.IndexFlatIP(dim)
+    else:
+        nlist = max(1, int(np.sqrt(count)))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+        index.nprobe = min(nprobe, nlist)
+    index.add(embeddings)
+    return index
+
+def find_duplicates_ann(
+    embeddings: np.ndarray,
+    threshold: float,
+    nprobe: int = ANN_NPROBE,
+    query_batch_size: int = ANN_QUERY_BATCH_SIZE,
+) -> List[Tuple[int, int, float]]:
+    """
+    Greedy "keep first, remove later" duplicate search using a faiss radius search.
+    
+    Each embedding's neighbours with cosine similarity >= threshold are found with
+    range_search instead of scoring all pairs; the removal order and semantics
+    match find_duplicates.
+    
+    Returns:
+        List of (kept_index, removed_index, similarity) for each removal
+    """
+    count = len(embeddings)
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    index = _build_faiss_index(embeddings, nprobe)
+    # range_search keeps results strictly above the radius
+    radius = float(np.nextafter(np.float32(threshold), np.float32(-np.inf)))
+
+    removed = np.zeros(count, dtype=bool)
+    removals = []
+
+    for start in range(0, count, query_batch_size):
+        end = min(start + query_batch_size, count)
+        lims, similarities, neighbours = index.range_search(embeddings[start:end], radius)
+
+        for offset in range(end - start):
+            i = start + offset
+            if removed[i]:
+                continue
+            row_neighbours = neighbours[lims[offset]:lims[offset + 1]]
+            row_similarities = similarities[lims[offset]:lims[offset + 1]]
+            order = np.argsort(row_neighbours)
+            for j, sim in zip(row_neighbours[order], row_similarities[order]):
+                if j > i and not removed[j] and sim >= threshold:
+                    removed[j] = True
+                    removals.append((i, int(j), float(sim)))
+
+    return removals
+
+def _remove_files(file_paths: List[str]) -> int:
+    removed_count = 0
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+            removed_count += 1
+        except Exception as e:
+            logger.warning(f"Failed to remove {file_path}: {e}")
+    return removed_count
+
 def global_pixel_dedupe(work_dir: str, max_distance: int) -> Tuple[int, List[Dict[str, Any]]]:
     """
     Compare all images in work_dir with all other images using perceptual hash.
     If hash Hamming distance <= max_distance, removes one of them (the latter in sorted order).
     
+    Hashes are packed into a uint64 array and compared block-wise with popcount.
+    Only removed pairs are logged.
+    
     Args:
         work_dir: Directory containing images to deduplicate
         max_distance: Maximum Hamming distance for considering images as duplicates
@@ -153,8 +318,7 @@ def global_pixel_dedupe(work_dir: str, max_distance: int) -> Tuple[int, List[Dic
         Tuple of (removed_count, logs)
     """
     try:
-        files_names = sorted([f for f in os.listdir(work_dir)
-                              if os.path.isfile(os.path.join(work_dir, f)) and not f.endswith("dedupe_log.json")], reverse=True)
+        files_names = _list_work_images(work_dir)
         
         if len(files_names) < 2:
             return 0, []
@@ -162,91 +326,80 @@ def global_pixel_dedupe(work_dir: str, max_distance: int) -> Tuple[int, List[Dic
         logger.info(f"Starting global pixel deduplication on {len(files_names)} images")
         
         # Compute hashes for all images
-        image_hashes = {}
+        packed_hashes = []
         valid_file_paths = []
         
         for fname in files_names:
             fpath = os.path.join(work_dir, fname)
             try:
                 with Image.open(fpath) as img:
-                    img_hash = imagehash.dhash(img)
-                    image_hashes[fpath] = img_hash
+                    packed_hashes.append(dhash_to_uint64(imagehash.dhash(img)))
                     valid_file_paths.append(fpath)
             except Exception as e:
                 logger.warning(f"Could not process image {fname}: {e}")
         
-        # Compare all pairs and mark for removal
-        files_marked_for_removal = set()
-        global_pixel_logs = []
+        hashes = np.array(packed_hashes, dtype=np.uint64)
+        removals = find_duplicates(
+            len(valid_file_paths),
+            lambda start, end: hamming_distances(hashes[start:end], hashes),
+            lambda distances: distances <= max_distance,
+        )
         
-        for i in range(len(valid_file_paths)):
-            file_a_path = valid_file_paths[i]
-            if file_a_path in files_marked_for_removal:
-                continue
-                
-            file_a_name = os.path.basename(file_a_path)
-            hash_a = image_hashes[file_a_path]
-            
-            for j in range(i + 1, len(valid_file_paths)):
-                file_b_path = valid_file_paths[j]
-                if file_b_path in files_marked_for_removal:
-                    continue
-                    
-                file_b_name = os.path.basename(file_b_path)
-                hash_b = image_hashes[file_b_path]
-                dist = hash_a - hash_b
-                
-                log_entry = {
-                    "file_a": file_a_name, 
-                    "file_b": file_b_name, 
-                    "hamming": int(dist), 
-                    "removed": False, 
-                    "removed_file": None
-                }
-                
-                if dist <= max_distance:
-                    log_entry["removed"] = True
-                    log_entry["removed_file"] = file_b_name
-                    files_marked_for_removal.add(file_b_path)
-                
-                global_pixel_logs.append(log_entry)
+        global_pixel_logs = [
+            {
+                "file_a": os.path.basename(valid_file_paths[i]),
+                "file_b": os.path.basename(valid_file_paths[j]),
+                "hamming": int(dist),
+                "removed": True,
+                "removed_file": os.path.basename(valid_file_paths[j])
+            }
+            for i, j, dist in removals
+        ]
         
         # Remove marked files
-        removed_count = 0
-        for file_path in files_marked_for_removal:
-            try:
-                os.remove(file_path)
-                removed_count += 1
-            except Exception as e:
-                logger.warning(f"Failed to remove {file_path}: {e}")
+        removed_count = _remove_files([valid_file_paths[j] for _, j, _ in removals])
         
-        logger.info(f"Global pixel deduplication completed: removed {removed_count} images")
+        logger.info(
+            f"Global pixel deduplication completed: removed {removed_count} of {len(valid_file_paths)} images"
+        )
         return removed_count, global_pixel_logs
 
     except Exception as e:
         logger.error(f"Global pixel deduplication failed: {e}")
         raise
 
-def sequential_deep_dedupe(work_dir: str, threshold: float, device: str, model, preprocess) -> Tuple[int, List[Dict[str, Any]]]:
+def sequential_deep_dedupe(
+    work_dir: str,
+    threshold: float,
+    device: str,
+    model,
+    preprocess,
+    batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+    decode_workers: int = DEFAULT_DECODE_WORKERS,
+    embedding_cache: Optional[Dict[str, np.ndarray]] = None,
+) -> Tuple[int, List[Dict[str, Any]]]:
     """
     Sequentially compare each image to the next using CLIP embeddings.
     Remove the latter if cosine similarity >= threshold.
 
+    Every image is encoded once up front in batches (see encode_images), then the
+    kept image is compared against each following image in order.
+
     Args:
         work_dir: Directory containing images
         threshold: Cosine similarity threshold for removal
         device: Device for model inference
         model: CLIP model
         preprocess: CLIP preprocessing function
+        batch_size: Images per CLIP forward pass
+        decode_workers: Threads decoding and preprocessing images
+        embedding_cache: Embeddings keyed by image hash, shared across passes
 
     Returns:
         Tuple of (removed_count, logs)
     """
     try:
-        import torch
-
-        files = sorted([f for f in os.listdir(work_dir)
-                        if os.path.isfile(os.path.join(work_dir, f)) and not f.endswith("dedupe_log.json")], reverse=True)
+        files = _list_work_images(work_dir)
 
         removed_count = 0
         deep_logs = []
@@ -256,197 +409,249 @@ def sequential_deep_dedupe(work_dir: str, threshold: float, device: str, model,
 
         logger.info(f"Starting sequential deep deduplication on {len(files)} images")
 
-        idx = 0
-        while idx < len(files) - 1:
-            fname_prev = files[idx]
-            fname_next = files[idx + 1]
-            path_prev = os.path.join(work_dir, fname_prev)
-            path_next = os.path.join(work_dir, fname_next)
+        valid_file_paths, embeddings = encode_images(
+            [os.path.join(work_dir, fname) for fname in files],
+            device, model, preprocess,
+            batch_size=batch_size,
+            decode_workers=decode_workers,
+            embedding_cache=embedding_cache,
+        )
 
-            try:
-                # Load and preprocess images
-                img_prev = Image.open(path_prev).convert('RGB')
-                img_next = Image.open(path_next).convert('RGB')
+        if len(valid_file_paths) < 2:
+            return 0, deep_logs
 
-                # Ensure tensors are on the correct device
-                input_prev = preprocess(img_prev).unsqueeze(0)
-                input_next = preprocess(img_next).unsqueeze(0)
-                
-                # Move tensors to device with error handling
+        # Cosine similarity of each image to its successor in the original order
+        prev_idx = 0
+        for next_idx in range(1, len(valid_file_paths)):
+            fname_prev = os.path.basename(valid_file_paths[prev_idx])
+            fname_next = os.path.basename(valid_file_paths[next_idx])
+            sim = float(np.dot(embeddings[prev_idx], embeddings[next_idx]))
+
+            log_entry = {
+                "file_prev": fname_prev,
+                "file_next": fname_next,
+                "cosine": sim,
+                "removed": False,
+                "removed_file": None
+            }
+
+            if sim >= threshold:
                 try:
-                    input_prev = input_prev.to(device)
-                    input_next = input_next.to(device)
-                except Exception as device_error:
-                    logger.warning(f"Device transfer failed: {device_error}, using CPU")
-                    input_prev = input_prev.to("cpu")
-                    input_next = input_next.to("cpu")
-                    # Move model to CPU if needed
-                    if next(model.parameters()).device != torch.device("cpu"):
-                        model = model.to("cpu")
-
-                # Get embeddings using open_clip
-                with torch.no_grad():
-                    emb_prev = model.encode_image(input_prev)
-                    emb_next = model.encode_image(input_next)
-
-                    # Normalize embeddings
-                    emb_prev = emb_prev / emb_prev.norm(dim=-1, keepdim=True)
-                    emb_next = emb_next / emb_next.norm(dim=-1, keepdim=True)
+                    os.remove(valid_file_paths[next_idx])
+                    removed_count += 1
+                    log_entry["removed"] = True
+                    log_entry["removed_file"] = fname_next
+                except Exception as e_remove:
+                    logger.warning(f"Failed to remove {valid_file_paths[next_idx]}: {e_remove}")
+                    log_entry["error"] = f"Failed to remove {valid_file_paths[next_idx]}"
+                    prev_idx = next_idx
+            else:
+                prev_idx = next_idx
 
-                    # Calculate cosine similarity - ensure tensors are on same device
-                    if emb_prev.device != emb_next.device:
-                        emb_next = emb_next.to(emb_prev.device)
-                    
-                    sim = float(torch.dot(emb_prev.squeeze(), emb_next.squeeze()))
+            deep_logs.append(log_entry)
 
-                # Clean up GPU memory
-                del input_prev, input_next, emb_prev, emb_next
-                if device != "cpu":
-                    torch.cuda.empty_cache()
+        logger.info(f"Sequential deep deduplication completed: removed {removed_count} images")
+        return removed_count, deep_logs
 
-                log_entry = {
-                    "file_prev": fname_prev,
-                    "file_next": fname_next,
-                    "cosine": sim,
-                    "removed": False,
-                    "removed_file": None
-                }
+    except Exception as e:
+        logger.error(f"Sequential deep deduplication failed: {e}")
+        raise
 
-                if sim >= threshold:
-                    try:
-                        os.remove(path_next)
-                        removed_count += 1
-                        log_entry["removed"] = True
-                        log_entry["removed_file"] = fname_next
-                        files.pop(idx + 1)  # Remove from list
-                    except Exception as e_remove:
-                        logger.warning(f"Failed to remove {path_next}: {e_remove}")
-                        log_entry["error"] = f"Failed to remove {path_next}"
-                        idx += 1
-                else:
-                    idx += 1
+def _load_image_for_embedding(file_path: str, preprocess, embedding_cache: Dict[str, np.ndarray]):
+    """Hash an image file and, unless its embedding is cached, decode and preprocess it."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    image_key = hashlib.sha1(data).hexdigest()
+    if image_key in embedding_cache:
+        return image_key, None
+    with Image.open(io.BytesIO(data)) as img:
+        return image_key, preprocess(img.convert('RGB'))
+
+def _encode_batch(model, tensors: List[Any], device: str):
+    """Encode one batch of preprocessed tensors and return (model, normalised embeddings)."""
+    import torch
+
+    batch = torch.stack(tensors)
+    try:
+        batch = batch.to(device)
+    except Exception as device_error:
+        logger.warning(f"Device transfer failed: {device_error}, using CPU")
+        batch = batch.to("cpu")
+        # Move model to CPU if needed
+        if next(model.parameters()).device != torch.device("cpu"):
+            model = model.to("cpu")
+
+    with torch.no_grad():
+        embeddings = model.encode_image(batch)
+        embeddings = embeddings / embeddings.norm(dim=-1, keepdim=True)
+    return model, embeddings.float().cpu().numpy()
+
+def encode_images(
+    file_paths: List[str],
+    device: str,
+    model,
+    preprocess,
+    batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+    decode_workers: int = DEFAULT_DECODE_WORKERS,
+    embedding_cache: Optional[Dict[str, np.ndarray]] = None,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Encode images with CLIP in batches and stack the L2-normalised embeddings.
 
-                deep_logs.append(log_entry)
+    A thread pool reads, hashes and preprocesses images ahead of the model, with
+    at most a few batches in flight. Embeddings are stored in embedding_cache
+    keyed by the SHA-1 of the image bytes, so passes sharing a cache (and
+    identical frames within a pass) encode each image only once.
 
+    Returns:
+        Tuple of (paths that were encoded, float32 matrix of shape (n, dim))
+    """
+    if embedding_cache is None:
+        embedding_cache = {}
+    batch_size = max(1, int(batch_size))
+
+    image_keys: Dict[str, str] = {}
+    batch_keys: List[str] = []
+    batch_tensors: List[Any] = []
+    encoded_images = 0
+
+    def flush():
+        nonlocal model, encoded_images
+        if not batch_tensors:
+            return
+        model, batch_embeddings = _encode_batch(model, batch_tensors, device)
+        for image_key, embedding in zip(batch_keys, batch_embeddings):
+            embedding_cache[image_key] = embedding
+        encoded_images += len(batch_tensors)
+        batch_keys.clear()
+        batch_tensors.clear()
+
+    with ThreadPoolExecutor(max_workers=max(1, int(decode_workers))) as executor:
+        pending = deque()
+        paths = iter(file_paths)
+        max_in_flight = batch_size * 2
+
+        while True:
+            for fpath in paths:
+                pending.append((fpath, executor.submit(_load_image_for_embedding, fpath, preprocess, embedding_cache)))
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+
+            fpath, future = pending.popleft()
+            try:
+                image_key, tensor = future.result()
             except Exception as e:
-                logger.warning(f"Error processing {fname_prev} and {fname_next}: {e}")
-                idx += 1
+                logger.warning(f"Could not process image {os.path.basename(fpath)}: {e}")
+                continue
 
-        logger.info(f"Sequential deep deduplication completed: removed {removed_count} images")
-        return removed_count, deep_logs
+            image_keys[fpath] = image_key
+            if tensor is None or image_key in embedding_cache or image_key in batch_keys:
+                continue
+            batch_keys.append(image_key)
+            batch_tensors.append(tensor)
+            if len(batch_tensors) >= batch_size:
+                flush()
 
-    except Exception as e:
-        logger.error(f"Sequential deep deduplication failed: {e}")
-        raise
+        flush()
 
-def global_deep_dedupe(work_dir: str, threshold: float, device: str, model, preprocess) -> Tuple[int, List[Dict[str, Any]]]:
+    if encoded_images and device == "cuda":
+        import torch
+        torch.cuda.empty_cache()
+
+    valid_file_paths = [fpath for fpath in file_paths if image_keys.get(fpath) in embedding_cache]
+    logger.info(
+        f"Encoded {encoded_images} images ({len(valid_file_paths) - encoded_images} from cache) "
+        f"in batches of {batch_size}"
+    )
+    if not valid_file_paths:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    embeddings = np.stack([embedding_cache[image_keys[fpath]] for fpath in valid_file_paths])
+    return valid_file_paths, embeddings.astype(np.float32, copy=False)
+
+def global_deep_dedupe(
+    work_dir: str,
+    threshold: float,
+    device: str,
+    model,
+    preprocess,
+    batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+    decode_workers: int = DEFAULT_DECODE_WORKERS,
+    embedding_cache: Optional[Dict[str, np.ndarray]] = None,
+    method: str = "exact",
+) -> Tuple[int, List[Dict[str, Any]]]:
     """
     Compare all images in work_dir using CLIP embeddings.
     If cosine similarity >= threshold, removes one (the latter in sorted order).
 
+    With method="exact" embeddings are stacked into a matrix and compared with a
+    blocked matrix multiply. With method="ann" near-duplicates are found with a
+    faiss radius search, which scales to very large frame sets. Only removed
+    pairs are logged.
+
     Args:
         work_dir: Directory containing images
         threshold: Cosine similarity threshold for removal
         device: Device for model inference
         model: CLIP model
         preprocess: CLIP preprocessing function
+        batch_size: Images per CLIP forward pass
+        decode_workers: Threads decoding and preprocessing images
+        embedding_cache: Embeddings keyed by image hash, shared across passes
+        method: "exact" for all-pairs comparison or "ann" for faiss radius search
 
     Returns:
         Tuple of (removed_count, logs)
     """
     try:
-        import torch
-
-        files_names = sorted([f for f in os.listdir(work_dir)
-                              if os.path.isfile(os.path.join(work_dir, f)) and not f.endswith("dedupe_log.json")], reverse=True)
+        files_names = _list_work_images(work_dir)
 
         if len(files_names) < 2:
             return 0, []
 
-        logger.info(f"Starting global deep deduplication on {len(files_names)} images")
+        logger.info(f"Starting global deep deduplication ({method}) on {len(files_names)} images")
 
         # Compute embeddings for all images
-        image_embeddings = {}
-        valid_file_paths = []
-
-        for fname in files_names:
-            fpath = os.path.join(work_dir, fname)
+        valid_file_paths, embeddings = encode_images(
+            [os.path.join(work_dir, fname) for fname in files_names],
+            device, model, preprocess,
+            batch_size=batch_size,
+            decode_workers=decode_workers,
+            embedding_cache=embedding_cache,
+        )
+
+        removals = None
+        if method == "ann" and len(valid_file_paths) >= 2:
             try:
-                img = Image.open(fpath).convert('RGB')
-                input_tensor = preprocess(img).unsqueeze(0)
-                
-                # Move tensor to device with error handling
-                try:
-                    input_tensor = input_tensor.to(device)
-                except Exception as device_error:
-                    logger.warning(f"Device transfer failed for {fname}: {device_error}, using CPU")
-                    input_tensor = input_tensor.to("cpu")
-                    # Move model to CPU if needed
-                    if next(model.parameters()).device != torch.device("cpu"):
-                        model = model.to("cpu")
-
-                with torch.no_grad():
-                    embedding = model.encode_image(input_tensor)
-                    embedding = embedding / embedding.norm(dim=-1, keepdim=True)
-                    # Move to CPU for storage to save GPU memory
-                    image_embeddings[fpath] = embedding.squeeze().cpu().numpy()
-                    valid_file_paths.append(fpath)
-                
-                # Clean up GPU memory
-                del input_tensor, embedding
-                if device != "cpu":
-                    torch.cuda.empty_cache()
-
-            except Exception as e:
-                logger.warning(f"Could not process image {fname}: {e}")
-
-        # Compare all pairs and mark for removal
-        files_marked_for_removal = set()
-        global_deep_logs = []
-
-        for i in range(len(valid_file_paths)):
-            file_a_path = valid_file_paths[i]
-            if file_a_path in files_marked_for_removal:
-                continue
-
-            file_a_name = os.path.basename(file_a_path)
-            emb_a = image_embeddings[file_a_path]
-
-            for j in range(i + 1, len(valid_file_paths)):
-                file_b_path = valid_file_paths[j]
-                if file_b_path in files_marked_for_removal:
-                    continue
-
-                file_b_name = os.path.basename(file_b_path)
-                emb_b = image_embeddings[file_b_path]
-
-                sim = float(np.dot(emb_a, emb_b))
-
-                log_entry = {
-                    "file_a": file_a_name,
-                    "file_b": file_b_name,
-                    "cosine": sim,
-                    "removed": False,
-                    "removed_file": None
-                }
-
-                if sim >= threshold:
-                    log_entry["removed"] = True
-                    log_entry["removed_file"] = file_b_name
-                    files_marked_for_removal.add(file_b_path)
-
-                global_deep_logs.append(log_entry)
+                removals = find_duplicates_ann(embeddings, threshold)
+            except ImportError:
+                logger.warning("faiss not available, falling back to exact global deep deduplication")
+
+        if removals is None:
+            removals = find_duplicates(
+                len(valid_file_paths),
+                lambda start, end: embeddings[start:end] @ embeddings.T,
+                lambda similarities: similarities >= threshold,
+            )
+
+        global_deep_logs = [
+            {
+                "file_a": os.path.basename(valid_file_paths[i]),
+                "file_b": os.path.basename(valid_file_paths[j]),
+                "cosine": sim,
+                "removed": True,
+                "removed_file": os.path.basename(valid_file_paths[j])
+            }
+            for i, j, sim in removals
+        ]
 
         # Remove marked files
-        removed_count = 0
-        for file_path in files_marked_for_removal:
-            try:
-                os.remove(file_path)
-                removed_count += 1
-            except Exception as e:
-                logger.warning(f"Failed to remove {file_path}: {e}")
+        removed_count = _remove_files([valid_file_paths[j] for _, j, _ in removals])
 
-        logger.info(f"Global deep deduplication completed: removed {removed_count} images")
+        logger.info(
+            f"Global deep deduplication completed: removed {removed_count} of {len(valid_file_paths)} images"
+        )
         return removed_count, global_deep_logs
 
     except Exception as e:
@@ -469,8 +674,7 @@ def text_ocr_filter_dedupe(work_dir: str, min_words: int, ocr_lang: str = 'en',
     try:
         import easyocr
 
-        files_names = sorted([f for f in os.listdir(work_dir)
-                              if os.path.isfile(os.path.join(work_dir, f)) and not f.endswith("dedupe_log.json")], reverse=True)
+        files_names = _list_work_images(work_dir)
 
         if len(files_names) == 0:
             return 0, []
@@ -9,13 +9,13 @@ import logging
 import os
 import tempfile
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
 
-from .helpers import calculate_content_hash, calculate_source_hash
+from .helpers import calculate_content_hash, calculate_source_hash, config
 
 try:
     from minio import Minio
@@ -27,6 +27,21 @@ except ImportError:
     MINIO_AVAILABLE = False
 
 
+class _HashingReader:
+    """File-like wrapper that hashes and counts bytes as they are read."""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+    
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+
 class MinIOBackend:
     """MinIO backend for file storage operations."""
     
@@ -93,6 +108,82 @@ class MinIOBackend:
             self.logger.error(f"Error storing file {object_key}: {e}")
             return False
     
+    def store_file_from_path(self, object_key: str, file_path: str, content_type: str = None) -> bool:
+        """
+        Stream a file on disk into MinIO without reading it into memory.
+        
+        put_object uploads from the file handle in multipart parts of
+        NOTEBOOKS_MINIO_PART_SIZE bytes, so peak memory is one part.
+        """
+        try:
+            extra_args = {}
+            if content_type:
+                extra_args['content_type'] = content_type
+            
+            with open(file_path, 'rb') as f:
+                self.client.put_object(
+                    bucket_name=self.bucket_name,
+                    object_name=object_key,
+                    data=f,
+                    length=os.path.getsize(file_path),
+                    part_size=config.MINIO_PART_SIZE,
+                    **extra_args
+                )
+            
+            self.logger.debug(f"Streamed file {file_path} to {object_key}")
+            return True
+            
+        except (S3Error, OSError) as e:
+            self.logger.error(f"Error streaming file {file_path} to {object_key}: {e}")
+            return False
+    
+    def stage_upload(self, file_obj, user_id: int, upload_id: str) -> Dict[str, Any]:
+        """
+        Stream an uploaded file to the staging prefix for a worker to claim.
+        
+        The SHA-256 is computed while MinIO reads the stream, so the upload is
+        never held in memory. Returns the staged object_key, size and sha256.
+        """
+        object_key = f"{config.UPLOAD_STAGING_PREFIX}/{user_id}/{upload_id}/{os.path.basename(file_obj.name)}"
+        if hasattr(file_obj, 'seek'):
+            file_obj.seek(0)
+        reader = _HashingReader(file_obj)
+        
+        extra_args = {}
+        content_type = getattr(file_obj, 'content_type', None)
+        if content_type:
+            extra_args['content_type'] = content_type
+        
+        self.client.put_object(
+            bucket_name=self.bucket_name,
+            object_name=object_key,
+            data=reader,
+            length=file_obj.size,
+            part_size=config.MINIO_PART_SIZE,
+            **extra_args
+        )
+        
+        if hasattr(file_obj, 'seek'):
+            file_obj.seek(0)
+        self.logger.debug(f"Staged upload {file_obj.name} at {object_key} ({reader.size} bytes)")
+        return {'object_key': object_key, 'size': reader.size, 'sha256': reader.sha256.hexdigest()}
+    
+    def download_to_path(self, object_key: str, file_path: str) -> Tuple[int, str]:
+        """Stream an object to a local file in chunks and return (size, sha256)."""
+        sha256 = hashlib.sha256()
+        size = 0
+        response = self.open_file_stream(object_key)
+        try:
+            with open(file_path, 'wb') as f:
+                for chunk in response.stream(config.DOWNLOAD_CHUNK_SIZE):
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+        finally:
+            response.close()
+            response.release_conn()
+        return size, sha256.hexdigest()
+    
     def get_file(self, object_key: str) -> Optional[bytes]:
         """Retrieve file content from MinIO."""
         try:
@@ -102,6 +193,31 @@ class MinIOBackend:
             self.logger.error(f"Error retrieving file {object_key}: {e}")
             return None
     
+    def stat_file(self, object_key: str):
+        """Return object metadata (size, etag, last_modified, content_type), or None if missing."""
+        try:
+            return self.client.stat_object(self.bucket_name, object_key)
+        except S3Error as e:
+            self.logger.error(f"Error reading metadata for {object_key}: {e}")
+            return None
+    
+    def open_file_stream(self, object_key: str, offset: int = 0, length: int = 0):
+        """
+        Open a streaming read of an object, optionally limited to a byte range.
+        
+        The caller must close() and release_conn() the returned response.
+        A length of 0 reads to the end of the object.
+        """
+        return self.client.get_object(self.bucket_name, object_key, offset=offset, length=length)
+    
+    def file_exists(self, object_key: str) -> bool:
+        """Check whether an object exists in MinIO."""
+        try:
+            self.client.stat_object(self.bucket_name, object_key)
+            return True
+        except S3Error:
+            return False
+    
     def delete_file(self, object_key: str) -> bool:
         """Delete a single file from MinIO."""
         try:
@@ -222,6 +338,28 @@ class MinIOBackend:
             self.logger.error(f"Unexpected error copying file from {source_key} to {dest_key}: {e}")
             return False
 
+    def copy_file_with_auto_key(
+        self,
+        source_key: str,
+        filename: str,
+        prefix: str,
+        user_id: str = None,
+        file_id: str = None,
+        subfolder: str = None,
+        subfolder_uuid: str = None,
+    ) -> Optional[str]:
+        """
+        Copy an existing object to the key save_file_with_auto_key would generate.
+
+        Returns:
+            Generated object key, or None if the copy failed
+        """
+        object_key = self._generate_object_key(
+            prefix, filename, user_id=user_id, file_id=file_id,
+            subfolder=subfolder, subfolder_uuid=subfolder_uuid,
+        )
+        return object_key if self.copy_file(source_key, object_key) else None
+
     def list_objects(self, prefix: str = "") -> List[str]:
         """List objects in bucket with optional prefix."""
         try:
@@ -471,13 +609,10 @@ class FileStorageService:
                     # Store original file if provided
                     original_file_key = None
                     if original_file_path and os.path.exists(original_file_path):
-                        with open(original_file_path, 'rb') as f:
-                            original_content = f.read()
-                        
                         original_filename = metadata.get('original_filename', os.path.basename(original_file_path))
                         original_file_key = f"{base_key}/{original_filename}"
                         
-                        if not self.minio_backend.store_file(original_file_key, original_content, metadata.get('content_type')):
+                        if not self.minio_backend.store_file_from_path(original_file_key, original_file_path, metadata.get('content_type')):
                             self.log_operation("original_file_storage_failed", f"Failed to store original file for existing KB item: {original_filename}", "warning")
                         else:
                             self.log_operation("original_file_stored", f"Successfully stored original file for existing KB item: {original_filename}")
@@ -560,13 +695,10 @@ class FileStorageService:
             # Store original file if provided
             original_file_key = None
             if original_file_path and os.path.exists(original_file_path):
-                with open(original_file_path, 'rb') as f:
-                    original_content = f.read()
-                
                 original_filename = metadata.get('original_filename', os.path.basename(original_file_path))
                 original_file_key = f"{base_key}/{original_filename}"
                 
-                if not self.minio_backend.store_file(original_file_key, original_content, metadata.get('content_type')):
+                if not self.minio_backend.store_file_from_path(original_file_key, original_file_path, metadata.get('content_type')):
                     self.log_operation("original_file_storage_failed", f"Failed to store original file: {original_filename}", "warning")
             
             # Update database record with the object keys
@@ -759,10 +891,15 @@ class FileStorageService:
                     self.log_operation("source_marked_for_deletion", 
                         f"Source {ki.source.id} will be deleted (created KB item {kb_item_id})")
             
+            # Read what its RAG chunks are while the manifest is still available;
+            # they are deleted by a retried task once the item is gone.
+            from rag.rag import vector_cleanup_args
+            vector_cleanup = vector_cleanup_args(kb_item)
+
             # Delete entire folder by prefix (using trailing slash to indicate prefix)
             prefix = f"{user_id}/kb/{kb_item_id}/"
             folder_deletion_success = self.minio_backend.delete_folder(prefix)
-            
+
             # Delete the KB item (this will cascade delete KnowledgeItems due to FK constraint)
             kb_item.delete()
             
@@ -772,6 +909,9 @@ class FileStorageService:
                 self.log_operation("sources_deleted", 
                     f"Deleted {deleted_sources[0]} Source record(s) that created KB item {kb_item_id}")
             
+            if vector_cleanup:
+                self._queue_vector_cleanup(user_id, vector_cleanup)
+            
             if not folder_deletion_success:
                 self.log_operation("kb_item_deleted_with_issues", 
                     f"Deleted KB item: {kb_item_id}, but had issues deleting folder: {prefix}", 
@@ -786,6 +926,17 @@ class FileStorageService:
             self.log_operation("delete_kb_error", f"Failed to delete KB item {kb_item_id}: {e}", "error")
             return False
     
+    def _queue_vector_cleanup(self, user_id: int, vector_cleanup: dict):
+        """Queue deletion of a deleted KB item's RAG chunks; a vector store outage never blocks the delete."""
+        try:
+            from ..tasks import delete_kb_item_vectors_task
+            delete_kb_item_vectors_task.delay(user_id, **vector_cleanup)
+            self.log_operation("vectors_delete_queued",
+                f"Queued RAG chunk deletion for KB item {vector_cleanup['kb_item_id']}")
+        except Exception as e:
+            self.log_operation("vectors_delete_error",
+                f"Failed to queue RAG chunk deletion for KB item {vector_cleanup['kb_item_id']}: {e}", "error")
+    
     def unlink_knowledge_item_from_notebook(self, kb_item_id: str, notebook_id: int, user_id: int) -> bool:
         """Remove a knowledge item link from a specific notebook."""
         try:
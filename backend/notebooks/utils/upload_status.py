@@ -0,0 +1,75 @@
+"""
+Upload status shared between the web process and Celery workers.
+
+Uploads are processed by a worker's UploadProcessor while the status endpoints
+read the web process's, so statuses kept in an instance's memory never reach
+clients. Every status update is also written to the change feed's Redis under
+``upload_status:{upload_file_id}`` (expiring after UPLOAD_STATUS_TTL seconds)
+and read back from there.
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from .change_feed import get_change_feed
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "upload_status"
+# Statuses outlive any upload; completed ones are also found through storage
+UPLOAD_STATUS_TTL = 24 * 60 * 60
+
+
+def status_key(upload_file_id) -> str:
+    return f"{KEY_PREFIX}:{upload_file_id}"
+
+
+class UploadStatusStore:
+    """Read and write upload statuses in Redis; failures are logged, never raised."""
+
+    def __init__(self, redis_client=None):
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        """The change feed's Redis client unless one was given."""
+        if self._redis is None:
+            self._redis = get_change_feed().redis
+        return self._redis
+
+    def set(self, upload_file_id: str, status: Dict[str, Any]) -> bool:
+        try:
+            self.redis.set(status_key(upload_file_id), json.dumps(status, default=str), ex=UPLOAD_STATUS_TTL)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to store status for upload {upload_file_id}: {e}")
+            return False
+
+    def get(self, upload_file_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = self.redis.get(status_key(upload_file_id))
+            return json.loads(value) if value else None
+        except Exception as e:
+            logger.warning(f"Failed to read status for upload {upload_file_id}: {e}")
+            return None
+
+    def delete(self, upload_file_id: str) -> None:
+        try:
+            self.redis.delete(status_key(upload_file_id))
+        except Exception as e:
+            logger.warning(f"Failed to delete status for upload {upload_file_id}: {e}")
+
+
+_upload_status_store = None
+_upload_status_store_lock = threading.Lock()
+
+
+def get_upload_status_store() -> UploadStatusStore:
+    """Get the process-wide upload status store."""
+    global _upload_status_store
+    with _upload_status_store_lock:
+        if _upload_status_store is None:
+            _upload_status_store = UploadStatusStore()
+        return _upload_status_store
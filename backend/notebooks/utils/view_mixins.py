@@ -2,9 +2,13 @@
 Common view mixins and utilities for notebooks app.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from django.http import Http404
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.response import Response
@@ -12,9 +16,49 @@ from rest_framework.views import APIView
 from rest_framework import permissions, authentication
 
 from ..models import Notebook, KnowledgeBaseItem, KnowledgeItem
+from .helpers import config, parse_range_header
 
 logger = logging.getLogger(__name__)
 
+# Blocking reads behind async streaming responses (see aiter_blocking)
+_stream_io_executor = ThreadPoolExecutor(thread_name_prefix="stream-io")
+_DONE = object()
+
+
+def is_asgi_request(request) -> bool:
+    """
+    Whether the request is served by the ASGI handler.
+
+    Django serves a synchronous iterator under ASGI by reading it into a list
+    first, so streaming responses must pass an async iterator there instead.
+    """
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+async def aiter_blocking(iterator: Iterator) -> AsyncIterator:
+    """
+    Iterate a blocking iterator from the event loop, one item at a time on a
+    worker thread, so nothing is buffered. The iterator is closed once no read
+    is in flight, including when the client disconnects mid-read.
+    """
+    close = getattr(iterator, "close", None)
+    pending = None
+    try:
+        while True:
+            pending = _stream_io_executor.submit(next, iterator, _DONE)
+            item = await asyncio.wrap_future(pending)
+            pending = None
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        if close is not None:
+            if pending is not None and not pending.cancel():
+                # A generator cannot be closed while a thread is running it
+                pending.add_done_callback(lambda _: close())
+            else:
+                close()
+
 
 class NotebookPermissionMixin:
     """Mixin to handle notebook ownership verification."""
@@ -99,6 +143,103 @@ class FileAccessValidatorMixin:
         return notebook, kb_item, knowledge_item
 
 
+class MinIOFileServingMixin:
+    """
+    Mixin for serving MinIO objects inline with HTTP Range and ETag support.
+
+    Bytes are streamed from MinIO in chunks instead of being buffered in memory;
+    Range requests are forwarded to MinIO as offset/length reads and answered
+    with 206 Partial Content, so video seeking and PDF viewers stay responsive.
+    """
+
+    def _serve_minio_file(self, request, object_key, title):
+        """Serve a file from MinIO, honouring Range, If-Range and If-None-Match."""
+        from .storage import get_minio_backend
+        import mimetypes
+
+        minio_backend = get_minio_backend()
+        stat = minio_backend.stat_file(object_key)
+        if stat is None:
+            raise Http404("File not accessible in storage")
+
+        size = stat.size
+        etag = f'"{stat.etag}"' if stat.etag else None
+
+        # Guess content type from the title/filename
+        content_type, _ = mimetypes.guess_type(title)
+        if not content_type:
+            content_type = "application/octet-stream"
+
+        if_none_match = self._parse_etags(request.headers.get("If-None-Match"))
+        if etag and (etag in if_none_match or "*" in if_none_match):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            return self._with_file_headers(response, stat, etag, title)
+
+        byte_range = None
+        if_range = request.headers.get("If-Range")
+        if not if_range or if_range == etag:
+            try:
+                byte_range = parse_range_header(request.headers.get("Range"), size)
+            except ValueError:
+                response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            stream = minio_backend.open_file_stream(object_key, offset=start, length=length)
+            response = StreamingHttpResponse(
+                self._stream_content(request, stream),
+                status=status.HTTP_206_PARTIAL_CONTENT,
+                content_type=content_type,
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        else:
+            length = size
+            stream = minio_backend.open_file_stream(object_key)
+            response = StreamingHttpResponse(
+                self._stream_content(request, stream), content_type=content_type
+            )
+
+        response["Content-Length"] = str(length)
+        return self._with_file_headers(response, stat, etag, title)
+
+    @staticmethod
+    def _parse_etags(header_value: Optional[str]) -> list:
+        if not header_value:
+            return []
+        # Weak validators compare equal for If-None-Match
+        return [tag.strip().replace("W/", "", 1) for tag in header_value.split(",")]
+
+    def _stream_content(self, request, stream):
+        """Response content for a MinIO stream; async under ASGI so it is not read into memory."""
+        chunks = self._iter_minio_stream(stream)
+        return aiter_blocking(chunks) if is_asgi_request(request) else chunks
+
+    @staticmethod
+    def _iter_minio_stream(stream):
+        """Yield object chunks and release the MinIO connection when done."""
+        try:
+            for chunk in stream.stream(config.DOWNLOAD_CHUNK_SIZE):
+                yield chunk
+        finally:
+            stream.close()
+            stream.release_conn()
+
+    @staticmethod
+    def _with_file_headers(response, stat, etag, title):
+        response["Accept-Ranges"] = "bytes"
+        if etag:
+            response["ETag"] = etag
+        if stat.last_modified:
+            response["Last-Modified"] = http_date(stat.last_modified.timestamp())
+        response["Content-Disposition"] = f'inline; filename="{title}"'
+        response["X-Content-Type-Options"] = "nosniff"
+        response["X-Frame-Options"] = "DENY"
+        return response
+
+
 class PaginationMixin:
     """Mixin for handling pagination parameters."""
 
@@ -13,7 +13,7 @@ from pymilvus import Collection
 from pymilvus.exceptions import SchemaNotReadyException, CollectionNotExistException
 
 from ..models import Notebook, NotebookChatMessage
-from ..utils.view_mixins import StandardAPIView, NotebookPermissionMixin
+from ..utils.view_mixins import StandardAPIView, NotebookPermissionMixin, is_asgi_request
 from rag.rag import RAGChatbot, SuggestionRAGAgent, user_collection
 from ..services import ChatService
 
@@ -66,7 +66,9 @@ class RAGChatFromKBView(NotebookPermissionMixin, APIView):
             history=history,
             file_ids=file_ids,  # <-- pass file_ids for filtering
             notebook=notebook,
-            collections=collections
+            collections=collections,
+            # Under ASGI the stream is served from the event loop
+            use_async=is_asgi_request(request),
         )
 
         return StreamingHttpResponse(
@@ -1,15 +1,18 @@
 """
 File Views - Handle file upload and management operations only
 """
+import asyncio
+import json
 import logging
+import time
 import traceback
 from pathlib import Path
 from uuid import uuid4
 
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
 from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.exceptions import ValidationError
-from django.http import Http404, FileResponse
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import status, permissions, authentication
 from rest_framework.views import APIView
@@ -20,7 +23,8 @@ from ..models import Source, KnowledgeItem, KnowledgeBaseItem, BatchJob, BatchJo
 from ..serializers import FileUploadSerializer, BatchFileUploadSerializer
 from ..utils.view_mixins import (
     StandardAPIView, NotebookPermissionMixin, KnowledgeBasePermissionMixin,
-    FileAccessValidatorMixin, PaginationMixin, FileListResponseMixin
+    FileAccessValidatorMixin, PaginationMixin, FileListResponseMixin, MinIOFileServingMixin,
+    is_asgi_request,
 )
 from ..processors.upload_processor import UploadProcessor
 from ..tasks import process_file_upload_task
@@ -178,68 +182,45 @@ class FileStatusStreamView(APIView):
         # Verify notebook ownership
         from ..models import Notebook
         from rest_framework import permissions, authentication
-        import time
-        import json
         from django.http import StreamingHttpResponse
         
         if not Notebook.objects.filter(id=notebook_id, user=request.user).exists():
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
 
+        max_duration = 300  # 5 minutes maximum
+        poll_interval = 2  # Check every 2 seconds
+        close_event = f"data: {json.dumps({'status': 'stream_closed', 'job_details': {}})}\n\n"
+
         def event_stream():
             """Generator function for SSE events"""
-            max_duration = 300  # 5 minutes maximum
             start_time = time.time()
-            poll_interval = 2  # Check every 2 seconds
-
             while time.time() - start_time < max_duration:
-                try:
-                    # Get current status synchronously
-                    status_obj = upload_processor.get_upload_status(
-                        upload_file_id, request.user.pk
-                    )
-
-                    if status_obj:
-                        # Send status update as SSE event
-                        event_data = {
-                            "status": status_obj.get("status", "unknown"),
-                            "job_details": {
-                                "progress_percentage": status_obj.get(
-                                    "progress_percentage", 0
-                                ),
-                                "result": status_obj.get("metadata", {}),
-                                "error": status_obj.get("error"),
-                            },
-                        }
-
-                        yield f"data: {json.dumps(event_data)}\n\n"
-
-                        # If upload is complete, send final event and close
-                        if status_obj.get("status") in [
-                            "completed",
-                            "error",
-                            "cancelled",
-                            "unsupported",
-                        ]:
-                            break
-                    else:
-                        # No status found, might be completed or doesn't exist
-                        yield f"data: {json.dumps({'status': 'not_found', 'job_details': {}})}\n\n"
-                        break
-
-                except Exception as e:
-                    # Send error event
-                    error_data = {"status": "error", "job_details": {"error": str(e)}}
-                    yield f"data: {json.dumps(error_data)}\n\n"
+                event, finished = self._poll_status(upload_file_id, request.user.pk)
+                yield event
+                if finished:
                     break
-
                 # Wait before next poll
                 time.sleep(poll_interval)
 
             # Send final close event
-            yield f"data: {json.dumps({'status': 'stream_closed', 'job_details': {}})}\n\n"
+            yield close_event
+
+        async def aevent_stream():
+            """event_stream for ASGI: waits on the event loop instead of a thread"""
+            poll_status = sync_to_async(self._poll_status)
+            start_time = time.time()
+            while time.time() - start_time < max_duration:
+                event, finished = await poll_status(upload_file_id, request.user.pk)
+                yield event
+                if finished:
+                    break
+                await asyncio.sleep(poll_interval)
+
+            yield close_event
 
         response = StreamingHttpResponse(
-            event_stream(), content_type="text/event-stream"
+            aevent_stream() if is_asgi_request(request) else event_stream(),
+            content_type="text/event-stream",
         )
         response["Cache-Control"] = "no-cache"
         response["Connection"] = "keep-alive"
@@ -248,6 +229,41 @@ class FileStatusStreamView(APIView):
 
         return response
 
+    def _poll_status(self, upload_file_id, user_pk):
+        """Return (SSE event, whether the stream should end) for the upload's current status."""
+        try:
+            status_obj = upload_processor.get_upload_status(upload_file_id, user_pk)
+        except Exception as e:
+            # Send error event
+            error_data = {"status": "error", "job_details": {"error": str(e)}}
+            return f"data: {json.dumps(error_data)}\n\n", True
+
+        if not status_obj:
+            # No status found, might be completed or doesn't exist
+            return f"data: {json.dumps({'status': 'not_found', 'job_details': {}})}\n\n", True
+
+        # Send status update as SSE event
+        event_data = {
+            "status": status_obj.get("status", "unknown"),
+            "job_details": {
+                "progress_percentage": status_obj.get(
+                    "progress_percentage", 0
+                ),
+                "pages_processed": status_obj.get("pages_processed"),
+                "page_count": status_obj.get("page_count"),
+                "result": status_obj.get("metadata", {}),
+                "error": status_obj.get("error"),
+            },
+        }
+        # If upload is complete, send final event and close
+        finished = status_obj.get("status") in [
+            "completed",
+            "error",
+            "cancelled",
+            "unsupported",
+        ]
+        return f"data: {json.dumps(event_data)}\n\n", finished
+
 
 from django.views import View
 from django.http import JsonResponse, StreamingHttpResponse
@@ -275,120 +291,116 @@ class NotebookFileListStreamView(View):
             except Notebook.DoesNotExist:
                 return JsonResponse({"detail": "Not found."}, status=404)
             
+            from ..utils.change_feed import get_change_feed
+            
+            max_duration = 300  # 5 minutes maximum (reduce from 30 minutes)
+            heartbeat_interval = 60  # Send heartbeat every 60 seconds
+            close_event = {"type": "close", "message": "Stream ended"}
+
             def event_stream():
                 """Generator function for SSE events"""
-                import time
-                import json
-                from django.core.cache import cache
-                
-                max_duration = 300  # 5 minutes maximum (reduce from 30 minutes)
                 start_time = time.time()
-                check_interval = 2  # Check for events every 2 seconds (reduce frequency)
                 
-                # Send initial file list
+                # Subscribe before reading the initial list so no change is missed
                 try:
-                    knowledge_items = (
-                        KnowledgeItem.objects.filter(notebook=notebook)
-                        .select_related("knowledge_base_item", "source")
-                        .order_by("-added_at")
-                    )
-                    
-                    # Build file response data directly (inline helper)
-                    def build_file_response_data(ki):
-                        metadata = ki.knowledge_base_item.metadata or {}
-                        original_filename = metadata.get('original_filename', ki.knowledge_base_item.title)
-                        file_extension = metadata.get('file_extension', '')
-                        file_size = metadata.get('file_size', 0)
-                        
-                        return {
-                            "file_id": str(ki.knowledge_base_item.id),
-                            "title": ki.knowledge_base_item.title,
-                            "upload_timestamp": ki.added_at.isoformat() if ki.added_at else None,
-                            "parsing_status": ki.knowledge_base_item.processing_status,
-                            "original_filename": original_filename,
-                            "file_extension": file_extension,
-                            "file_size": file_size,
-                            "metadata": metadata,
-                            "knowledge_item_id": str(ki.id)
-                        }
-                    
-                    files = [build_file_response_data(ki) for ki in knowledge_items]
-                    
-                    initial_event = {
-                        "type": "initial",
-                        "files": files,
-                        "timestamp": time.time()
-                    }
-                    yield f"data: {json.dumps(initial_event)}\n\n"
-                    
+                    subscription = get_change_feed().subscribe(notebook_id)
                 except Exception as e:
                     error_event = {"type": "error", "message": str(e)}
                     yield f"data: {json.dumps(error_event)}\n\n"
                     return
                 
-                # Track last processed event time to avoid duplicates
-                last_event_time = 0
-                last_heartbeat_time = time.time()
-                cache_key = f"notebook_file_changes_{notebook_id}"
-                heartbeat_interval = 30  # Send heartbeat every 30 seconds
-                
-                # Event-driven streaming loop
-                while time.time() - start_time < max_duration:
+                try:
+                    # Send initial file list
                     try:
-                        current_time = time.time()
-                        
-                        # Check for new events in cache
-                        change_event = cache.get(cache_key)
-                        
-                        if change_event and change_event.get('timestamp', 0) > last_event_time:
-                            # New event detected - send updated file list
-                            last_event_time = change_event['timestamp']
-                            
-                            # Log the event for debugging
-                            import logging
-                            logger = logging.getLogger(__name__)
-                            logger.info(f"[SSE_DEBUG] Sending file change event: {change_event.get('type')}, file_data: {change_event.get('file_data')}")
-                            
-                            # Get fresh file list
-                            current_knowledge_items = (
-                                KnowledgeItem.objects.filter(notebook=notebook)
-                                .select_related("knowledge_base_item", "source")
-                                .order_by("-added_at")
+                        yield f"data: {json.dumps(self._initial_event(notebook))}\n\n"
+                    except Exception as e:
+                        error_event = {"type": "error", "message": str(e)}
+                        yield f"data: {json.dumps(error_event)}\n\n"
+                        return
+                    
+                    # Push per-file deltas as they are published; block on the
+                    # subscription between events instead of polling
+                    last_heartbeat_time = time.time()
+                    while (remaining := max_duration - (time.time() - start_time)) > 0:
+                        try:
+                            change_event = subscription.get_event(
+                                timeout=min(remaining, heartbeat_interval - (time.time() - last_heartbeat_time))
                             )
+                            current_time = time.time()
                             
-                            current_files = [build_file_response_data(ki) for ki in current_knowledge_items]
+                            if change_event:
+                                yield f"data: {json.dumps(self._change_event(change_event, current_time))}\n\n"
                             
-                            update_event = {
-                                "type": "file_change",
-                                "change_type": change_event.get('type', 'unknown'),
-                                "files": current_files,
-                                "timestamp": current_time,
-                                "file_data": change_event.get('file_data')
-                            }
-                            yield f"data: {json.dumps(update_event)}\n\n"
+                            # Send periodic heartbeat to keep connection alive
+                            if current_time - last_heartbeat_time >= heartbeat_interval:
+                                heartbeat_event = {
+                                    "type": "heartbeat",
+                                    "timestamp": current_time
+                                }
+                                yield f"data: {json.dumps(heartbeat_event)}\n\n"
+                                last_heartbeat_time = current_time
                             
-                        # Send periodic heartbeat to keep connection alive (less frequently)
-                        elif current_time - last_heartbeat_time >= 60:  # Every 60 seconds instead of 30
-                            heartbeat_event = {
-                                "type": "heartbeat",
-                                "timestamp": current_time
-                            }
-                            yield f"data: {json.dumps(heartbeat_event)}\n\n"
-                            last_heartbeat_time = current_time
-                        
-                        time.sleep(check_interval)
-                        
+                        except Exception as e:
+                            error_event = {"type": "error", "message": str(e)}
+                            yield f"data: {json.dumps(error_event)}\n\n"
+                            break
+                    
+                    # Send final close event
+                    yield f"data: {json.dumps(close_event)}\n\n"
+                finally:
+                    subscription.close()
+
+            async def aevent_stream():
+                """event_stream for ASGI: waits for changes on the event loop, holding no thread"""
+                start_time = time.time()
+                
+                try:
+                    subscription = await sync_to_async(get_change_feed().subscribe, thread_sensitive=False)(notebook_id)
+                except Exception as e:
+                    error_event = {"type": "error", "message": str(e)}
+                    yield f"data: {json.dumps(error_event)}\n\n"
+                    return
+                
+                try:
+                    try:
+                        initial_event = await sync_to_async(self._initial_event)(notebook)
+                        yield f"data: {json.dumps(initial_event)}\n\n"
                     except Exception as e:
                         error_event = {"type": "error", "message": str(e)}
                         yield f"data: {json.dumps(error_event)}\n\n"
-                        break
-                
-                # Send final close event
-                close_event = {"type": "close", "message": "Stream ended"}
-                yield f"data: {json.dumps(close_event)}\n\n"
+                        return
+                    
+                    last_heartbeat_time = time.time()
+                    while (remaining := max_duration - (time.time() - start_time)) > 0:
+                        try:
+                            change_event = await subscription.aget_event(
+                                timeout=min(remaining, heartbeat_interval - (time.time() - last_heartbeat_time))
+                            )
+                            current_time = time.time()
+                            
+                            if change_event:
+                                yield f"data: {json.dumps(self._change_event(change_event, current_time))}\n\n"
+                            
+                            if current_time - last_heartbeat_time >= heartbeat_interval:
+                                heartbeat_event = {
+                                    "type": "heartbeat",
+                                    "timestamp": current_time
+                                }
+                                yield f"data: {json.dumps(heartbeat_event)}\n\n"
+                                last_heartbeat_time = current_time
+                            
+                        except Exception as e:
+                            error_event = {"type": "error", "message": str(e)}
+                            yield f"data: {json.dumps(error_event)}\n\n"
+                            break
+                    
+                    yield f"data: {json.dumps(close_event)}\n\n"
+                finally:
+                    await sync_to_async(subscription.close, thread_sensitive=False)()
 
             response = StreamingHttpResponse(
-                event_stream(), content_type="text/event-stream"
+                aevent_stream() if is_asgi_request(request) else event_stream(),
+                content_type="text/event-stream",
             )
             response["Cache-Control"] = "no-cache"
             response["X-Accel-Buffering"] = "no"  # Disable nginx buffering
@@ -403,6 +415,32 @@ class NotebookFileListStreamView(View):
                 status=500
             )
 
+    def _initial_event(self, notebook):
+        """The full file list, sent when a client connects."""
+        from ..utils.change_feed import serialize_file_entry
+
+        knowledge_items = (
+            KnowledgeItem.objects.filter(notebook=notebook)
+            .select_related("knowledge_base_item", "source")
+            .order_by("-added_at")
+        )
+        return {
+            "type": "initial",
+            "files": [serialize_file_entry(ki) for ki in knowledge_items],
+            "timestamp": time.time()
+        }
+
+    def _change_event(self, change_event, current_time):
+        """A published file change as sent to clients."""
+        logger.info(f"[SSE_DEBUG] Sending file change event: {change_event.get('type')}, file_data: {change_event.get('file_data')}")
+        return {
+            "type": "file_change",
+            "change_type": change_event.get('type', 'unknown'),
+            "file": change_event.get('file'),
+            "timestamp": current_time,
+            "file_data": change_event.get('file_data')
+        }
+
 
 class FileDeleteView(APIView):
     """
@@ -639,7 +677,7 @@ class FileContentMinIOView(StandardAPIView, KnowledgeBasePermissionMixin):
             )
 
 
-class FileRawView(StandardAPIView, FileAccessValidatorMixin):
+class FileRawView(StandardAPIView, FileAccessValidatorMixin, MinIOFileServingMixin):
     """Serve raw file content (PDFs, videos, audio, etc.)."""
 
     def get(self, request, notebook_id, file_id):
@@ -652,11 +690,11 @@ class FileRawView(StandardAPIView, FileAccessValidatorMixin):
 
             # Try to serve original file first
             if kb_item.original_file_object_key:
-                return self._serve_minio_file(kb_item.original_file_object_key, kb_item.title)
+                return self._serve_minio_file(request, kb_item.original_file_object_key, kb_item.title)
 
             # Fallback to processed file
             if kb_item.file_object_key:
-                return self._serve_minio_file(kb_item.file_object_key, kb_item.title)
+                return self._serve_minio_file(request, kb_item.file_object_key, kb_item.title)
 
             raise Http404("Raw file not found")
 
@@ -671,36 +709,8 @@ class FileRawView(StandardAPIView, FileAccessValidatorMixin):
                 details={"error": str(e)},
             )
 
-    def _serve_minio_file(self, object_key, title):
-        """Serve a file from MinIO through Django's FileResponse."""
-        try:
-            from ..utils.storage import get_minio_backend
-            from io import BytesIO
-            import mimetypes
-            
-            minio_backend = get_minio_backend()
-            file_content = minio_backend.get_file(object_key)
-            
-            # Guess content type from the title/filename
-            content_type, _ = mimetypes.guess_type(title)
-            if not content_type:
-                content_type = "application/octet-stream"
 
-            # Create a BytesIO stream from the content
-            file_stream = BytesIO(file_content)
-            
-            response = FileResponse(
-                file_stream, content_type=content_type, as_attachment=False
-            )
-            response["Content-Disposition"] = f'inline; filename="{title}"'
-            response["X-Content-Type-Options"] = "nosniff"
-            response["X-Frame-Options"] = "DENY"
-            return response
-        except Exception as e:
-            raise Http404(f"File not accessible: {str(e)}")
-
-
-class FileRawSimpleView(StandardAPIView, KnowledgeBasePermissionMixin):
+class FileRawSimpleView(StandardAPIView, KnowledgeBasePermissionMixin, MinIOFileServingMixin):
     """Serve raw file content without requiring notebook context."""
 
     def get(self, request, file_id):
@@ -711,11 +721,11 @@ class FileRawSimpleView(StandardAPIView, KnowledgeBasePermissionMixin):
 
             # Try to serve original file first
             if kb_item.original_file_object_key:
-                return self._serve_minio_file(kb_item.original_file_object_key, kb_item.title)
+                return self._serve_minio_file(request, kb_item.original_file_object_key, kb_item.title)
 
             # Fallback to processed file
             if kb_item.file_object_key:
-                return self._serve_minio_file(kb_item.file_object_key, kb_item.title)
+                return self._serve_minio_file(request, kb_item.file_object_key, kb_item.title)
 
             raise Http404("Raw file not found")
 
@@ -728,34 +738,6 @@ class FileRawSimpleView(StandardAPIView, KnowledgeBasePermissionMixin):
                 details={"error": str(e)},
             )
 
-    def _serve_minio_file(self, object_key, title):
-        """Helper to serve a file from MinIO with proper headers."""
-        try:
-            from ..utils.storage import get_minio_backend
-            from io import BytesIO
-            import mimetypes
-            
-            minio_backend = get_minio_backend()
-            file_content = minio_backend.get_file(object_key)
-            
-            # Guess content type from the title/filename
-            content_type, _ = mimetypes.guess_type(title)
-            if not content_type:
-                content_type = "application/octet-stream"
-
-            # Create a BytesIO stream from the content
-            file_stream = BytesIO(file_content)
-            
-            response = FileResponse(
-                file_stream, content_type=content_type, as_attachment=False
-            )
-            response["Content-Disposition"] = f'inline; filename="{title}"'
-            response["X-Content-Type-Options"] = "nosniff"
-            response["X-Frame-Options"] = "DENY"
-            return response
-        except Exception as e:
-            raise Http404(f"File not accessible: {str(e)}")
-
 
 class NotebookFileStatusStreamView(View):
     """
@@ -779,26 +761,19 @@ class NotebookFileStatusStreamView(View):
             except Notebook.DoesNotExist:
                 return JsonResponse({"detail": "Not found."}, status=404)
             
+            max_duration = 300  # 5 minutes maximum
+            poll_interval = 2  # Poll every 2 seconds like reports
+            close_event = {'type': 'close', 'message': 'Stream ended'}
+
             def event_stream():
                 """Generator function for SSE events - polls database directly"""
-                import time
-                import json
-                
-                max_duration = 300  # 5 minutes maximum
                 start_time = time.time()
-                poll_interval = 2  # Poll every 2 seconds like reports
                 last_status = None
                 
                 while time.time() - start_time < max_duration:
                     try:
                         # Poll KnowledgeBaseItem status directly from database
-                        kb_item = KnowledgeBaseItem.objects.get(id=file_id, user=request.user)
-                        current_status = {
-                            'file_id': str(kb_item.id),
-                            'status': kb_item.processing_status,
-                            'title': kb_item.title,
-                            'updated_at': kb_item.updated_at.isoformat() if kb_item.updated_at else None
-                        }
+                        current_status = self._poll_file_status(file_id, request.user)
                         
                         # Only send update if status changed
                         if current_status != last_status:
@@ -806,10 +781,10 @@ class NotebookFileStatusStreamView(View):
                             last_status = current_status
                             
                             # Log status change for debugging
-                            logger.info(f"[FILE_SSE] Status change for file {file_id}: {kb_item.processing_status}")
+                            logger.info(f"[FILE_SSE] Status change for file {file_id}: {current_status['status']}")
                         
                         # Stop streaming if processing is complete
-                        if kb_item.processing_status in ['done', 'error']:
+                        if current_status['status'] in ['done', 'error']:
                             logger.info(f"[FILE_SSE] Processing complete for file {file_id}, closing stream")
                             break
                             
@@ -824,10 +799,43 @@ class NotebookFileStatusStreamView(View):
                         break
                 
                 # Send final close event
-                yield f"data: {json.dumps({'type': 'close', 'message': 'Stream ended'})}\n\n"
+                yield f"data: {json.dumps(close_event)}\n\n"
+
+            async def aevent_stream():
+                """event_stream for ASGI: sleeps on the event loop between polls"""
+                start_time = time.time()
+                last_status = None
+                
+                while time.time() - start_time < max_duration:
+                    try:
+                        current_status = await sync_to_async(self._poll_file_status)(file_id, request.user)
+                        
+                        if current_status != last_status:
+                            yield f"data: {json.dumps({'type': 'file_status', 'data': current_status})}\n\n"
+                            last_status = current_status
+                            
+                            # Log status change for debugging
+                            logger.info(f"[FILE_SSE] Status change for file {file_id}: {current_status['status']}")
+                        
+                        if current_status['status'] in ['done', 'error']:
+                            logger.info(f"[FILE_SSE] Processing complete for file {file_id}, closing stream")
+                            break
+                            
+                        await asyncio.sleep(poll_interval)
+                        
+                    except KnowledgeBaseItem.DoesNotExist:
+                        logger.warning(f"[FILE_SSE] KnowledgeBaseItem {file_id} not found, closing stream")
+                        break
+                    except Exception as e:
+                        logger.error(f"[FILE_SSE] Error polling file {file_id}: {e}")
+                        yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+                        break
+                
+                yield f"data: {json.dumps(close_event)}\n\n"
 
             response = StreamingHttpResponse(
-                event_stream(), content_type="text/event-stream"
+                aevent_stream() if is_asgi_request(request) else event_stream(),
+                content_type="text/event-stream",
             )
             response["Cache-Control"] = "no-cache"
             response["X-Accel-Buffering"] = "no"  # Disable nginx buffering
@@ -843,6 +851,16 @@ class NotebookFileStatusStreamView(View):
                 status=500
             )
 
+    def _poll_file_status(self, file_id, user):
+        """Read the file's processing status; raises KnowledgeBaseItem.DoesNotExist."""
+        kb_item = KnowledgeBaseItem.objects.get(id=file_id, user=user)
+        return {
+            'file_id': str(kb_item.id),
+            'status': kb_item.processing_status,
+            'title': kb_item.title,
+            'updated_at': kb_item.updated_at.isoformat() if kb_item.updated_at else None
+        }
+
 
 class VideoImageExtractionView(StandardAPIView, NotebookPermissionMixin):
     """Handle video image extraction with deduplication and captioning for notebook files."""
@@ -1000,6 +1018,7 @@ class VideoImageExtractionView(StandardAPIView, NotebookPermissionMixin):
             'pixel_threshold': validated_data.get('pixel_threshold'),
             'sequential_deep_threshold': validated_data.get('sequential_deep_threshold'),
             'global_deep_threshold': validated_data.get('global_deep_threshold'),
+            'global_deep_method': validated_data.get('global_deep_method'),
             'min_words': validated_data.get('min_words'),
             'dedup_pixel_global': validated_data.get('dedup_pixel_global', True),
             'dedup_deep_sequential': validated_data.get('dedup_deep_sequential', True),
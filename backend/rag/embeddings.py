@@ -0,0 +1,150 @@
+"""
+Pluggable embedding providers for the RAG module.
+
+``RAG_EMBEDDING_PROVIDER`` selects the backend:
+
+- ``openai``: remote ``OpenAIEmbeddings`` (the default, 1536 dimensions)
+- ``local``: a sentence-transformers model run in-process in batches
+
+Either backend is wrapped in ``CachedEmbeddings``, a persistent
+content-hash -> vector cache stored with diskcache, so unchanged text is never
+embedded twice across uploads, edits, repeated questions or process restarts.
+
+Vectors from different providers have different dimensions; switching the
+provider requires re-ingesting into fresh collections.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ─────────────────────────────────────────────────────────
+RAG_EMBEDDING_PROVIDER     = os.getenv("RAG_EMBEDDING_PROVIDER", "openai")
+# Same default model as StormInformationTable.ENCODER_MODEL_NAME
+RAG_LOCAL_EMBEDDING_MODEL  = os.getenv("RAG_LOCAL_EMBEDDING_MODEL", "all-mpnet-base-v2")
+RAG_LOCAL_EMBEDDING_DEVICE = os.getenv("RAG_LOCAL_EMBEDDING_DEVICE", "cpu")
+RAG_LOCAL_BATCH_SIZE       = int(os.getenv("RAG_LOCAL_BATCH_SIZE", "32"))
+RAG_EMBEDDING_CACHE_DIR    = os.getenv("RAG_EMBEDDING_CACHE_DIR", "/tmp/deepsight_embedding_cache")
+# 0 disables the cache
+RAG_EMBEDDING_CACHE_SIZE   = int(os.getenv("RAG_EMBEDDING_CACHE_SIZE", str(2 * 1024 ** 3)))
+OPENAI_API_KEY             = os.getenv("OPENAI_API_KEY")
+
+
+class LocalSentenceTransformerEmbeddings(Embeddings):
+    """Embeddings computed in-process with a sentence-transformers model."""
+
+    def __init__(self, model_name: str = RAG_LOCAL_EMBEDDING_MODEL,
+                 device: str = RAG_LOCAL_EMBEDDING_DEVICE, batch_size: int = RAG_LOCAL_BATCH_SIZE):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self._model = None
+
+    @property
+    def model(self):
+        """Lazy load of the sentence-transformers model, shared through the process-wide model registry."""
+        if self._model is None:
+            from backend.model_registry import get_sentence_transformer
+            self._model = get_sentence_transformer(self.model_name, self.device, owner=self)
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wrap an Embeddings backend with a persistent content-hash -> vector cache.
+
+    Keys include a namespace (provider and model) so vectors from different
+    models never mix. Only cache misses are sent to the backend, in one call.
+    """
+
+    def __init__(self, underlying: Embeddings, namespace: str, cache):
+        self.underlying = underlying
+        self.namespace = namespace
+        self.cache = cache
+
+    def _key(self, text: str) -> str:
+        return f"{self.namespace}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors: List[Optional[List[float]]] = [self.cache.get(key) for key in keys]
+
+        # Embed each distinct missing text once
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[i], []).append(i)
+        if missing:
+            miss_keys = list(missing)
+            miss_texts = [texts[missing[key][0]] for key in miss_keys]
+            for key, vector in zip(miss_keys, self.underlying.embed_documents(miss_texts)):
+                vector = list(vector)
+                self.cache.set(key, vector)
+                for i in missing[key]:
+                    vectors[i] = vector
+
+        logger.debug("Embedding cache: %d hits, %d misses", len(texts) - sum(map(len, missing.values())), len(missing))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = list(self.underlying.embed_query(text))
+            self.cache.set(key, vector)
+        return vector
+
+
+def build_embeddings(provider: str = RAG_EMBEDDING_PROVIDER, cache=None) -> Embeddings:
+    """Build the configured embedding provider, wrapped in the persistent cache."""
+    if provider == "local":
+        underlying = LocalSentenceTransformerEmbeddings()
+        namespace = f"local:{underlying.model_name}"
+    elif provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        underlying = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+        namespace = f"openai:{underlying.model}"
+    else:
+        raise ValueError(f"Unknown RAG_EMBEDDING_PROVIDER: {provider!r}")
+
+    if cache is None:
+        if RAG_EMBEDDING_CACHE_SIZE <= 0:
+            return underlying
+        import diskcache
+        cache = diskcache.Cache(RAG_EMBEDDING_CACHE_DIR, size_limit=RAG_EMBEDDING_CACHE_SIZE)
+    return CachedEmbeddings(underlying, namespace, cache)
+
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings() -> Embeddings:
+    """Return the process-wide embedding provider shared by ingestion and retrieval."""
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            _embeddings = build_embeddings()
+            logger.info("RAG embedding provider: %s", RAG_EMBEDDING_PROVIDER)
+        return _embeddings
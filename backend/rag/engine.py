@@ -1,53 +1,71 @@
 import os
 import json
+import threading
 
-from pymilvus import connections
 from pydantic import Extra
 from langchain.schema import BaseRetriever
 from langchain.docstore.document import Document
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.retrievers import TFIDFRetriever
+from langchain_openai import ChatOpenAI
 from langchain.chains import ConversationalRetrievalChain
-from langchain_milvus import Milvus
+
+from rag.lexical_index import BM25Index, LexicalRetriever, get_lexical_index
+from rag.retrieval import CollectionSearch, invalidate_collection, search_collections
+from rag.vector_store import LRURegistry
 
 # ─── Configuration ─────────────────────────────────────────────────────────
-MILVUS_HOST     = os.getenv("MILVUS_HOST", "localhost")
-MILVUS_PORT     = os.getenv("MILVUS_PORT", "19530")
 DEFAULT_COLLECTION_NAME = os.getenv("MILVUS_COLLECTION_NAME", "global")
 OPENAI_API_KEY  = os.getenv("OPENAI_API_KEY")
+# Maximum number of cached chains (one per distinct set of collections)
+RAG_CHAIN_CACHE_SIZE = int(os.getenv("RAG_CHAIN_CACHE_SIZE", "128"))
 
-# ─── Connect to Milvus once ─────────────────────────────────────────────────
-connections.connect(host=MILVUS_HOST, port=MILVUS_PORT)
+# ─── Lexical (BM25) index, seeded with the demo paper summaries ─────────────
+_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PAPERS_JSON = os.path.join(_MODULE_DIR, "demo_paper_summaries.json")
 
-# ─── Persistent vectorstore handle (no ingestion at startup) ───────────────
-_embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
 
-# Default collection setup (global collections)
-_vectorstore = Milvus(
-    embedding_function=_embeddings,
-    collection_name=DEFAULT_COLLECTION_NAME,
-    connection_args={"host": MILVUS_HOST, "port": MILVUS_PORT},
-    drop_old=False,
-)
+def _paper_records():
+    with open(_PAPERS_JSON, "r", encoding="utf-8") as f:
+        papers = json.load(f)
+    for i, p in enumerate(papers):
+        yield {"id": f"paper:{i}", "group": "", "text": p["summary"], "metadata": p}
 
-# ─── Pre-build BM25 retriever once at import ─────────────────────────────────
-_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
-_PAPERS_JSON = os.path.join(_MODULE_DIR, "demo_paper_summaries.json")
-_papers = json.load(open(_PAPERS_JSON, "r", encoding="utf-8"))
-_bm25_docs = [Document(page_content=p["summary"], metadata=p) for p in _papers]
-_bm25_retriever = TFIDFRetriever.from_texts(
-    texts=[d.page_content for d in _bm25_docs],
-    metadatas=[d.metadata for d in _bm25_docs],
-    k=5,
-)
+
+def get_bm25_index() -> BM25Index:
+    """
+    The shared lexical index. The first call in the deployment builds it from the
+    paper summaries; use this (not get_lexical_index) for writes too, so user
+    chunks never land in an index that was not seeded.
+    """
+    global _bm25_seeded
+    index = get_lexical_index()
+    if not _bm25_seeded:
+        index.build_if_empty(_paper_records)
+        _bm25_seeded = True
+    return index
+
+
+_bm25_seeded = False
+
+
+class BM25Retriever(LexicalRetriever):
+    """LexicalRetriever over the shared index, seeding it on first query."""
+
+    def get_index(self) -> BM25Index:
+        return self.index if self.index is not None else get_bm25_index()
+
+
+_llm = None
+_llm_lock = threading.Lock()
+_chains = LRURegistry(RAG_CHAIN_CACHE_SIZE)
 
 
 class HybridRetriever(BaseRetriever):
     """
     A BaseRetriever that combines vector (Milvus) and BM25 retrievers.
-    Handles a list of retrievers for vector retrieval.
+    All collections and the BM25 retriever are searched concurrently,
+    sharing one query embedding.
     """
-    vector_retrievers: list[BaseRetriever]
+    collection_names: list[str]
     bm25_retriever:   BaseRetriever
     k_vector: int = 5
     k_bm25:   int = 5
@@ -56,19 +74,17 @@ class HybridRetriever(BaseRetriever):
         arbitrary_types_allowed = True
         extra = Extra.ignore
 
-    def get_relevant_documents(self, query: str):
-        hits: list[Document] = []
+    def searches(self) -> list[CollectionSearch]:
+        """The vector searches this retriever issues, for callers that batch them with their own."""
+        return [CollectionSearch(name, self.k_vector) for name in self.collection_names]
 
-        # Process all vector retrievers
-        for vector_retriever in self.vector_retrievers:
-            vec_hits = vector_retriever.get_relevant_documents(query)[: self.k_vector]
-            hits.extend(vec_hits)
-
-        # Process BM25 retriever
-        bm25_hits = self.bm25_retriever.get_relevant_documents(query)[: self.k_bm25]
-        hits.extend(bm25_hits)
+    def merge(self, vector_hits: list[list[Document]], bm25_hits: list[Document]) -> list[Document]:
+        """Combine per-collection and BM25 hits, deduplicating by source (or snippet)."""
+        hits: list[Document] = []
+        for collection_hits in vector_hits:
+            hits.extend(collection_hits[: self.k_vector])
+        hits.extend(bm25_hits[: self.k_bm25])
 
-        # Deduplicate by source (or snippet)
         seen = set()
         result = []
         for doc in hits:
@@ -78,6 +94,10 @@ class HybridRetriever(BaseRetriever):
                 result.append(doc)
         return result
 
+    def get_relevant_documents(self, query: str):
+        vector_hits, bm25_hits = search_collections(query, self.searches(), self.bm25_retriever)
+        return self.merge(vector_hits, bm25_hits)
+
 
 def _build_chain(selected_collections=None) -> ConversationalRetrievalChain:
     """
@@ -91,49 +111,62 @@ def _build_chain(selected_collections=None) -> ConversationalRetrievalChain:
     else:
         collection_names = selected_collections
 
-    # Initialize retrievers for selected collections
-    vector_retrievers = []
-    for collection_name in collection_names:
-        vector_retrievers.append(
-            Milvus(
-                embedding_function=_embeddings,
-                collection_name=collection_name,
-                connection_args={"host": MILVUS_HOST, "port": MILVUS_PORT},
-                drop_old=False,
-            ).as_retriever(search_kwargs={"k": 5})
-        )
-
-    # Create the hybrid retriever (multiple vector retrievers now supported)
+    # Create the hybrid retriever; vector stores are pooled per collection.
+    # BM25 sees shared documents (group "") and chunks from these collections.
     hybrid_retriever = HybridRetriever(
-        vector_retrievers=vector_retrievers,
-        bm25_retriever=_bm25_retriever,
+        collection_names=list(collection_names),
+        bm25_retriever=BM25Retriever(groups=[""] + list(collection_names), k=5),
         k_vector=5,
         k_bm25=5
     )
 
-    # Build the conversational chain with ChatOpenAI
-    llm = ChatOpenAI(
-        model_name="gpt-4o-mini",
-        temperature=0,
-        openai_api_key=OPENAI_API_KEY
-    )
     return ConversationalRetrievalChain.from_llm(
-        llm=llm,
+        llm=_get_llm(),
         retriever=hybrid_retriever,
         return_source_documents=True
     )
 
 
-# ─── Global RAG chain singleton ────────────────────────────────────────────
-RAG_CHAIN = _build_chain()  # Default to all collections + user's local collection
+def _get_llm() -> ChatOpenAI:
+    """Shared (stateless) chat model for all chains."""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            _llm = ChatOpenAI(
+                model_name="gpt-4o-mini",
+                temperature=0,
+                openai_api_key=OPENAI_API_KEY
+            )
+        return _llm
+
+
+def _chain_key(selected_collections=None) -> frozenset:
+    return frozenset(selected_collections or [DEFAULT_COLLECTION_NAME])
 
 
 def get_rag_chain(selected_collections=None) -> ConversationalRetrievalChain:
     """
     Retrieve the global RAG chain with selected collections.
     If no collections are selected, the default global collections are used.
+    Chains are cached per collection set.
+    """
+    key = _chain_key(selected_collections)
+    return _chains.get_or_create(key, lambda: _build_chain(sorted(key)))
+
+
+# ─── Global RAG chain singleton (built on first use, not at import) ─────────
+RAG_CHAIN = None
+
+
+def invalidate_collections(collection_names) -> None:
+    """
+    Forget cached chains and search results that involve any of collection_names.
+    Call after ingesting into or deleting from a collection.
     """
-    return _build_chain(selected_collections)
+    names = set(collection_names)
+    _chains.invalidate(lambda key: not names.isdisjoint(key))
+    for name in names:
+        invalidate_collection(name)
 
 
 def rebuild_vector_chain(selected_collections=None):
@@ -142,4 +175,5 @@ def rebuild_vector_chain(selected_collections=None):
     adding or deleting vectors. BM25 remains unchanged.
     """
     global RAG_CHAIN
-    RAG_CHAIN = _build_chain(selected_collections)
+    invalidate_collections(_chain_key(selected_collections))
+    RAG_CHAIN = get_rag_chain(selected_collections)
@@ -0,0 +1,417 @@
+"""
+Persistent, incremental BM25 index for the RAG module.
+
+The index lives in a directory and is made of two parts:
+
+- an immutable *base segment* (``base-<generation>/``): an inverted index whose
+  postings, document lengths and document offsets are numpy arrays loaded with
+  ``mmap_mode="r"``, plus a JSON-lines document store read by offset;
+- an append-only *delta log* (``delta-<generation>.jsonl``) of add/remove
+  operations, replayed into memory on load and tailed on every query.
+
+``CURRENT`` names the live generation. Writers take an exclusive ``flock`` on
+the index directory, append to the delta log and, once the delta holds more
+than ``compact_threshold`` operations, merge everything into a new base segment
+and switch ``CURRENT``. Readers in other processes pick up appended operations
+and new generations on their next query, so Celery workers can index while the
+web process searches.
+
+Every document belongs to a *group* (for user chunks, the Milvus collection it
+was ingested into); searches are restricted to the groups the caller may see.
+Document frequencies include removed documents until the next compaction.
+"""
+
+import fcntl
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain.schema import BaseRetriever, Document
+from pydantic import Extra
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ─────────────────────────────────────────────────────────
+_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAG_LEXICAL_INDEX_DIR          = os.getenv("RAG_LEXICAL_INDEX_DIR", os.path.join(_MODULE_DIR, "lexical_index"))
+# Pending delta operations that trigger a merge into a new base segment
+RAG_LEXICAL_COMPACT_THRESHOLD  = int(os.getenv("RAG_LEXICAL_COMPACT_THRESHOLD", "5000"))
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def _load_array(path: str) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # zero-length arrays cannot be memory-mapped
+        return np.load(path)
+
+
+class _BaseSegment:
+    """A read-only, memory-mapped base segment."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, "terms.json"), "r", encoding="utf-8") as f:
+            self.terms: Dict[str, List[int]] = json.load(f)
+        self.num_docs: int = meta["num_docs"]
+        self.total_length: int = meta["total_length"]
+        self.groups: List[str] = meta["groups"]
+        self.doc_ids: List[str] = meta["doc_ids"]
+        self.doc_index = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+
+        self.postings_docs = _load_array(os.path.join(directory, "postings_docs.npy"))
+        self.postings_tf = _load_array(os.path.join(directory, "postings_tf.npy"))
+        self.doc_lengths = _load_array(os.path.join(directory, "doc_lengths.npy"))
+        self.doc_groups = _load_array(os.path.join(directory, "doc_groups.npy"))
+        self.doc_offsets = _load_array(os.path.join(directory, "doc_offsets.npy"))
+        self._docs_file = open(os.path.join(directory, "docs.jsonl"), "rb")
+
+    def read_doc(self, i: int) -> Dict[str, Any]:
+        self._docs_file.seek(int(self.doc_offsets[i]))
+        return json.loads(self._docs_file.readline())
+
+    def iter_docs(self) -> Iterable[Dict[str, Any]]:
+        self._docs_file.seek(0)
+        for line in self._docs_file:
+            yield json.loads(line)
+
+    def close(self):
+        self._docs_file.close()
+
+
+def _write_base(directory: str, records: Iterable[Dict[str, Any]]) -> None:
+    """Write a base segment from {"id", "group", "text", "metadata"} records."""
+    os.makedirs(directory)
+    doc_ids, groups, group_index = [], [], {}
+    lengths, doc_groups, offsets = [], [], []
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+
+    with open(os.path.join(directory, "docs.jsonl"), "wb") as docs_file:
+        for record in records:
+            doc_idx = len(doc_ids)
+            offsets.append(docs_file.tell())
+            docs_file.write(json.dumps(record).encode("utf-8") + b"\n")
+
+            tf = Counter(tokenize(record["text"]))
+            for term, count in tf.items():
+                postings.setdefault(term, []).append((doc_idx, count))
+
+            group = record.get("group", "")
+            if group not in group_index:
+                group_index[group] = len(groups)
+                groups.append(group)
+            doc_ids.append(record["id"])
+            doc_groups.append(group_index[group])
+            lengths.append(sum(tf.values()))
+
+    terms, postings_docs, postings_tf = {}, [], []
+    for term, entries in postings.items():
+        start = len(postings_docs)
+        postings_docs.extend(doc_idx for doc_idx, _ in entries)
+        postings_tf.extend(count for _, count in entries)
+        terms[term] = [start, len(postings_docs)]
+
+    np.save(os.path.join(directory, "postings_docs.npy"), np.asarray(postings_docs, dtype=np.int32))
+    np.save(os.path.join(directory, "postings_tf.npy"), np.asarray(postings_tf, dtype=np.float32))
+    np.save(os.path.join(directory, "doc_lengths.npy"), np.asarray(lengths, dtype=np.float32))
+    np.save(os.path.join(directory, "doc_groups.npy"), np.asarray(doc_groups, dtype=np.int32))
+    np.save(os.path.join(directory, "doc_offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    with open(os.path.join(directory, "terms.json"), "w", encoding="utf-8") as f:
+        json.dump(terms, f)
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "num_docs": len(doc_ids),
+            "total_length": int(sum(lengths)),
+            "groups": groups,
+            "doc_ids": doc_ids,
+        }, f)
+
+
+class _DeltaDoc:
+    __slots__ = ("record", "tf", "length")
+
+    def __init__(self, op: Dict[str, Any]):
+        self.record = {key: value for key, value in op.items() if key != "op"}
+        record = self.record
+        self.tf = Counter(tokenize(record["text"]))
+        self.length = sum(self.tf.values())
+
+
+class BM25Index:
+    """On-disk BM25 index with incremental add/remove; loaded lazily on first use."""
+
+    def __init__(self, path: str = RAG_LEXICAL_INDEX_DIR, k1: float = 1.5, b: float = 0.75,
+                 compact_threshold: int = RAG_LEXICAL_COMPACT_THRESHOLD):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._generation: Optional[int] = None
+        self._reset_state(None)
+
+    # ─── State ────────────────────────────────────────────────────────────
+    def _reset_state(self, base: Optional[_BaseSegment]):
+        if getattr(self, "_base", None) is not None:
+            self._base.close()
+        self._base = base
+        self._base_live = np.ones(base.num_docs, dtype=bool) if base else np.ones(0, dtype=bool)
+        self._removed_length = 0.0
+        self._delta: Dict[str, _DeltaDoc] = {}
+        self._delta_ops = 0
+        self._delta_offset = 0
+
+    def _read_generation(self) -> Optional[int]:
+        try:
+            with open(os.path.join(self.path, "CURRENT"), "r") as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _delta_path(self, generation: int) -> str:
+        return os.path.join(self.path, f"delta-{generation}.jsonl")
+
+    def _refresh(self):
+        """Pick up a new generation and any delta operations appended since the last call."""
+        generation = self._read_generation()
+        if generation != self._generation:
+            base = _BaseSegment(os.path.join(self.path, f"base-{generation}")) if generation is not None else None
+            self._reset_state(base)
+            self._generation = generation
+            if generation is not None:
+                logger.info("Loaded lexical index generation %d (%d documents)", generation, base.num_docs)
+        if generation is None:
+            return
+
+        try:
+            with open(self._delta_path(generation), "rb") as f:
+                f.seek(self._delta_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # partially written; picked up next time
+                    self._delta_offset += len(line)
+                    self._apply(json.loads(line))
+        except FileNotFoundError:
+            pass
+
+    def _tombstone_base(self, doc_id: str):
+        if self._base is None:
+            return
+        i = self._base.doc_index.get(doc_id)
+        if i is not None and self._base_live[i]:
+            self._base_live[i] = False
+            self._removed_length += float(self._base.doc_lengths[i])
+
+    def _apply(self, op: Dict[str, Any]):
+        self._delta_ops += 1
+        if op["op"] == "add":
+            self._tombstone_base(op["id"])
+            self._delta[op["id"]] = _DeltaDoc(op)
+        elif op["op"] == "remove":
+            for doc_id in op["ids"]:
+                self._tombstone_base(doc_id)
+                self._delta.pop(doc_id, None)
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ─── Writes ───────────────────────────────────────────────────────────
+    def _switch_generation(self, records: Iterable[Dict[str, Any]]):
+        """Write records as a new base segment and make it current (file lock held)."""
+        old_generation = self._generation
+        generation = (old_generation or 0) + 1
+        directory = os.path.join(self.path, f"base-{generation}")
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        _write_base(directory, records)
+
+        current_tmp = os.path.join(self.path, "CURRENT.tmp")
+        with open(current_tmp, "w") as f:
+            f.write(str(generation))
+        os.replace(current_tmp, os.path.join(self.path, "CURRENT"))
+        self._refresh()
+
+        if old_generation is not None:
+            # Open memory maps in other processes stay valid after unlinking
+            shutil.rmtree(os.path.join(self.path, f"base-{old_generation}"), ignore_errors=True)
+            try:
+                os.remove(self._delta_path(old_generation))
+            except FileNotFoundError:
+                pass
+
+    def build_if_empty(self, records_factory) -> bool:
+        """Build the first base segment from records_factory() unless an index already exists."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._generation is not None:
+                return False
+            self._switch_generation(records_factory())
+            return True
+
+    def _append(self, ops: List[Dict[str, Any]]):
+        if not ops:
+            return
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._generation is None:
+                self._switch_generation([])
+            with open(self._delta_path(self._generation), "ab") as f:
+                f.write(b"".join(json.dumps(op).encode("utf-8") + b"\n" for op in ops))
+            self._refresh()
+            if self._delta_ops > self.compact_threshold:
+                self._compact_locked()
+
+    def add_documents(self, docs: Sequence[Document], ids: Sequence[str], group: str = "") -> None:
+        """Add (or replace) documents under the given IDs."""
+        self._append([
+            {"op": "add", "id": doc_id, "group": group, "text": doc.page_content, "metadata": doc.metadata}
+            for doc, doc_id in zip(docs, ids)
+        ])
+
+    def delete(self, ids: Sequence[str]) -> None:
+        if ids:
+            self._append([{"op": "remove", "ids": list(ids)}])
+
+    def _live_records(self) -> Iterable[Dict[str, Any]]:
+        if self._base is not None:
+            for i, record in enumerate(self._base.iter_docs()):
+                if self._base_live[i]:
+                    yield record
+        for delta_doc in list(self._delta.values()):
+            yield delta_doc.record
+
+    def _compact_locked(self):
+        logger.info("Compacting lexical index (%d pending operations)", self._delta_ops)
+        records = list(self._live_records())
+        self._switch_generation(records)
+
+    def compact(self) -> None:
+        """Merge the delta log into a new base segment."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._generation is not None and self._delta_ops:
+                self._compact_locked()
+
+    # ─── Reads ────────────────────────────────────────────────────────────
+    def search(self, query: str, k: int = 5, groups: Optional[Sequence[str]] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return up to k (score, record) pairs, best first, restricted to groups if given."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            self._refresh()
+            base = self._base
+            num_base = int(self._base_live.sum())
+            num_docs = num_base + len(self._delta)
+            if num_docs == 0:
+                return []
+            total_length = (base.total_length if base else 0) - self._removed_length
+            total_length += sum(d.length for d in self._delta.values())
+            avgdl = max(total_length / num_docs, 1.0)
+            allowed = set(groups) if groups is not None else None
+
+            # document frequency per query term across both parts
+            spans = {term: base.terms.get(term) if base else None for term in terms}
+            df = {term: (spans[term][1] - spans[term][0] if spans[term] else 0) for term in terms}
+            for delta_doc in self._delta.values():
+                for term in terms:
+                    if term in delta_doc.tf:
+                        df[term] += 1
+            idf = {term: math.log(1.0 + (num_docs - df[term] + 0.5) / (df[term] + 0.5)) for term in terms}
+
+            candidates: List[Tuple[float, Any]] = []
+
+            if base is not None and base.num_docs:
+                scores = np.zeros(base.num_docs, dtype=np.float32)
+                for term in terms:
+                    if spans[term] is None:
+                        continue
+                    start, end = spans[term]
+                    doc_idx = base.postings_docs[start:end]
+                    tf = base.postings_tf[start:end]
+                    norm = self.k1 * (1.0 - self.b + self.b * base.doc_lengths[doc_idx] / avgdl)
+                    scores[doc_idx] += idf[term] * tf * (self.k1 + 1.0) / (tf + norm)
+
+                mask = self._base_live & (scores > 0)
+                if allowed is not None:
+                    allowed_idx = [i for i, g in enumerate(base.groups) if g in allowed]
+                    mask &= np.isin(base.doc_groups, allowed_idx)
+                hits = np.flatnonzero(mask)
+                if len(hits) > k:
+                    hits = hits[np.argpartition(-scores[hits], k)[:k]]
+                candidates.extend((float(scores[i]), int(i)) for i in hits)
+
+            for delta_doc in self._delta.values():
+                if allowed is not None and delta_doc.record.get("group", "") not in allowed:
+                    continue
+                norm = self.k1 * (1.0 - self.b + self.b * delta_doc.length / avgdl)
+                score = sum(
+                    idf[term] * tf * (self.k1 + 1.0) / (tf + norm)
+                    for term, tf in ((term, delta_doc.tf.get(term, 0)) for term in terms)
+                    if tf
+                )
+                if score > 0:
+                    candidates.append((score, delta_doc))
+
+            candidates.sort(key=lambda c: c[0], reverse=True)
+            return [
+                (score, base.read_doc(ref) if isinstance(ref, int) else ref.record)
+                for score, ref in candidates[:k]
+            ]
+
+
+class LexicalRetriever(BaseRetriever):
+    """BaseRetriever over a BM25Index (the shared index by default), restricted to the given groups."""
+    index: Any = None
+    k: int = 5
+    groups: Optional[list[str]] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+        extra = Extra.ignore
+
+    def get_index(self) -> "BM25Index":
+        return self.index if self.index is not None else get_lexical_index()
+
+    def get_relevant_documents(self, query: str):
+        return [
+            Document(page_content=record["text"], metadata=record.get("metadata") or {})
+            for _, record in self.get_index().search(query, k=self.k, groups=self.groups)
+        ]
+
+
+_lexical_index = None
+_lexical_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> BM25Index:
+    """Get the process-wide lexical index. Nothing is read from disk until the first query."""
+    global _lexical_index
+    with _lexical_index_lock:
+        if _lexical_index is None:
+            _lexical_index = BM25Index()
+        return _lexical_index
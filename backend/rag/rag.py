@@ -1,24 +1,30 @@
 import os
 import json
-import queue
-import threading
+import asyncio
 import re
-import uuid
-from typing import List, Tuple, Optional, Generator
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator, Dict, List, Set, Tuple, Optional, Generator
 
 from PyPDF2 import PdfReader
 from PyPDF2.errors import PdfReadError
 from langchain.prompts import PromptTemplate
-from langchain.schema import BaseRetriever, Document, SystemMessage, HumanMessage
-from langchain.callbacks.base import BaseCallbackHandler
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_milvus import Milvus
+from langchain.schema import BaseMessage, Document, SystemMessage, HumanMessage
+from langchain_openai import ChatOpenAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-# Import your engine's HybridRetriever and global chain
-from rag.engine import get_rag_chain, HybridRetriever, DEFAULT_COLLECTION_NAME
+# Import your engine's retrievers and global chain
+from rag.engine import BM25Retriever, get_bm25_index, get_rag_chain, invalidate_collections, DEFAULT_COLLECTION_NAME
+from rag.retrieval import CollectionSearch, search_collections
+from rag.vector_store import (
+    collection_exists,
+    ensure_partitioned_collection,
+    get_vector_store,
+    index_params,
+    schedule_flush,
+)
 
-from pymilvus import connections, utility, CollectionSchema, FieldSchema, DataType, Collection
+from pymilvus import CollectionSchema, FieldSchema, DataType, Collection
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,15 +35,22 @@ MILVUS_PORT      = os.getenv("MILVUS_PORT", "19530")
 # Base name for per-user collections; each user will get its own suffix
 BASE_COLLECTION  = os.getenv("MILVUS_LOCAL_COLLECTION", "user_files")
 OPENAI_API_KEY   = os.getenv("OPENAI_API_KEY")
+# Upper bounds for one embedding request during ingestion
+RAG_EMBED_BATCH_SIZE  = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+RAG_EMBED_BATCH_CHARS = int(os.getenv("RAG_EMBED_BATCH_CHARS", "200000"))
+# Embedding batches in flight per add_user_files call
+RAG_EMBED_CONCURRENCY = int(os.getenv("RAG_EMBED_CONCURRENCY", "4"))
+# "collection": one Milvus collection per user (user_files_<id>)
+# "partition_key": one shared collection with user_id as the partition key
+RAG_TENANCY_MODE      = os.getenv("RAG_TENANCY_MODE", "collection")
+SHARED_COLLECTION     = os.getenv("MILVUS_SHARED_COLLECTION", f"{BASE_COLLECTION}_shared")
 
-connections.connect(
-    alias="default",
-    host=MILVUS_HOST,
-    port=MILVUS_PORT,
-)
 
 def ensure_user_collection(coll_name: str):
-    exists = utility.has_collection(coll_name, using="default")
+    if RAG_TENANCY_MODE == "partition_key":
+        ensure_partitioned_collection(coll_name)
+        return
+    exists = collection_exists(coll_name)
     logger.debug("Checking Milvus collection %r exists? %s", coll_name, exists)
     if not exists:
         logger.info("Creating Milvus collection %r via Collection constructor", coll_name)
@@ -49,22 +62,40 @@ def ensure_user_collection(coll_name: str):
         ]
         schema = CollectionSchema(fields, description="Per-user file embeddings")
         coll = Collection(name=coll_name, schema=schema, using="default")
-        index_params = {
-            "index_type": "IVF_FLAT",
-            "metric_type": "L2",
-            "params": {"nlist": 128}
-        }
-        coll.create_index(field_name="embedding", index_params=index_params, using="default")
+        coll.create_index(field_name="embedding", index_params=index_params(), using="default")
         coll.load()
         logger.info("Collection %r created, indexed, and loaded", coll_name)
 
 # Helper to derive a user-specific collection name
 def user_collection(user_id: str) -> str:
+    if RAG_TENANCY_MODE == "partition_key":
+        return SHARED_COLLECTION
+    return user_group(user_id)
+
+
+def user_group(user_id: str) -> str:
+    """Per-user name, independent of tenancy mode; also the user's lexical index group."""
     # Ensure only numbers, letters, and underscores
     safe_user_id = str(user_id).replace("-", "_")
     return f"{BASE_COLLECTION}_{safe_user_id}"
 
-# SSE-based streaming helper
+
+def user_filter(user_id) -> str:
+    """Milvus expr selecting one user's vectors (a partition prune in partition_key mode)."""
+    return f'user_id == "{user_id}"'
+
+
+def user_vector_count(user_id) -> int:
+    """Number of vectors stored for a user."""
+    coll_name = user_collection(user_id)
+    if not collection_exists(coll_name):
+        return 0
+    coll = Collection(coll_name, using="default")
+    if RAG_TENANCY_MODE == "partition_key":
+        rows = coll.query(expr=user_filter(user_id), output_fields=["count(*)"])
+        return int(rows[0]["count(*)"]) if rows else 0
+    return coll.num_entities
+
 def _pdf_to_text(path: str) -> str:
     try:
         reader = PdfReader(path)
@@ -73,29 +104,18 @@ def _pdf_to_text(path: str) -> str:
         with open(path, "r", encoding="utf-8", errors="ignore") as f:
             return f.read()
 
-class SSEStreamer(BaseCallbackHandler):
+class TokenFilter:
+    """Per-stream filter that drops empty tokens and immediate (whitespace-normalized) repeats."""
+
     def __init__(self):
-        self._queue = queue.Queue()
-        self._stop = False
         self._last_norm = None
 
-    def on_llm_new_token(self, token: str, **kwargs):
-        norm = re.sub(r"\s+", " ", token).strip()
+    def accept(self, token: str) -> bool:
+        norm = re.sub(r"\s+", " ", token or "").strip()
         if not norm or norm == self._last_norm:
-            return
-        self._queue.put(token)
+            return False
         self._last_norm = norm
-
-    def end_stream(self):
-        self._stop = True
-
-    def tokens(self):
-        while not self._stop or not self._queue.empty():
-            try:
-                yield self._queue.get(timeout=0.1)
-            except queue.Empty:
-                continue
-        yield None
+        return True
 
 # Ingest helper (called on file upload, kept here if needed)
 def add_user_content_documents(user_id: int, docs: List[Document]) -> None:
@@ -107,189 +127,318 @@ def add_user_content_documents(user_id: int, docs: List[Document]) -> None:
         chunk_size=1000, chunk_overlap=100
     ).split_documents(docs)
 
-    store = Milvus(
-        embedding_function=OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY),
-        collection_name=coll_name,
-        connection_args={"host": MILVUS_HOST, "port": MILVUS_PORT},
-        drop_old=False,
-    )
+    store = get_vector_store(coll_name)
     store.add_documents(chunks)
+    schedule_flush(coll_name)
+    invalidate_collections([coll_name])
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_id(kb_item_id, ordinal: int, text: str) -> str:
+    """Deterministic chunk ID: the same text at the same position always maps to the same row."""
+    return f"{kb_item_id}_{ordinal}_{content_hash(text)}"
+
+
+def _manifest_for(item, coll_name: str) -> Optional[dict]:
+    """The item's chunk manifest, if it describes what is stored in coll_name."""
+    manifest = getattr(item, "rag_manifest", None) or {}
+    if manifest.get("collection") != coll_name or "chunks" not in manifest:
+        return None
+    return manifest
+
+
+def _save_manifest(item, manifest: dict) -> None:
+    item.rag_manifest = manifest
+    # update() rather than save(): no signals, updated_at unchanged
+    type(item).objects.filter(pk=item.pk).update(rag_manifest=manifest)
+
+
+def _read_item_text(item) -> Tuple[Optional[str], Optional[str]]:
+    """Return (text, source_name) for a KnowledgeBaseItem, or (None, None) if it has nothing to ingest."""
+    # Use inline content if present (from extracted markdown)
+    if getattr(item, "content", None):
+        return item.content, f"inline_{item.id}"
+
+    # Fallback to extracted markdown, then the processed file, then the original file
+    for attr in ("extracted_md_object_key", "file_object_key", "original_file_object_key"):
+        object_key = getattr(item, attr, None)
+        if not object_key:
+            continue
+        try:
+            from notebooks.utils.storage import get_minio_backend
+            content = get_minio_backend().get_file(object_key)
+        except Exception as e:
+            logger.error("Error reading %s for item %s: %s", attr, item.id, e)
+            return None, None
+        text = content.decode("utf-8") if isinstance(content, bytes) else content
+        return text, object_key.rsplit("/", 1)[-1]
+
+    logger.warning("Skipping item %s: no file or content attached.", getattr(item, "id", None))
+    return None, None
+
+
+def _existing_chunk_ids(coll_name: str, user_id, kb_item_ids: List[str]) -> Dict[str, Set[str]]:
+    """Map kb_item_id -> chunk IDs already stored in the collection."""
+    existing: Dict[str, Set[str]] = {}
+    if not kb_item_ids or not collection_exists(coll_name):
+        return existing
+    collection = Collection(coll_name, using="default")
+    schema = collection.schema
+    if not schema.enable_dynamic_field and "kb_item_id" not in {f.name for f in schema.fields}:
+        # Collections created with the legacy schema have no kb_item_id field.
+        # Any other failure propagates: an empty answer would duplicate chunks
+        # on ingest and orphan them on delete.
+        logger.warning("Collection %r has no kb_item_id field; existing chunks are unknown", coll_name)
+        return existing
+    quoted = ",".join(f'"{kid}"' for kid in kb_item_ids)
+    rows = collection.query(
+        expr=f"{user_filter(user_id)} and kb_item_id in [{quoted}]",
+        output_fields=["pk", "kb_item_id"],
+    )
+    for row in rows:
+        existing.setdefault(str(row["kb_item_id"]), set()).add(str(row["pk"]))
+    return existing
+
+
+def _embedding_batches(chunks: List[Document], ids: List[str]):
+    """Yield (chunks, ids) batches bounded by both chunk count and total characters."""
+    batch, batch_ids, batch_chars = [], [], 0
+    for chunk, cid in zip(chunks, ids):
+        size = len(chunk.page_content)
+        if batch and (len(batch) >= RAG_EMBED_BATCH_SIZE or batch_chars + size > RAG_EMBED_BATCH_CHARS):
+            yield batch, batch_ids
+            batch, batch_ids, batch_chars = [], [], 0
+        batch.append(chunk)
+        batch_ids.append(cid)
+        batch_chars += size
+    if batch:
+        yield batch, batch_ids
 
-    # flush + load
-    coll = Collection(coll_name, using="default")
-    coll.flush()
-    coll.load()
 
 def add_user_files(
     user_id: int,
     kb_items: List,  # KnowledgeBaseItem model instances
 ) -> None:
+    """
+    Embed and store the text of kb_items in the user's collection.
+
+    Chunks are keyed by chunk_id and each item keeps a manifest of its chunk IDs
+    and content hashes (KnowledgeBaseItem.rag_manifest). Re-ingesting an item
+    diffs against the manifest: unchanged chunks are kept, stale ones deleted
+    and only new or changed chunks embedded, in bounded batches concurrently.
+    The flush is coalesced.
+    """
     coll_name = user_collection(user_id)
-    store = Milvus(
-        embedding_function=OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY),
-        collection_name=coll_name,
-        connection_args={"host": MILVUS_HOST, "port": MILVUS_PORT},
-        drop_old=False,
-    )
+    if RAG_TENANCY_MODE == "partition_key":
+        ensure_partitioned_collection(coll_name)
+    store = get_vector_store(coll_name)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
 
-    docs = []
+    items = []
     for item in kb_items:
-        text = None
-        source_name = None
-
-        # Use inline content if present (from extracted markdown)
-        if getattr(item, "content", None):
-            print(f"[DEBUG] Ingesting inline content for item {item}")
-            text = item.content
-            source_name = f"inline_{item.id}"
-            print("!!!!text", text[:200] if isinstance(text, str) else str(text)[:200])
-        # Fallback to extracted markdown file if present
-        elif getattr(item, "extracted_md_object_key", None):
-            try:
-                from notebooks.utils.storage import get_minio_backend
-                backend = get_minio_backend()
-                content = backend.get_file(item.extracted_md_object_key)
-                print(f"[DEBUG] Ingesting extracted markdown for item {item.id}: key={item.extracted_md_object_key}")
-                print(f"[DEBUG] Extracted markdown content (first 200 chars): {content[:200] if isinstance(content, bytes) else str(content)[:200]}")
-                text = content.decode('utf-8') if isinstance(content, bytes) else content
-                source_name = item.extracted_md_object_key.rsplit("/", 1)[-1]
-            except Exception as e:
-                print(f"[ERROR] Error reading extracted markdown for item {item.id}: {e}")
-                continue
-        # Fallback to processed file
-        elif getattr(item, "file_object_key", None):
-            try:
-                from notebooks.utils.storage import get_minio_backend
-                backend = get_minio_backend()
-                content = backend.get_file(item.file_object_key)
-                print(f"[DEBUG] Ingesting processed file for item {item.id}: key={item.file_object_key}")
-                text = content.decode('utf-8') if isinstance(content, bytes) else content
-                source_name = item.file_object_key.rsplit("/", 1)[-1]
-            except Exception as e:
-                print(f"[ERROR] Error reading processed file for item {item.id}: {e}")
-                continue
-        elif getattr(item, "original_file_object_key", None):
-            try:
-                from notebooks.utils.storage import get_minio_backend
-                backend = get_minio_backend()
-                content = backend.get_file(item.original_file_object_key)
-                print(f"[DEBUG] Ingesting original file for item {item.id}: key={item.original_file_object_key}")
-                text = content.decode('utf-8') if isinstance(content, bytes) else content
-                source_name = item.original_file_object_key.rsplit("/", 1)[-1]
-            except Exception as e:
-                print(f"[ERROR] Error reading original file for item {item.id}: {e}")
-                continue
-        else:
-            print(f"[WARN] Skipping item {getattr(item, 'id', None)}: no file or content attached.")
+        text, source_name = _read_item_text(item)
+        if text is None:
             continue
-
-        docs.append(Document(
+        doc = Document(
             page_content=text,
             metadata={
                 "user_id": str(user_id),
                 "source": source_name,
                 "kb_item_id": str(item.id),
             }
-        ))
+        )
+        items.append((item, source_name, splitter.split_documents([doc])))
+
+    # Items ingested before manifests existed are looked up in Milvus instead
+    unknown = [str(item.id) for item, _, _ in items if _manifest_for(item, coll_name) is None]
+    existing = _existing_chunk_ids(coll_name, user_id, unknown)
+
+    new_chunks, new_ids, stale_ids, manifests = [], [], [], []
+    for item, source_name, chunks in items:
+        kb_item_id = str(item.id)
+        hashes = [content_hash(c.page_content) for c in chunks]
+        ids = [chunk_id(kb_item_id, i, c.page_content) for i, c in enumerate(chunks)]
+
+        manifest = _manifest_for(item, coll_name)
+        if manifest is not None:
+            stored = {cid for cid, _ in manifest["chunks"]}
+            # a new source name changes every chunk's metadata, so nothing is reusable
+            reusable = stored if manifest.get("source") == source_name else set()
+        else:
+            stored = reusable = existing.get(kb_item_id, set())
+
+        for chunk, cid in zip(chunks, ids):
+            if cid not in reusable:
+                new_chunks.append(chunk)
+                new_ids.append(cid)
+        stale_ids.extend(stored - (reusable & set(ids)))
+        manifests.append((item, {
+            "collection": coll_name,
+            "source": source_name,
+            "chunks": [[cid, h] for cid, h in zip(ids, hashes)],
+        }))
+
+    logger.info(
+        "Ingesting %d new chunks for user %s (%d unchanged, %d stale)",
+        len(new_chunks), user_id, sum(len(c) for _, _, c in items) - len(new_chunks), len(stale_ids),
+    )
 
-    # split into chunks and add
-    chunks = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=100
-    ).split_documents(docs)
+    try:
+        if stale_ids:
+            store.delete(ids=stale_ids)
+            get_bm25_index().delete(stale_ids)
+
+        batches = list(_embedding_batches(new_chunks, new_ids))
+        if batches and not collection_exists(coll_name):
+            # The first insert creates the collection; do it before fanning out
+            first_chunks, first_ids = batches.pop(0)
+            store.add_documents(first_chunks, ids=first_ids)
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(RAG_EMBED_CONCURRENCY, len(batches))) as executor:
+                futures = [
+                    executor.submit(store.add_documents, batch, ids=batch_ids)
+                    for batch, batch_ids in batches
+                ]
+                for future in futures:
+                    future.result()
+    except Exception:
+        # Milvus now holds an unknown subset; make the next run diff against Milvus
+        # itself. The collection is kept so deleting the item still looks there.
+        for item, _ in manifests:
+            _save_manifest(item, {"collection": coll_name})
+        raise
+
+    for item, manifest in manifests:
+        _save_manifest(item, manifest)
+
+    if new_chunks:
+        get_bm25_index().add_documents(new_chunks, new_ids, group=user_group(user_id))
+
+    if new_chunks or stale_ids:
+        schedule_flush(coll_name)
+        invalidate_collections([coll_name])
+
+
+def _delete_chunks(coll_name: str, ids: List[str]) -> None:
+    """Delete chunks by ID from the vector store and the lexical index."""
+    if not ids:
+        return
+    if collection_exists(coll_name):
+        get_vector_store(coll_name).delete(ids=list(ids))
+    get_bm25_index().delete(list(ids))
+    invalidate_collections([coll_name])
+
+
+def vector_cleanup_args(kb_item) -> Optional[dict]:
+    """
+    Keyword arguments for delete_chunk_vectors that remove a KnowledgeBaseItem's
+    chunks, or None if it has nothing in the vector store.
 
-    print(f"[DEBUG] Total chunks to ingest for user {user_id}: {len(chunks)}")
+    Items with a manifest list their chunk IDs. Items whose last ingest failed
+    keep only the collection and are looked up by kb_item_id, as are finished
+    items ingested before manifests existed. Anything else was never ingested.
+    """
+    manifest = getattr(kb_item, "rag_manifest", None) or {}
+    if "chunks" in manifest:
+        if not manifest["chunks"]:
+            return None
+        chunk_ids = [cid for cid, _ in manifest["chunks"]]
+    elif manifest.get("collection") or getattr(kb_item, "processing_status", None) == "done":
+        chunk_ids = None
+    else:
+        return None
+    return {
+        "kb_item_id": str(kb_item.id),
+        "collection": manifest.get("collection"),
+        "chunk_ids": chunk_ids,
+    }
+
+
+def delete_chunk_vectors(
+    user_id: int,
+    kb_item_id: str,
+    collection: Optional[str] = None,
+    chunk_ids: Optional[List[str]] = None,
+) -> int:
+    """
+    Delete a KnowledgeBaseItem's chunks by ID, or every chunk tagged with its
+    kb_item_id when chunk_ids is None; returns the number of chunk IDs removed.
 
-    # Generate unique string IDs for each chunk
-    ids = [str(uuid.uuid4()) for _ in range(len(chunks))]
+    The user's current collection is always included: migrate_rag_tenancy copies
+    rows (with their IDs) out of the collection a manifest may still name.
+    """
+    current = user_collection(user_id)
+    collections = [current] if collection in (None, current) else [collection, current]
+    removed = set()
+    for coll_name in collections:
+        if chunk_ids is None:
+            ids = sorted(_existing_chunk_ids(coll_name, user_id, [kb_item_id]).get(kb_item_id, set()))
+        else:
+            ids = list(chunk_ids)
+        _delete_chunks(coll_name, ids)
+        removed.update(ids)
+    return len(removed)
 
-    # Pass ids to add_documents
-    store.add_documents(chunks, ids=ids)
 
-    # make sure Milvus is up to date
-    coll = Collection(coll_name)
-    coll.flush()
-    coll.load()
-    print(f"[DEBUG] Milvus collection '{coll_name}' flushed and loaded after ingest.")
+def delete_kb_item_vectors(user_id: int, kb_item) -> int:
+    """Delete every chunk ingested for a KnowledgeBaseItem; returns the number of chunk IDs removed."""
+    args = vector_cleanup_args(kb_item)
+    removed = delete_chunk_vectors(user_id, **args) if args else 0
+    if getattr(kb_item, "rag_manifest", None) and kb_item.pk is not None:
+        _save_manifest(kb_item, {})
+    return removed
 
 
 # Remove helper to delete vectors by source
 def delete_user_file(user_id: int, source: str) -> None:
-    coll_name = user_collection(user_id)
-    store = Milvus(
-        embedding_function=OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY),
-        collection_name=coll_name,
-        connection_args={"host": MILVUS_HOST, "port": MILVUS_PORT},
-        drop_old=False,
-    )
-    expr = f'user_id=={user_id} && source=="{source}"'
-    store.delete(expr=expr)
-
-
-from typing import List, Optional
-from langchain.schema import BaseRetriever, Document
-
-class CombinedRetriever(BaseRetriever):
     """
-    Combines local and global retrievers per-call.
-    filter_sources: optional list of source filenames
+    Delete a user's chunks by source name, as set at ingest: ``inline_<kb_item_id>``
+    for inline content, otherwise the basename of the ingested object key.
+    Prefer delete_kb_item_vectors when the KnowledgeBaseItem is at hand.
     """
+    coll_name = user_collection(user_id)
+    if not collection_exists(coll_name):
+        return
+    rows = Collection(coll_name, using="default").query(
+        expr=f'{user_filter(user_id)} and source == "{source}"',
+        output_fields=["pk"],
+    )
+    _delete_chunks(coll_name, [str(row["pk"]) for row in rows])
 
-    local_retriever: BaseRetriever
-    global_retriever: BaseRetriever
-    k_local: int = 7
-    k_global: int = 3
-    filter_sources: Optional[List[str]] = None
-
-    class Config:
-        arbitrary_types_allowed = True
-
-    def __init__(
-        self,
-        local_retriever: BaseRetriever,
-        global_retriever: BaseRetriever,
-        k_local: int = 7,
-        k_global: int = 3,
-        filter_sources: Optional[List[str]] = None,
-    ):
-        super().__init__(
-            local_retriever=local_retriever,
-            global_retriever=global_retriever,
-            k_local=k_local,
-            k_global=k_global,
-            filter_sources=filter_sources,
-        )
-
-        self.local_retriever  = local_retriever
-        self.global_retriever = global_retriever
-        self.k_local          = k_local
-        self.k_global         = k_global
-        self.filter_sources   = filter_sources or []
 
-    def get_relevant_documents(self, query: str) -> List[Document]:
-        hits: List[Document] = []
+def merge_local_and_global(
+    local_hits: List[Document],
+    global_hits: List[Document],
+    k_local: int,
+    k_global: int,
+    filter_sources: Optional[List[str]] = None,
+) -> List[Document]:
+    hits: List[Document] = []
+    hits.extend(local_hits[:k_local])
+    hits.extend(global_hits[:k_global])
 
-        hits.extend(self.local_retriever.get_relevant_documents(query)[: self.k_local])
-        hits.extend(self.global_retriever.get_relevant_documents(query)[: self.k_global])
+    # filter by source if requested
+    if filter_sources:
+        hits = [d for d in hits if d.metadata.get("source") in filter_sources]
 
-        # filter by source if requested
-        if self.filter_sources:
-            hits = [d for d in hits if d.metadata.get("source") in self.filter_sources]
+    # dedupe by source
+    seen, results = set(), []
+    for d in hits:
+        key = d.metadata.get("source") or d.page_content[:30]
+        if key not in seen:
+            seen.add(key)
+            results.append(d)
 
-        # dedupe by source
-        seen, results = set(), []
-        for d in hits:
-            key = d.metadata.get("source") or d.page_content[:30]
-            if key not in seen:
-                seen.add(key)
-                results.append(d)
+    return results
 
-        return results
 
 class RAGChatbot:
     """
     RAG with streaming via .stream().
-    Each user has its own Milvus collection.
+    Each user has its own Milvus collection, or a partition of the shared one.
     Supports specifying additional collections for retrieval.
     """
     def __init__(
@@ -306,90 +455,79 @@ class RAGChatbot:
 
         # persistent Milvus store per user
         coll_name = user_collection(user_id)
-        self.embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        self.store = Milvus(
-            embedding_function=self.embeddings,
-            collection_name=coll_name,
-            connection_args={"host": MILVUS_HOST, "port": MILVUS_PORT},
-            drop_old=False,
-        )
+        self.store = get_vector_store(coll_name)
 
-        # Build list of collections to retrieve from
-        self.selected_collections = [coll_name]
-        if self.extra_collections:
-            self.selected_collections.extend(self.extra_collections)
-        else:
-            self.selected_collections.append(DEFAULT_COLLECTION_NAME)
+        # Shared collections to retrieve from; the user's own collection is
+        # searched separately with a user_id filter (see stream)
+        self.selected_collections = list(self.extra_collections or [DEFAULT_COLLECTION_NAME])
 
         # global retriever from engine, using selected collections
         self.global_retriever = get_rag_chain(self.selected_collections).retriever
 
-        # LLM + SSE
-        self.streamer = SSEStreamer()
+        # Streaming LLM; stateless, so concurrent streams never share tokens
         self.llm = ChatOpenAI(
             model_name     = "gpt-4o-mini",
             openai_api_key = OPENAI_API_KEY,
             streaming      = True,
-            callbacks      = [self.streamer],
         )
 
-    def stream(
+    def _prepare(
         self,
         question: str,
         history: Optional[List[Tuple[str, str]]] = None,
         file_ids: Optional[List[str]] = None,
-        extra_collections: Optional[List[str]] = None,  # <-- allow override per call
-    ) -> Generator[str, None, None]:
+        extra_collections: Optional[List[str]] = None,
+    ) -> Tuple[List[Document], List[BaseMessage]]:
+        """Retrieve context for a question; returns (retrieved docs, LLM messages). Blocking."""
         history = history or []
 
         # Build collections to retrieve from: user's + extra
         coll_name = user_collection(self.user_id)
-        collections_to_use = [coll_name]
-        if extra_collections:
-            collections_to_use.extend(extra_collections)
-        elif self.extra_collections:
-            collections_to_use.extend(self.extra_collections)
-        else:
-            collections_to_use.append(DEFAULT_COLLECTION_NAME)
+        shared_collections = list(extra_collections or self.extra_collections or [DEFAULT_COLLECTION_NAME])
+        collections_to_use = [coll_name] + shared_collections
 
-        # Build retriever for these collections
-        global_retriever = get_rag_chain(collections_to_use).retriever
+        # Retriever for the shared collections; cached per collection set, so it
+        # must not depend on the user
+        global_retriever = get_rag_chain(shared_collections).retriever
 
-        clauses = [f'user_id=="{self.user_id}"']
+        clauses = [user_filter(self.user_id)]
         if file_ids:
             quoted = ",".join(f'"{fid}"' for fid in file_ids)
             clauses.append(f"kb_item_id in [{quoted}]")
         expr = " and ".join(clauses)
-        local_ret = self.store.as_retriever(search_kwargs={"k": self.k_local, "expr": expr})
 
-        # Retrieve local and global docs separately
-        local_docs = local_ret.get_relevant_documents(question)[:self.k_local]
+        # One concurrent fan-out: the filtered local search, the user's whole
+        # collection (always user_id-filtered, required in partition_key mode;
+        # the same search as the local one unless file_ids narrow it) and every
+        # shared collection, plus BM25 over shared docs and the user's chunks
+        user_searches = [CollectionSearch(coll_name, max(self.k_local, global_retriever.k_vector), expr)]
+        if file_ids:
+            user_searches = [
+                CollectionSearch(coll_name, self.k_local, expr),
+                CollectionSearch(coll_name, global_retriever.k_vector, user_filter(self.user_id)),
+            ]
+        lexical_retriever = BM25Retriever(
+            groups=[""] + shared_collections + [user_group(self.user_id)], k=global_retriever.k_bm25
+        )
+        hits, bm25_hits = search_collections(
+            question, user_searches + global_retriever.searches(), lexical_retriever
+        )
+        local_docs = hits[0][:self.k_local]
+        user_hits, shared_hits = hits[len(user_searches) - 1], hits[len(user_searches):]
+        global_hits = global_retriever.merge([user_hits] + shared_hits, bm25_hits)
+
         global_docs = []
         if not file_ids:
-            combined = CombinedRetriever(
-                local_retriever=local_ret,
-                global_retriever=global_retriever,
-                k_local=self.k_local,
-                k_global=self.k_global,
-                filter_sources=None,
-            )
-            docs = combined.get_relevant_documents(question)
+            docs = merge_local_and_global(local_docs, global_hits, self.k_local, self.k_global)
         else:
             # If file_ids are set, only retrieve global docs for reference
-            global_docs = global_retriever.get_relevant_documents(question)[:self.k_global]
+            global_docs = global_hits[:self.k_global]
             docs = local_docs + global_docs
 
-        print(f"Retrieved {len(docs)} documents for question: {question}")
-        print("Retrieved kb_item_ids:", [d.metadata.get("kb_item_id") for d in docs])
-        print("Selected file_ids:", file_ids)
-        print("Extra collections used:", collections_to_use)
-
-        # emit metadata
-        meta = {"type": "metadata", "docs": [
-            {"source": d.metadata.get("source"), "snippet": d.page_content[:200].replace("\n", " ")}
-            for d in docs
-        ]}
-        yield f"data: {json.dumps(meta)}\n\n"
+        logger.debug("Retrieved %d documents for question: %s", len(docs), question)
+        logger.debug("Retrieved kb_item_ids: %s", [d.metadata.get("kb_item_id") for d in docs])
+        logger.debug("Selected file_ids: %s", file_ids)
+        logger.debug("Extra collections used: %s", collections_to_use)
 
         # prepare context with emphasis
         local_context = "\n\n---\n\n".join(
@@ -417,19 +555,66 @@ class RAGChatbot:
             f"{context}\n\nHistory:\n{history}\n\nQuestion:\n{question}\n\nAnswer:"
         )
 
-        # stream LLM tokens
-        def _run():
-            self.llm([
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=question),
-            ])
-            self.streamer.end_stream()
-        threading.Thread(target=_run, daemon=True).start()
-
-        for token in self.streamer.tokens():
-            if token is None:
-                break
-            yield f"data: {json.dumps({'type':'token','text':token})}\n\n"
+        return docs, [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=question),
+        ]
+
+    @staticmethod
+    def _metadata_event(docs: List[Document]) -> str:
+        meta = {"type": "metadata", "docs": [
+            {"source": d.metadata.get("source"), "snippet": d.page_content[:200].replace("\n", " ")}
+            for d in docs
+        ]}
+        return f"data: {json.dumps(meta)}\n\n"
+
+    @staticmethod
+    def _token_event(token: str) -> str:
+        return f"data: {json.dumps({'type':'token','text':token})}\n\n"
+
+    def stream(
+        self,
+        question: str,
+        history: Optional[List[Tuple[str, str]]] = None,
+        file_ids: Optional[List[str]] = None,
+        extra_collections: Optional[List[str]] = None,  # <-- allow override per call
+    ) -> Generator[str, None, None]:
+        """Synchronous SSE stream (WSGI). Tokens are pulled straight from the LLM iterator."""
+        docs, messages = self._prepare(question, history, file_ids, extra_collections)
+        yield self._metadata_event(docs)
+
+        token_filter = TokenFilter()
+        for chunk in self.llm.stream(messages):
+            if token_filter.accept(chunk.content):
+                yield self._token_event(chunk.content)
+        yield "event: done\ndata: {}\n\n"
+
+    async def astream(
+        self,
+        question: str,
+        history: Optional[List[Tuple[str, str]]] = None,
+        file_ids: Optional[List[str]] = None,
+        extra_collections: Optional[List[str]] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Asynchronous SSE stream (ASGI). Each call owns its token iterator, the
+        LLM is only read as fast as the client consumes events, and closing the
+        generator on client disconnect cancels the upstream LLM request.
+        """
+        loop = asyncio.get_running_loop()
+        docs, messages = await loop.run_in_executor(
+            None, self._prepare, question, history, file_ids, extra_collections
+        )
+        yield self._metadata_event(docs)
+
+        token_filter = TokenFilter()
+        try:
+            async for chunk in self.llm.astream(messages):
+                if token_filter.accept(chunk.content):
+                    yield self._token_event(chunk.content)
+        except asyncio.CancelledError:
+            logger.info("Chat stream for user %s cancelled by client disconnect", self.user_id)
+            raise
         yield "event: done\ndata: {}\n\n"
 
 
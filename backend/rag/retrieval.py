@@ -0,0 +1,138 @@
+"""
+Concurrent vector search across Milvus collections for the RAG module.
+
+``search_collections`` embeds the query once, issues one search per
+(collection, k, filter expr) concurrently on a shared thread pool, optionally
+runs a lexical retriever alongside them, and returns when the slowest search
+finishes. Results are kept in a short-TTL cache keyed by
+(collection, filter expr, k, query), so a repeated question, or the same global
+collection searched for several users, is answered without calling Milvus.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from langchain.schema import BaseRetriever, Document
+
+from rag.embeddings import get_embeddings
+from rag.vector_store import get_vector_store
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ─────────────────────────────────────────────────────────
+RAG_SEARCH_WORKERS         = int(os.getenv("RAG_SEARCH_WORKERS", "16"))
+RAG_RETRIEVAL_CACHE_TTL    = float(os.getenv("RAG_RETRIEVAL_CACHE_TTL", "60"))
+RAG_RETRIEVAL_CACHE_SIZE   = int(os.getenv("RAG_RETRIEVAL_CACHE_SIZE", "1024"))
+
+# Leaf searches only: tasks on this pool never wait on other futures
+_search_executor = ThreadPoolExecutor(max_workers=RAG_SEARCH_WORKERS, thread_name_prefix="rag-search")
+
+
+class CollectionSearch(NamedTuple):
+    collection: str
+    k: int
+    expr: Optional[str] = None
+
+
+class TTLCache:
+    """Thread-safe bounded cache whose entries expire ttl seconds after insertion."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate=None) -> None:
+        """Drop all entries, or only those whose key matches predicate."""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if predicate(key)]:
+                    del self._entries[key]
+
+
+retrieval_cache = TTLCache(RAG_RETRIEVAL_CACHE_TTL, RAG_RETRIEVAL_CACHE_SIZE)
+
+
+def invalidate_collection(collection_name: str) -> None:
+    """Forget cached search results for a collection after its contents change."""
+    retrieval_cache.invalidate(lambda key: key[0] == collection_name)
+
+
+def _search(search: CollectionSearch, query_vector: List[float]) -> List[Document]:
+    store = get_vector_store(search.collection)
+    return store.similarity_search_by_vector(query_vector, k=search.k, expr=search.expr)
+
+
+def search_collections(
+    query: str,
+    searches: Sequence[CollectionSearch],
+    lexical_retriever: Optional[BaseRetriever] = None,
+) -> Tuple[List[List[Document]], List[Document]]:
+    """
+    Run all searches concurrently with a single query embedding.
+
+    Returns (hits per search, in order; lexical hits). A failed search
+    contributes no hits and is not cached.
+    """
+    lexical_future = None
+    if lexical_retriever is not None:
+        lexical_future = _search_executor.submit(lexical_retriever.get_relevant_documents, query)
+
+    results: List[Optional[List[Document]]] = []
+    missing = []
+    for i, search in enumerate(searches):
+        cached = retrieval_cache.get((search.collection, search.expr, search.k, query))
+        results.append(cached)
+        if cached is None:
+            missing.append(i)
+
+    if missing:
+        query_vector = get_embeddings().embed_query(query)
+        futures = {i: _search_executor.submit(_search, searches[i], query_vector) for i in missing}
+        for i, future in futures.items():
+            search = searches[i]
+            try:
+                hits = future.result()
+            except Exception as e:
+                logger.warning("Search in %r failed: %s", search.collection, e)
+                results[i] = []
+                continue
+            retrieval_cache.set((search.collection, search.expr, search.k, query), hits)
+            results[i] = hits
+
+    lexical_hits: List[Document] = []
+    if lexical_future is not None:
+        try:
+            lexical_hits = lexical_future.result()
+        except Exception as e:
+            logger.warning("Lexical search failed: %s", e)
+    return results, lexical_hits
@@ -1,3 +1,402 @@
+import tempfile
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from langchain.schema import Document
+
+from rag.embeddings import CachedEmbeddings
+from rag.lexical_index import BM25Index
+from rag.rag import (
+    SHARED_COLLECTION,
+    TokenFilter,
+    _existing_chunk_ids,
+    add_user_files,
+    chunk_id,
+    delete_chunk_vectors,
+    vector_cleanup_args,
+)
+from rag.retrieval import TTLCache
+from rag.vector_store import LRURegistry
+
+
+class _CountingEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return [float(len(text)), 1.0]
+
+
+class _DictCache(dict):
+    def set(self, key, value):
+        self[key] = value
+
+
+class CachedEmbeddingsTests(TestCase):
+    def setUp(self):
+        self.underlying = _CountingEmbeddings()
+        self.cache_store = _DictCache()
+        self.embeddings = CachedEmbeddings(self.underlying, "test:model", self.cache_store)
+
+    def test_only_misses_are_embedded(self):
+        first = self.embeddings.embed_documents(["alpha", "beta", "alpha"])
+        second = self.embeddings.embed_documents(["beta", "gamma"])
+
+        self.assertEqual(first, [[5.0, 1.0], [4.0, 1.0], [5.0, 1.0]])
+        self.assertEqual(second, [[4.0, 1.0], [5.0, 1.0]])
+        self.assertEqual(self.underlying.calls, [["alpha", "beta"], ["gamma"]])
+
+    def test_query_shares_document_cache(self):
+        self.embeddings.embed_documents(["what is rag"])
+        self.assertEqual(self.embeddings.embed_query("what is rag"), [11.0, 1.0])
+        self.assertEqual(len(self.underlying.calls), 1)
+
+    def test_namespace_separates_models(self):
+        self.embeddings.embed_documents(["alpha"])
+        other = CachedEmbeddings(self.underlying, "other:model", self.cache_store)
+        other.embed_documents(["alpha"])
+        self.assertEqual(len(self.underlying.calls), 2)
+
+
+class TTLCacheTests(TestCase):
+    def test_entries_expire(self):
+        cache = TTLCache(ttl=10, max_entries=8)
+        with mock.patch("rag.retrieval.time.monotonic", return_value=100.0):
+            cache.set(("coll", None, 5, "q"), ["hit"])
+            self.assertEqual(cache.get(("coll", None, 5, "q")), ["hit"])
+        with mock.patch("rag.retrieval.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get(("coll", None, 5, "q")))
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_invalidate_by_collection(self):
+        cache = TTLCache(ttl=60, max_entries=8)
+        cache.set(("user_files_1", None, 5, "q"), [])
+        cache.set(("global", None, 5, "q"), [])
+        cache.invalidate(lambda key: key[0] == "user_files_1")
+        self.assertIsNone(cache.get(("user_files_1", None, 5, "q")))
+        self.assertEqual(cache.get(("global", None, 5, "q")), [])
+
+
+class LRURegistryTests(TestCase):
+    def test_factory_runs_once_per_key(self):
+        registry = LRURegistry(max_size=4)
+        calls = []
+        key = frozenset(["global", "user_files_1"])
+        for _ in range(3):
+            registry.get_or_create(key, lambda: calls.append(1) or object())
+        self.assertEqual(len(calls), 1)
+        # collection order does not matter
+        self.assertIs(registry.get(frozenset(["user_files_1", "global"])), registry.get(key))
+
+    def test_evicts_least_recently_used(self):
+        registry = LRURegistry(max_size=2)
+        registry.get_or_create("a", object)
+        registry.get_or_create("b", object)
+        registry.get("a")
+        registry.get_or_create("c", object)
+        self.assertIsNotNone(registry.get("a"))
+        self.assertIsNone(registry.get("b"))
+        self.assertEqual(len(registry), 2)
+
+    def test_invalidate_chains_for_collection(self):
+        registry = LRURegistry(max_size=8)
+        registry.get_or_create(frozenset(["global", "user_files_1"]), object)
+        registry.get_or_create(frozenset(["global", "user_files_2"]), object)
+        dropped = registry.invalidate(lambda key: "user_files_1" in key)
+        self.assertEqual(dropped, 1)
+        self.assertIsNone(registry.get(frozenset(["global", "user_files_1"])))
+        self.assertIsNotNone(registry.get(frozenset(["global", "user_files_2"])))
+
+
+class BM25IndexTests(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.index = BM25Index(self.path, compact_threshold=3)
+        self.index.build_if_empty(lambda: [
+            {"id": "paper:0", "group": "", "text": "graph neural networks for molecules", "metadata": {}},
+            {"id": "paper:1", "group": "", "text": "transformer language models", "metadata": {}},
+        ])
+
+    def _ids(self, results):
+        return [record["id"] for _, record in results]
+
+    def test_build_only_once(self):
+        self.assertFalse(self.index.build_if_empty(lambda: []))
+        self.assertEqual(self._ids(self.index.search("molecules")), ["paper:0"])
+
+    def test_groups_restrict_results(self):
+        self.index.add_documents([Document(page_content="neural rendering notes")], ["c1"], group="user_files_1")
+        self.assertEqual(set(self._ids(self.index.search("neural", groups=["", "user_files_1"]))), {"paper:0", "c1"})
+        self.assertEqual(self._ids(self.index.search("neural", groups=["", "user_files_2"])), ["paper:0"])
+
+    def test_incremental_changes_survive_compaction_and_reload(self):
+        self.index.add_documents([Document(page_content="neural rendering notes")], ["c1"], group="g")
+        self.index.delete(["paper:0"])
+        self.assertEqual(self._ids(self.index.search("neural")), ["c1"])
+
+        # the fourth operation crosses the threshold and merges into a new base segment
+        self.index.add_documents(
+            [Document(page_content="sparse attention"), Document(page_content="neural fields")], ["c2", "c3"], group="g"
+        )
+        self.assertEqual(self.index._delta_ops, 0)
+
+        reloaded = BM25Index(self.path)
+        self.assertEqual(set(self._ids(reloaded.search("neural"))), {"c1", "c3"})
+        self.assertEqual(self._ids(reloaded.search("molecules")), [])
+
+
+class TokenFilterTests(TestCase):
+    def test_drops_blank_and_repeated_tokens(self):
+        token_filter = TokenFilter()
+        tokens = ["Hello", " ", "Hello ", " world", "", "!", "!"]
+        self.assertEqual([t for t in tokens if token_filter.accept(t)], ["Hello", " world", "!"])
+
+    def test_filters_are_independent_per_stream(self):
+        first, second = TokenFilter(), TokenFilter()
+        self.assertTrue(first.accept("same"))
+        self.assertTrue(second.accept("same"))
+
+
+class ExistingChunkIdsTests(TestCase):
+    def _collection(self, field_names, rows=None, error=None):
+        collection = mock.Mock()
+        collection.schema.enable_dynamic_field = False
+        collection.schema.fields = [mock.Mock() for _ in field_names]
+        for field, name in zip(collection.schema.fields, field_names):
+            field.name = name
+        collection.query.side_effect = error
+        collection.query.return_value = rows or []
+        return collection
+
+    def _lookup(self, collection):
+        with mock.patch("rag.rag.collection_exists", return_value=True), \
+                mock.patch("rag.rag.Collection", return_value=collection):
+            return _existing_chunk_ids("user_files_1", 1, ["7"])
+
+    def test_groups_ids_by_item(self):
+        collection = self._collection(
+            ["pk", "kb_item_id"], rows=[{"pk": "7_0_a", "kb_item_id": "7"}, {"pk": "7_1_b", "kb_item_id": "7"}]
+        )
+        self.assertEqual(self._lookup(collection), {"7": {"7_0_a", "7_1_b"}})
+
+    def test_legacy_schema_has_no_existing_chunks(self):
+        collection = self._collection(["pk", "text", "vector"])
+        self.assertEqual(self._lookup(collection), {})
+        collection.query.assert_not_called()
+
+    def test_query_errors_propagate(self):
+        collection = self._collection(["pk", "kb_item_id"], error=RuntimeError("milvus unavailable"))
+        with self.assertRaises(RuntimeError):
+            self._lookup(collection)
+
+
+class _KBItem:
+    objects = mock.Mock()
+
+    def __init__(self, item_id, content, rag_manifest=None, processing_status="done"):
+        self.id = self.pk = item_id
+        self.content = content
+        self.rag_manifest = rag_manifest or {}
+        self.processing_status = processing_status
+
+
+def _paragraphs(*words):
+    # Each paragraph fills most of a 1000-character chunk, so it is split into exactly one chunk
+    return "\n\n".join(" ".join([word] * (900 // (len(word) + 1))) for word in words)
+
+
+class ManifestIngestTests(TestCase):
+    def setUp(self):
+        self.store = mock.Mock()
+        self.existing = {}
+        patches = [
+            mock.patch("rag.rag.RAG_TENANCY_MODE", "collection"),
+            mock.patch("rag.rag.get_vector_store", return_value=self.store),
+            mock.patch("rag.rag.collection_exists", return_value=True),
+            mock.patch("rag.rag._existing_chunk_ids", side_effect=lambda *args: self.existing),
+            mock.patch("rag.rag.get_bm25_index"),
+            mock.patch("rag.rag.schedule_flush"),
+            mock.patch("rag.rag.invalidate_collections"),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _ingest(self, item):
+        self.store.reset_mock()
+        add_user_files(1, [item])
+        added = [cid for call in self.store.add_documents.call_args_list for cid in call.kwargs["ids"]]
+        deleted = [cid for call in self.store.delete.call_args_list for cid in call.kwargs["ids"]]
+        return added, sorted(deleted)
+
+    def _ids(self, item):
+        return [cid for cid, _ in item.rag_manifest["chunks"]]
+
+    def test_first_ingest_stores_every_chunk(self):
+        item = _KBItem("7", _paragraphs("alpha", "beta"))
+        added, deleted = self._ingest(item)
+        self.assertEqual(added, self._ids(item))
+        self.assertEqual(len(added), 2)
+        self.assertEqual(deleted, [])
+        self.assertEqual(item.rag_manifest["source"], "inline_7")
+
+    def test_unchanged_item_is_not_reembedded(self):
+        item = _KBItem("7", _paragraphs("alpha", "beta"))
+        self._ingest(item)
+        self.assertEqual(self._ingest(item), ([], []))
+
+    def test_only_changed_chunks_are_replaced(self):
+        item = _KBItem("7", _paragraphs("alpha", "beta", "gamma"))
+        self._ingest(item)
+        old_ids = self._ids(item)
+
+        item.content = _paragraphs("alpha", "delta", "gamma")
+        added, deleted = self._ingest(item)
+        self.assertEqual(added, [self._ids(item)[1]])
+        self.assertEqual(deleted, [old_ids[1]])
+
+    def test_moved_chunks_get_new_ids(self):
+        item = _KBItem("7", _paragraphs("alpha", "beta"))
+        self._ingest(item)
+        old_ids = self._ids(item)
+
+        # chunk IDs include the position, so shifted chunks are stored again
+        item.content = _paragraphs("intro", "alpha", "beta")
+        added, deleted = self._ingest(item)
+        self.assertEqual(added, self._ids(item))
+        self.assertEqual(deleted, sorted(old_ids))
+
+    def test_renamed_source_replaces_all_chunks(self):
+        item = _KBItem("7", _paragraphs("alpha", "beta"))
+        self._ingest(item)
+        item.rag_manifest = dict(item.rag_manifest, source="paper.md")
+
+        added, deleted = self._ingest(item)
+        self.assertEqual(added, self._ids(item))
+        self.assertEqual(deleted, sorted(self._ids(item)))
+
+    def test_items_without_manifest_diff_against_milvus(self):
+        content = _paragraphs("alpha", "beta")
+        stored = chunk_id("7", 0, _paragraphs("alpha"))
+        self.existing = {"7": {stored, "7_1_legacy"}}
+
+        item = _KBItem("7", content)
+        added, deleted = self._ingest(item)
+        self.assertEqual(self._ids(item)[0], stored)
+        self.assertEqual(added, [self._ids(item)[1]])
+        self.assertEqual(deleted, ["7_1_legacy"])
+
+    def test_manifest_cleared_when_ingest_fails(self):
+        item = _KBItem("7", _paragraphs("alpha"))
+        self._ingest(item)
+        item.content = _paragraphs("beta")
+        self.store.add_documents.side_effect = RuntimeError("milvus unavailable")
+
+        with self.assertRaises(RuntimeError):
+            add_user_files(1, [item])
+        # Only the collection is kept: the next ingest and a delete look chunks up in Milvus
+        self.assertEqual(item.rag_manifest, {"collection": "user_files_1"})
+        self.store.add_documents.side_effect = None
+
+
+class DeleteVectorsTests(TestCase):
+    def setUp(self):
+        self.stores = {}
+        self.collections = {"user_files_1", SHARED_COLLECTION}
+        patches = [
+            mock.patch("rag.rag.get_vector_store", side_effect=lambda name: self.stores.setdefault(name, mock.Mock())),
+            mock.patch("rag.rag.collection_exists", side_effect=lambda name: name in self.collections),
+            mock.patch("rag.rag.get_bm25_index"),
+            mock.patch("rag.rag.invalidate_collections"),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _deleted(self, name):
+        store = self.stores.get(name)
+        return [cid for call in store.delete.call_args_list for cid in call.kwargs["ids"]] if store else []
+
+    def test_cleanup_args(self):
+        manifest = {"collection": "user_files_1", "source": "a.md", "chunks": [["7_0_aa", "aa"], ["7_1_bb", "bb"]]}
+        self.assertEqual(
+            vector_cleanup_args(_KBItem("7", "", manifest)),
+            {"kb_item_id": "7", "collection": "user_files_1", "chunk_ids": ["7_0_aa", "7_1_bb"]},
+        )
+        # Failed ingest: look the chunks up in the collection it used
+        self.assertEqual(
+            vector_cleanup_args(_KBItem("7", "", {"collection": "user_files_1"}, "error")),
+            {"kb_item_id": "7", "collection": "user_files_1", "chunk_ids": None},
+        )
+        # Ingested before manifests existed
+        self.assertEqual(
+            vector_cleanup_args(_KBItem("7", "")),
+            {"kb_item_id": "7", "collection": None, "chunk_ids": None},
+        )
+
+    def test_cleanup_skipped_when_nothing_was_ingested(self):
+        self.assertIsNone(vector_cleanup_args(_KBItem("7", "", processing_status="in_progress")))
+        self.assertIsNone(vector_cleanup_args(_KBItem("7", "", {"collection": "user_files_1", "chunks": []})))
+
+    def test_delete_by_chunk_ids(self):
+        with mock.patch("rag.rag.RAG_TENANCY_MODE", "collection"):
+            removed = delete_chunk_vectors(1, "7", "user_files_1", ["7_0_aa", "7_1_bb"])
+        self.assertEqual(removed, 2)
+        self.assertEqual(self._deleted("user_files_1"), ["7_0_aa", "7_1_bb"])
+        self.assertNotIn(SHARED_COLLECTION, self.stores)
+
+    def test_manifest_from_before_tenancy_migration_deletes_shared_copies(self):
+        # migrate_rag_tenancy copied the rows and dropped user_files_1
+        self.collections.discard("user_files_1")
+        with mock.patch("rag.rag.RAG_TENANCY_MODE", "partition_key"):
+            removed = delete_chunk_vectors(1, "7", "user_files_1", ["7_0_aa"])
+        self.assertEqual(removed, 1)
+        self.assertEqual(self._deleted(SHARED_COLLECTION), ["7_0_aa"])
+        self.assertEqual(self._deleted("user_files_1"), [])
+
+    def test_delete_without_chunk_ids_looks_up_kb_item(self):
+        with mock.patch("rag.rag.RAG_TENANCY_MODE", "collection"), \
+                mock.patch("rag.rag._existing_chunk_ids", return_value={"7": {"7_0_aa"}}) as lookup:
+            removed = delete_chunk_vectors(1, "7")
+        lookup.assert_called_once_with("user_files_1", 1, ["7"])
+        self.assertEqual(removed, 1)
+        self.assertEqual(self._deleted("user_files_1"), ["7_0_aa"])
+
+
+class MigrateRagTenancyManifestTests(TestCase):
+    def test_manifests_point_at_the_shared_collection(self):
+        from django.contrib.auth import get_user_model
+        from notebooks.management.commands.migrate_rag_tenancy import Command
+        from notebooks.models import KnowledgeBaseItem
+
+        user = get_user_model().objects.create_user(username="tenant", password="pass")
+        chunks = [["a_0_aa", "aa"]]
+        migrated = KnowledgeBaseItem.objects.create(
+            user=user, title="a", content_type="document",
+            rag_manifest={"collection": "user_files_1", "source": "a.md", "chunks": chunks},
+        )
+        other = KnowledgeBaseItem.objects.create(
+            user=user, title="b", content_type="document",
+            rag_manifest={"collection": "user_files_2", "source": "b.md", "chunks": chunks},
+        )
+
+        self.assertEqual(Command()._repoint_manifests("user_files_1"), 1)
+        migrated.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(
+            migrated.rag_manifest, {"collection": SHARED_COLLECTION, "source": "a.md", "chunks": chunks}
+        )
+        self.assertEqual(other.rag_manifest["collection"], "user_files_2")
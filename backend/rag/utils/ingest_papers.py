@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
+"""
+Summarize conference papers under rag/input/<conference>/<year>/*.pdf and
+upsert the summaries into a Milvus collection.
+
+Runs are resumable: completed papers are appended to a checkpoint file and
+skipped on the next run, so adding a new year of papers only processes those.
+Use --rebuild to drop the collection and checkpoint and start over.
+"""
 import os
 import re
 import json
+import hashlib
 import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
-from pymilvus import connections
+from pymilvus import connections, utility
 from PyPDF2 import PdfReader
 from langchain_community.chat_models import ChatOpenAI
 from langchain.chains.summarize import load_summarize_chain
@@ -14,6 +24,7 @@ from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_milvus import Milvus
+from langchain_core.rate_limiters import InMemoryRateLimiter
 
 # — Summarization prompts —
 map_prompt = PromptTemplate(
@@ -36,6 +47,42 @@ def extract_text_until_references(pdf_path: Path) -> str:
     # cut off at References (case insensitive)
     return re.split(r'(?mi)^\s*References\b', full)[0].strip()
 
+def paper_key(pdf_file: Path) -> str:
+    """Stable identity of a paper across runs: <conference>/<year>/<file stem>."""
+    return f"{pdf_file.parent.parent.name}/{pdf_file.parent.name}/{pdf_file.stem}"
+
+def chunk_ids(key: str, count: int) -> list:
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return [f"paper_{digest}_{i}" for i in range(count)]
+
+def discover_papers(root_dir: Path) -> list:
+    """All PDFs under <root>/<conference>/<year>/, in a stable order."""
+    papers = []
+    for conf_dir in sorted(root_dir.iterdir()):
+        if not conf_dir.is_dir(): continue
+        for year_dir in sorted(conf_dir.iterdir()):
+            if not year_dir.is_dir(): continue
+            papers.extend(sorted(year_dir.glob("*.pdf")))
+    return papers
+
+def load_checkpoint(path: Path) -> dict:
+    """Completed papers by key. A torn last line (crash mid-write) is ignored."""
+    done = {}
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[record["key"]] = record
+    return done
+
+def batched(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
 def ingest_papers(
     root_dir: Path,
     milvus_host: str,
@@ -44,17 +91,44 @@ def ingest_papers(
     openai_api_key: str,
     model_name: str,
     chunk_size: int,
-    chunk_overlap: int
+    chunk_overlap: int,
+    checkpoint_path: Path,
+    output_path: Path,
+    batch_size: int = 32,
+    extract_workers: int = 4,
+    summarize_workers: int = 8,
+    requests_per_second: float = 2.0,
+    rebuild: bool = False,
 ):
+    """
+    Summarize and upsert every paper under root_dir that is not yet in the checkpoint.
+
+    Papers are processed in batches: text extraction for the next batch runs on
+    a process pool while the current batch is summarized concurrently (every LLM
+    request goes through one rate limiter). Each batch's chunks are upserted
+    under deterministic IDs and only then recorded in the checkpoint, so an
+    interrupted run resumes where it stopped and re-running after adding a new
+    year only processes the new papers.
+    """
     # 1) Connect to Milvus
     connections.connect(host=milvus_host, port=milvus_port)
     print(f"[Milvus] Connected to {milvus_host}:{milvus_port}")
 
-    # 2) Build summarizer
+    if rebuild:
+        if utility.has_collection(collection_name):
+            utility.drop_collection(collection_name)
+            print(f"[Milvus] Dropped '{collection_name}'")
+        checkpoint_path.unlink(missing_ok=True)
+
+    # 2) Build summarizer; the rate limiter covers map and combine calls alike
     llm = ChatOpenAI(
         openai_api_key=openai_api_key,
         model_name=model_name,
-        temperature=0
+        temperature=0,
+        rate_limiter=InMemoryRateLimiter(
+            requests_per_second=requests_per_second,
+            max_bucket_size=max(1, summarize_workers),
+        ),
     )
     summarizer = load_summarize_chain(
         llm=llm,
@@ -63,58 +137,97 @@ def ingest_papers(
         combine_prompt=combine_prompt,
         combine_document_variable_name="summaries"
     )
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    store = Milvus(
+        embedding_function=OpenAIEmbeddings(openai_api_key=openai_api_key),
+        collection_name=collection_name,
+        connection_args={"host": milvus_host, "port": milvus_port},
+        drop_old=False,
+    )
 
-    # 3) Walk rag/input/<conf>/<year>/*.pdf
-    raw_docs = []
-    for conf_dir in sorted(root_dir.iterdir()):
-        if not conf_dir.is_dir(): continue
-        for year_dir in sorted(conf_dir.iterdir()):
-            if not year_dir.is_dir(): continue
-            for pdf_file in sorted(year_dir.glob("*.pdf")):
-                print(f"[{conf_dir.name}/{year_dir.name}] Summarizing {pdf_file.name}")
-                text    = extract_text_until_references(pdf_file)
-                summary = summarizer.run([Document(page_content=text)]).strip()
-                raw_docs.append(Document(
+    # 3) Work out what is left to do
+    done = load_checkpoint(checkpoint_path)
+    pending = [pdf for pdf in discover_papers(root_dir) if paper_key(pdf) not in done]
+    print(f"[Checkpoint] {len(done)} papers already ingested, {len(pending)} to go")
+
+    def summarize(text: str) -> str:
+        return summarizer.run([Document(page_content=text)]).strip()
+
+    failed = 0
+    batches = list(batched(pending, batch_size))
+    with ProcessPoolExecutor(max_workers=extract_workers) as extract_pool, \
+            ThreadPoolExecutor(max_workers=summarize_workers) as summarize_pool, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+
+        def start_extraction(batch):
+            return [(pdf, extract_pool.submit(extract_text_until_references, pdf)) for pdf in batch]
+
+        next_texts = start_extraction(batches[0]) if batches else []
+        for n, batch in enumerate(batches):
+            texts = next_texts
+            # 4) Extract the next batch while this one is being summarized
+            next_texts = start_extraction(batches[n + 1]) if n + 1 < len(batches) else []
+
+            summary_futures = []
+            for pdf_file, text_future in texts:
+                try:
+                    text = text_future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"[Extract] Skipping {paper_key(pdf_file)}: {e}")
+                    continue
+                summary_futures.append((pdf_file, summarize_pool.submit(summarize, text)))
+
+            records, chunks, ids = [], [], []
+            for pdf_file, future in summary_futures:
+                key = paper_key(pdf_file)
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"[Summarize] Skipping {key}: {e}")
+                    continue
+                doc = Document(
                     page_content=summary,
                     metadata={
-                        "conference": conf_dir.name,
-                        "year":       year_dir.name,
+                        "conference": pdf_file.parent.parent.name,
+                        "year":       pdf_file.parent.name,
                         "title":      pdf_file.stem
                     }
-                ))
+                )
+                paper_chunks = splitter.split_documents([doc])
+                chunks.extend(paper_chunks)
+                ids.extend(chunk_ids(key, len(paper_chunks)))
+                records.append({"key": key, **doc.metadata, "summary": summary, "chunks": len(paper_chunks)})
 
-    print(f"[Summaries] Generated for {len(raw_docs)} papers")
+            # 5) Upsert, then checkpoint: a crash in between only repeats the upsert
+            if chunks:
+                if store.col is not None:
+                    store.delete(ids=ids)
+                store.add_documents(chunks, ids=ids)
+            for record in records:
+                checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+                done[record["key"]] = record
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+            print(f"[Batch {n + 1}/{len(batches)}] Ingested {len(records)} papers ({len(chunks)} chunks)")
 
-    # 4) Chunk summaries
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap
-    )
-    chunks = splitter.split_documents(raw_docs)
-    print(f"[Chunking] Produced {len(chunks)} chunks")
-
-    # 5) Embed & ingest into Milvus (wiping old collection)
-    embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-    Milvus.from_documents(
-        documents       = chunks,
-        embedding       = embeddings,
-        collection_name = collection_name,
-        connection_args = {"host": milvus_host, "port": milvus_port},
-        drop_old        = True
-    )
-    print(f"[Milvus] Ingested chunks into '{collection_name}'")
+    print(f"[Milvus] '{collection_name}' holds {len(done)} papers; {failed} failed and will be retried next run")
 
-    # 6) Save flat JSON of summaries
+    # 6) Save flat JSON of all summaries ingested so far
     out = [
-        {"conference": d.metadata["conference"],
-         "year":       d.metadata["year"],
-         "title":      d.metadata["title"],
-         "summary":    d.page_content}
-        for d in raw_docs
+        {"conference": record["conference"],
+         "year":       record["year"],
+         "title":      record["title"],
+         "summary":    record["summary"]}
+        for record in done.values()
     ]
-    with open("demo_papers_summaries.json", "w", encoding="utf-8") as f:
+    with open(output_path, "w", encoding="utf-8") as f:
         json.dump(out, f, indent=2, ensure_ascii=False)
-    print("[Output] Written papers_summaries.json")
+    print(f"[Output] Written {output_path}")
 
 if __name__ == "__main__":
     here = Path(__file__).parent
@@ -166,6 +279,47 @@ if __name__ == "__main__":
         default=100,
         help="Overlap between chunks"
     )
+    p.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=None,
+        help="Checkpoint file of completed papers (default: <root>/.ingest_checkpoint.jsonl)"
+    )
+    p.add_argument(
+        "--output", "-o",
+        type=Path,
+        default=Path("demo_papers_summaries.json"),
+        help="Where to write the JSON of all summaries"
+    )
+    p.add_argument(
+        "--batch_size",
+        type=int,
+        default=32,
+        help="Papers summarized and upserted per batch"
+    )
+    p.add_argument(
+        "--extract_workers",
+        type=int,
+        default=os.cpu_count() or 4,
+        help="Processes used for PDF text extraction"
+    )
+    p.add_argument(
+        "--summarize_workers",
+        type=int,
+        default=8,
+        help="Papers summarized concurrently"
+    )
+    p.add_argument(
+        "--rps",
+        type=float,
+        default=2.0,
+        help="Maximum OpenAI requests per second across all workers"
+    )
+    p.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Drop the collection and checkpoint before ingesting"
+    )
     args = p.parse_args()
 
     if not args.api_key:
@@ -179,5 +333,12 @@ if __name__ == "__main__":
         openai_api_key  = args.api_key,
         model_name      = args.model,
         chunk_size      = args.chunk_size,
-        chunk_overlap   = args.chunk_overlap
+        chunk_overlap   = args.chunk_overlap,
+        checkpoint_path = args.checkpoint or args.root / ".ingest_checkpoint.jsonl",
+        output_path     = args.output,
+        batch_size      = args.batch_size,
+        extract_workers = args.extract_workers,
+        summarize_workers = args.summarize_workers,
+        requests_per_second = args.rps,
+        rebuild         = args.rebuild
     )
@@ -0,0 +1,246 @@
+"""
+Pooled Milvus vector stores and coalesced flushing for the RAG module.
+
+Ingestion and retrieval share one ``Milvus`` store handle per collection instead
+of building a new store (and a new embeddings client) on every call; the pool
+is LRU-bounded so the number of handles (and Milvus connections) stays fixed. Inserts do
+not flush the collection themselves; ``schedule_flush`` marks the collection
+dirty and a single timer flushes and loads every dirty collection once the
+flush interval has elapsed, so a bulk upload seals segments once rather than
+once per knowledge base item.
+
+Collections created here use the RAG_INDEX_TYPE vector index (HNSW by default,
+or IVF_PQ for large, memory-bound deployments). ``ensure_partitioned_collection``
+creates the shared multi-tenant collection used by the ``partition_key``
+tenancy mode in ``rag.rag``.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Set
+
+from langchain_milvus import Milvus
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, connections, utility
+
+from rag.embeddings import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ─────────────────────────────────────────────────────────
+MILVUS_HOST          = os.getenv("MILVUS_HOST", "localhost")
+MILVUS_PORT          = os.getenv("MILVUS_PORT", "19530")
+# Seconds to wait after an insert before flushing/loading the collection
+RAG_FLUSH_INTERVAL   = float(os.getenv("RAG_FLUSH_INTERVAL", "5"))
+# Maximum number of pooled store handles per process
+RAG_STORE_POOL_SIZE  = int(os.getenv("RAG_STORE_POOL_SIZE", "64"))
+# Vector index for collections created by this module: HNSW, IVF_PQ or IVF_FLAT
+RAG_INDEX_TYPE       = os.getenv("RAG_INDEX_TYPE", "HNSW").upper()
+RAG_INDEX_METRIC     = os.getenv("RAG_INDEX_METRIC", "L2")
+# Number of physical partitions behind the user_id partition key
+RAG_PARTITION_NUM    = int(os.getenv("RAG_PARTITION_NUM", "64"))
+
+INDEX_BUILD_PARAMS = {
+    "HNSW": {"M": 16, "efConstruction": 200},
+    # m must divide the embedding dimension (1536 and 768 both work)
+    "IVF_PQ": {"nlist": 1024, "m": 16, "nbits": 8},
+    "IVF_FLAT": {"nlist": 128},
+}
+INDEX_SEARCH_PARAMS = {
+    "HNSW": {"ef": 64},
+    "IVF_PQ": {"nprobe": 16},
+    "IVF_FLAT": {"nprobe": 10},
+}
+
+
+def index_params() -> dict:
+    return {
+        "index_type": RAG_INDEX_TYPE,
+        "metric_type": RAG_INDEX_METRIC,
+        "params": INDEX_BUILD_PARAMS[RAG_INDEX_TYPE],
+    }
+
+
+def search_params() -> dict:
+    return {"metric_type": RAG_INDEX_METRIC, "params": INDEX_SEARCH_PARAMS[RAG_INDEX_TYPE]}
+
+
+class LRURegistry:
+    """
+    Thread-safe, size-bounded registry of shared objects.
+
+    Values are built by a factory outside the lock; if two threads race on the
+    same key the first value stored wins. The least recently used entry is
+    evicted once max_size is exceeded.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = factory()
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                return existing
+            self._entries[key] = value
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return value
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop all entries, or only those whose key matches predicate. Returns the number dropped."""
+        with self._lock:
+            if predicate is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_stores = LRURegistry(RAG_STORE_POOL_SIZE)
+_connect_lock = threading.Lock()
+
+
+def connect() -> None:
+    """Open the "default" pymilvus connection on first use rather than at import."""
+    with _connect_lock:
+        if not connections.has_connection("default"):
+            connections.connect(alias="default", host=MILVUS_HOST, port=MILVUS_PORT)
+
+
+def _build_store(collection_name: str) -> Milvus:
+    return Milvus(
+        embedding_function=get_embeddings(),
+        collection_name=collection_name,
+        connection_args={"host": MILVUS_HOST, "port": MILVUS_PORT},
+        index_params=index_params(),
+        search_params=search_params(),
+        drop_old=False,
+    )
+
+
+def get_vector_store(collection_name: str) -> Milvus:
+    """Return the pooled Milvus store for a collection, creating it on first use."""
+    store = _stores.get_or_create(collection_name, lambda: _build_store(collection_name))
+    if store.col is None and collection_exists(collection_name):
+        # The handle was opened before another process created the collection
+        _stores.invalidate(lambda key: key == collection_name)
+        store = _stores.get_or_create(collection_name, lambda: _build_store(collection_name))
+    return store
+
+
+def invalidate_vector_store(collection_name: str) -> None:
+    """Drop the pooled store handle for a collection (e.g. after it is dropped)."""
+    _stores.invalidate(lambda key: key == collection_name)
+
+
+def collection_exists(collection_name: str) -> bool:
+    connect()
+    return utility.has_collection(collection_name, using="default")
+
+
+_ensured_collections: Set[str] = set()
+_ensure_lock = threading.Lock()
+
+
+def ensure_partitioned_collection(collection_name: str) -> None:
+    """
+    Create the shared multi-tenant collection if needed: user_id is the
+    partition key, so each user's vectors live in one of RAG_PARTITION_NUM
+    physical partitions and a user_id filter only scans that partition.
+    Field names match langchain_milvus defaults so pooled stores can use it.
+    """
+    if collection_name in _ensured_collections:
+        return
+    with _ensure_lock:
+        if collection_name in _ensured_collections:
+            return
+        if not collection_exists(collection_name):
+            dim = len(get_embeddings().embed_query("dimension probe"))
+            fields = [
+                FieldSchema(name="pk",         dtype=DataType.VARCHAR, is_primary=True, auto_id=False, max_length=512),
+                FieldSchema(name="text",       dtype=DataType.VARCHAR, max_length=65535),
+                FieldSchema(name="vector",     dtype=DataType.FLOAT_VECTOR, dim=dim),
+                FieldSchema(name="user_id",    dtype=DataType.VARCHAR, max_length=64, is_partition_key=True),
+                FieldSchema(name="source",     dtype=DataType.VARCHAR, max_length=512),
+                FieldSchema(name="kb_item_id", dtype=DataType.VARCHAR, max_length=64),
+            ]
+            schema = CollectionSchema(fields, description="Shared user file embeddings, partitioned by user_id")
+            coll = Collection(
+                name=collection_name, schema=schema, using="default", num_partitions=RAG_PARTITION_NUM
+            )
+            coll.create_index(field_name="vector", index_params=index_params())
+            coll.load()
+            logger.info("Created partition-key collection %r (%s, dim=%d)", collection_name, RAG_INDEX_TYPE, dim)
+            invalidate_vector_store(collection_name)
+        _ensured_collections.add(collection_name)
+
+
+class FlushScheduler:
+    """Coalesce Collection.flush()/load() calls for recently written collections."""
+
+    def __init__(self, interval: float = RAG_FLUSH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._timer: Optional[threading.Timer] = None
+
+    def schedule(self, collection_name: str) -> None:
+        """Mark a collection dirty; it is flushed when the current interval elapses."""
+        with self._lock:
+            self._pending.add(collection_name)
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush_now)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush_now(self) -> None:
+        """Flush and load every pending collection immediately."""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        for collection_name in sorted(pending):
+            try:
+                connect()
+                coll = Collection(collection_name, using="default")
+                coll.flush()
+                coll.load()
+                logger.debug("Flushed and loaded Milvus collection %r", collection_name)
+            except Exception as e:
+                logger.warning("Failed to flush Milvus collection %r: %s", collection_name, e)
+
+
+flush_scheduler = FlushScheduler()
+
+# Celery recycles worker processes; flush whatever is still pending on exit
+atexit.register(flush_scheduler.flush_now)
+
+
+def schedule_flush(collection_name: str) -> None:
+    flush_scheduler.schedule(collection_name)
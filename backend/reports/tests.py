@@ -1,3 +1,209 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
 from django.test import TestCase
 
-# Create your tests here.
+from agents.report_agent.knowledge_storm.fetch import FetchLayer, ProviderLimit
+from agents.report_agent.knowledge_storm.interface import Retriever
+from agents.report_agent.knowledge_storm.rm import SerperRM, TavilySearchRM
+from agents.report_agent.knowledge_storm.search_cache import SearchCache
+
+
+class _MemorySearchCache(SearchCache):
+    def __init__(self):
+        self.values = {}
+
+    def _get(self, key):
+        return self.values.get(key)
+
+    def _set(self, key, value, ttl):
+        self.values[key] = value
+
+
+def _mock_fetch_layer(handler, **provider_limits):
+    """FetchLayer whose HTTP clients answer with handler instead of the network."""
+    layer = FetchLayer(provider_limits)
+    layer._ensure_loop()
+    layer._clients = {
+        verify: httpx.AsyncClient(transport=httpx.MockTransport(handler)) for verify in (True, False)
+    }
+    return layer
+
+
+class _CountingRM:
+    def __init__(self, corpus, cacheable=True):
+        self.corpus = corpus
+        self.calls = []
+        self.threads = []
+        if cacheable:
+            self.cache_key_params = lambda: {"corpus": self.corpus}
+
+    def __call__(self, query_or_queries, exclude_urls):
+        self.calls.extend(query_or_queries)
+        self.threads.append(threading.current_thread().name)
+        return [{"url": f"https://{self.corpus}/{q}", "title": q, "description": "", "snippets": [q]}
+                for q in query_or_queries]
+
+
+class SearchCacheTests(TestCase):
+    def setUp(self):
+        self.cache = _MemorySearchCache()
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            SearchCache()
+
+    def test_repeat_queries_are_served_from_cache(self):
+        rm = _CountingRM("news")
+        Retriever(rm, search_cache=self.cache).retrieve(["Graph  Networks"])
+        Retriever(rm, search_cache=self.cache).retrieve(["graph networks"])
+        self.assertEqual(rm.calls, ["Graph  Networks"])
+
+    def test_instances_with_different_identity_do_not_share_results(self):
+        first, second = _CountingRM("corpus-a"), _CountingRM("corpus-b")
+        Retriever(first, search_cache=self.cache).retrieve("query")
+        results = Retriever(second, search_cache=self.cache).retrieve("query")
+        self.assertEqual(second.calls, ["query"])
+        self.assertEqual(results[0].url, "https://corpus-b/query")
+
+    def test_retrievers_without_identity_are_not_cached(self):
+        rm = _CountingRM("private", cacheable=False)
+        retriever = Retriever(rm, search_cache=self.cache)
+        retriever.retrieve("query")
+        retriever.retrieve("query")
+        self.assertEqual(rm.calls, ["query", "query"])
+        self.assertEqual(self.cache.values, {})
+
+    def test_serper_identity_excludes_the_query(self):
+        rm = SerperRM(serper_search_api_key="key", k=5, query_params={"q": "stale", "gl": "us"})
+        identity = rm.cache_key_params()
+        self.assertEqual(identity["query_params"], {"gl": "us", "num": 5})
+        self.assertNotEqual(
+            self.cache.make_key(rm, "a", [], identity), self.cache.make_key(rm, "b", [], identity)
+        )
+
+    def test_blocking_retrievers_run_on_their_own_threads(self):
+        rm = _CountingRM("news", cacheable=False)
+        Retriever(rm, max_thread=2, search_cache=self.cache).retrieve(["a", "b", "c"])
+        self.assertEqual(sorted(rm.calls), ["a", "b", "c"])
+        self.assertTrue(all(name.startswith("storm-retriever") for name in rm.threads))
+
+
+class FetchLayerTests(TestCase):
+    def test_rate_limit_spreads_requests(self):
+        layer = FetchLayer({"test": ProviderLimit(max_concurrency=8, requests_per_second=20)})
+        started = []
+
+        async def send():
+            started.append(time.monotonic())
+
+        async def burst():
+            await asyncio.gather(*[layer._limited("test", "host", send) for _ in range(30)])
+
+        layer.run(burst())
+        # The bucket holds one second of requests; the other 10 wait for refills
+        self.assertGreaterEqual(started[-1] - started[0], 0.4)
+
+    def test_concurrency_limit(self):
+        layer = FetchLayer({"test": ProviderLimit(max_concurrency=2)})
+        in_flight, peak = [0], [0]
+
+        async def send():
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+
+        async def burst():
+            await asyncio.gather(*[layer._limited("test", "host", send) for _ in range(6)])
+
+        layer.run(burst())
+        self.assertEqual(peak[0], 2)
+
+    def test_run_from_the_fetch_loop_raises(self):
+        layer = FetchLayer()
+
+        async def nested():
+            inner = asyncio.sleep(0)
+            try:
+                layer.run(inner)
+            finally:
+                inner.close()
+
+        with self.assertRaises(RuntimeError):
+            layer.run(nested())
+
+    def test_arun_from_another_loop_runs_on_the_fetch_loop(self):
+        layer = FetchLayer()
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        loop = asyncio.run(layer.arun(current_loop()))
+        self.assertIs(loop, layer._loop)
+        # Already on the fetch loop, arun awaits in place
+        self.assertIs(layer.run(layer.arun(current_loop())), layer._loop)
+
+
+class SerperRMTests(TestCase):
+    def setUp(self):
+        self.bodies = []
+
+        def handler(request):
+            body = json.loads(request.content)
+            self.bodies.append(body)
+            self.assertEqual(request.headers["X-API-KEY"], "key")
+            return httpx.Response(200, json={"organic": [
+                {"link": f"https://example.com/{body['q']}", "title": body["q"], "snippet": "text"}
+            ]})
+
+        self.rm = SerperRM(serper_search_api_key="key", k=5, query_params={"gl": "us"})
+        self.rm.fetch_layer = _mock_fetch_layer(handler)
+
+    def test_request_params_are_built_per_query(self):
+        params = self.rm._request_params("a")
+        self.assertEqual(params, {"gl": "us", "num": 5, "q": "a", "type": "search"})
+        self.assertIsNot(params, self.rm.query_params)
+        self.assertNotIn("q", self.rm.query_params)
+
+    def test_concurrent_queries_send_their_own_query(self):
+        results = self.rm.forward(["a", "b", "c"], exclude_urls=[])
+        self.assertEqual(sorted(body["q"] for body in self.bodies), ["a", "b", "c"])
+        self.assertEqual([r["url"] for r in results], [f"https://example.com/{q}" for q in "abc"])
+        self.assertEqual(self.rm.query_params, {"gl": "us", "num": 5})
+        self.assertEqual(self.rm.get_usage_and_reset(), {"SerperRM": 3})
+
+
+class TavilySearchRMTests(TestCase):
+    def setUp(self):
+        self.bodies = []
+
+        def handler(request):
+            body = json.loads(request.content)
+            self.bodies.append(body)
+            self.assertEqual(request.headers["Authorization"], "Bearer key")
+            if body["query"] == "broken":
+                return httpx.Response(500, text="error")
+            return httpx.Response(200, json={"results": [
+                {"url": f"https://example.com/{body['query']}", "title": "t", "content": "c"},
+                {"url": "https://excluded.com/", "title": "t", "content": "c"},
+            ]})
+
+        self.rm = TavilySearchRM(tavily_search_api_key="key", k=4, time_range="week")
+        self.rm.fetch_layer = _mock_fetch_layer(handler)
+
+    def test_request_body(self):
+        body = self.rm._request_body("a")
+        self.assertEqual(body["query"], "a")
+        self.assertEqual(body["max_results"], 4)
+        self.assertEqual(body["time_range"], "week")
+        self.assertNotIn("search_depth", body)
+
+    def test_failed_queries_and_excluded_urls_are_dropped(self):
+        results = self.rm.forward(["a", "broken"], exclude_urls=["https://excluded.com/"])
+        self.assertEqual(sorted(body["query"] for body in self.bodies), ["a", "broken"])
+        self.assertEqual([r["url"] for r in results], ["https://example.com/a"])
+        self.assertEqual(results[0]["snippets"], ["c"])